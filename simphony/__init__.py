@@ -0,0 +1,3 @@
+from simphony.core.instrumentation import stats
+
+__all__ = ['stats']
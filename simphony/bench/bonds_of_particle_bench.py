@@ -0,0 +1,46 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle, Bond, ParticleContainer
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 100000
+
+container = ParticleContainer()
+for i in xrange(NUMBER_OF_PARTICLES):
+    container.add_particle(Particle(coordinates=(0.0, 1.1, 2.2), id=i))
+    if i > 0:
+        container.add_bond(Bond((i - 1, i), id=i))
+
+
+def scan_bonds(pc, particle_id):
+    return [bond for bond in pc.iter_bonds() if particle_id in bond.particles]
+
+
+def bonds_of_particle(pc, particle_id):
+    return list(pc.iter_bonds_of_particle(particle_id))
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+        file_container = cuds_file.add_particle_container('test')
+        file_container._append_particles(container.iter_particles())
+        file_container._append_bonds(container.iter_bonds())
+        print("Bonds of a particle among {} bonds".format(
+            NUMBER_OF_PARTICLES - 1))
+        for name, pc in (('ParticleContainer', container),
+                         ('FileParticleContainer', file_container)):
+            print(name)
+            print("scan of iter_bonds:",
+                  bench(lambda: scan_bonds(pc, 5000), repeat=3).summary())
+            print("iter_bonds_of_particle:",
+                  bench(lambda: bonds_of_particle(pc, 5000)).summary())
+        cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,101 @@
+from __future__ import print_function
+
+import threading
+import time
+
+from simphony.cuds.concurrent_particles import ConcurrentParticleContainer
+from simphony.cuds.particles import Particle, ParticleContainer
+
+NUMBER_OF_PARTICLES = 20000
+NUMBER_OF_WRITERS = 2
+NUMBER_OF_READERS = 2
+DURATION = 2.0
+
+
+def create_container(factory):
+    container = factory()
+    ids = [
+        container.add_particle(Particle((0.0, 0.0, float(i))))
+        for i in xrange(NUMBER_OF_PARTICLES)]
+    return container, ids
+
+
+def run(factory):
+    """ Run writer and reader threads on the same container.
+
+    Returns the number of writes, the worst write latency, the number of
+    completed iterations and the number of errors raised in the threads.
+
+    """
+    container, ids = create_container(factory)
+    stop = threading.Event()
+    stats = {'writes': 0, 'latency': 0.0, 'iterations': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def writer(index):
+        writes, latency, i = 0, 0.0, 0
+        while not stop.is_set():
+            particle = Particle(
+                (float(index), float(i), 0.0), id=ids[i % len(ids)])
+            start = time.time()
+            try:
+                if i % 2:
+                    container.update_particle(particle)
+                else:
+                    container.add_particle(Particle((0.0, 0.0, 0.0)))
+            except Exception:
+                with lock:
+                    stats['errors'] += 1
+            latency = max(latency, time.time() - start)
+            writes += 1
+            i += 1
+        with lock:
+            stats['writes'] += writes
+            stats['latency'] = max(stats['latency'], latency)
+
+    def reader():
+        iterations = 0
+        while not stop.is_set():
+            try:
+                for particle in container.iter_particles():
+                    pass
+            except RuntimeError:
+                with lock:
+                    stats['errors'] += 1
+            iterations += 1
+        with lock:
+            stats['iterations'] += iterations
+
+    threads = [
+        threading.Thread(target=writer, args=(i,))
+        for i in xrange(NUMBER_OF_WRITERS)]
+    threads += [
+        threading.Thread(target=reader) for i in xrange(NUMBER_OF_READERS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def report(name, stats):
+    print(
+        "{}: {:.0f} writes/sec, worst write latency {:.6f} sec, "
+        "{:.1f} full iterations/sec, {} errors".format(
+            name, stats['writes'] / DURATION, stats['latency'],
+            stats['iterations'] / DURATION, stats['errors']))
+
+
+print("""
+Benchmarking {} writer and {} reader threads on a container
+of {} particles for {} seconds
+
+""".format(
+    NUMBER_OF_WRITERS, NUMBER_OF_READERS, NUMBER_OF_PARTICLES, DURATION))
+report("ParticleContainer", run(ParticleContainer))
+for shards in (1, 16, 64):
+    report(
+        "ConcurrentParticleContainer ({} shards)".format(shards),
+        run(lambda: ConcurrentParticleContainer(number_of_shards=shards)))
@@ -0,0 +1,41 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 10000
+NUMBER_OF_UPDATES = 1000
+
+
+def update_particles(pc):
+    for i in xrange(NUMBER_OF_UPDATES):
+        pc.update_particle(Particle(coordinates=(1.0, 1.1, 2.2), id=i))
+
+
+def update_particles_in_batch(pc):
+    with pc.batch():
+        update_particles(pc)
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+        pc = cuds_file.add_particle_container('test')
+        pc._append_particles(
+            Particle(coordinates=(0.0, 1.1, 2.2), id=i)
+            for i in xrange(NUMBER_OF_PARTICLES))
+        print("{} calls of update_particle in a container of {}".format(
+            NUMBER_OF_UPDATES, NUMBER_OF_PARTICLES))
+        print("update_particle:",
+              bench(lambda: update_particles(pc), repeat=3).summary())
+        print("update_particle in a batch:",
+              bench(lambda: update_particles_in_batch(pc), repeat=3).summary())
+        cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
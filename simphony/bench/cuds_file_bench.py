@@ -6,7 +6,7 @@ import tempfile
 
 from simphony.bench.util import bench
 from simphony.io.cuds_file import CudsFile
-from simphony.cuds.particle import Particle
+from simphony.cuds.particles import Particle
 
 particles = [
     Particle(coordinates=(0.0, 1.1, 2.2)) for i in range(10000)]
@@ -67,17 +67,19 @@ if __name__ == '__main__':
 
     print(
         "create_file_with_particles:",
-        bench(lambda: create_file_with_particles(), repeat=3))
+        bench(lambda: create_file_with_particles(), repeat=3,
+              isolate=True).summary())
 
     print(
         "create_file_with_id_particles:",
-        bench(lambda: create_file_with_id_particles(), repeat=3))
+        bench(lambda: create_file_with_id_particles(), repeat=3,
+              isolate=True).summary())
 
     with Container() as pc:
         add_particles_to_container(pc)
         print(
             "iter_particles_in_container",
-            bench(lambda: iter_particles_in_container(pc)))
+            bench(lambda: iter_particles_in_container(pc)).summary())
 
     with Container() as pc:
         add_particles_to_container(pc)
@@ -85,4 +87,4 @@ if __name__ == '__main__':
             "update_coordinates_of_particles_in_container_using_iter",
             bench(
                 lambda: update_coordinates_of_particles_in_container(pc),
-                repeat=2))
+                repeat=2).summary())
@@ -0,0 +1,61 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Bond
+from simphony.io.cuds_file import CudsFile
+from simphony.io.file_particle_container import (
+    LEGACY_MAX_NUMBER_PARTICLES_IN_BOND, _LegacyBondDescription)
+
+NUMBER_OF_BONDS = 100000
+
+
+def write_bonds(filename):
+    cuds_file = CudsFile.open(filename, mode='w')
+    pc = cuds_file.add_particle_container('test')
+    pc._append_bonds(
+        Bond((i, i + 1), id=i) for i in xrange(NUMBER_OF_BONDS))
+    cuds_file.close()
+
+
+def write_legacy_bonds(filename):
+    cuds_file = CudsFile.open(filename, mode='w')
+    group = cuds_file._file.create_group('/particle_container/', 'test')
+    table = cuds_file._file.create_table(
+        group, 'bonds', _LegacyBondDescription)
+    records = numpy.zeros(NUMBER_OF_BONDS, dtype=table.dtype)
+    records['id'] = numpy.arange(NUMBER_OF_BONDS)
+    records['particle_ids'][:, 0] = numpy.arange(NUMBER_OF_BONDS)
+    records['particle_ids'][:, 1] = numpy.arange(NUMBER_OF_BONDS) + 1
+    records['n_particle_ids'] = 2
+    table.append(records)
+    cuds_file.close()
+
+
+def iter_bonds(filename):
+    cuds_file = CudsFile.open(filename, mode='r')
+    for bond in cuds_file.get_particle_container('test').iter_bonds():
+        pass
+    cuds_file.close()
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print("File with {} bonds of 2 particles".format(NUMBER_OF_BONDS))
+        for name, write in (
+                ('fixed {} slots'.format(LEGACY_MAX_NUMBER_PARTICLES_IN_BOND),
+                 write_legacy_bonds),
+                ('offsets', write_bonds)):
+            filename = os.path.join(temp_dir, name + '.cuds')
+            write(filename)
+            print(name)
+            print("file size: {} bytes".format(os.path.getsize(filename)))
+            print("iter_bonds:", bench(lambda: iter_bonds(filename)).summary())
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,46 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 1000000
+LO = (0.45, 0.45, 0.45)
+HI = (0.55, 0.55, 0.55)
+
+
+def filter_particles(pc):
+    return [particle for particle in pc.iter_particles()
+            if all(lo <= x <= hi for lo, x, hi in
+                   zip(LO, particle.coordinates, HI))]
+
+
+def box_query(pc):
+    return list(pc.iter_particles_in_box(LO, HI))
+
+
+if __name__ == '__main__':
+    numpy.random.seed(42)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+        pc = cuds_file.add_particle_container('test')
+        pc._append_particles(
+            Particle(tuple(xyz), id=i) for i, xyz in
+            enumerate(numpy.random.rand(NUMBER_OF_PARTICLES, 3).tolist()))
+        print("Particles in a box of 1/1000 of the volume, in a container "
+              "of {} ({} found)".format(
+                  NUMBER_OF_PARTICLES, len(box_query(pc))))
+        print("iter_particles and filter:", bench(
+            lambda: filter_particles(pc), repeat=3, number=1).summary())
+        print("iter_particles_in_box:", bench(
+            lambda: box_query(pc), repeat=3).summary())
+        cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,78 @@
+from __future__ import print_function
+
+import os
+import resource
+import shutil
+import tempfile
+
+import numpy
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle, Bond
+from simphony.io.cuds_file import CudsFile
+from simphony.io.file_particle_container import _ParticleDescription
+
+NUMBER_OF_PARTICLES = 1000000
+
+
+class StreamingContainer(object):
+    """ Source container that creates its particles and bonds on the fly
+
+    """
+    def __nonzero__(self):
+        return True
+
+    def iter_particles(self):
+        for i in xrange(NUMBER_OF_PARTICLES):
+            yield Particle(coordinates=(0.0, 1.1, 2.2), id=i)
+
+    def iter_bonds(self):
+        for i in xrange(0, NUMBER_OF_PARTICLES - 1, 10):
+            yield Bond(particles=(i, i + 1), id=i)
+
+
+def export(filename):
+    cuds_file = CudsFile.open(filename, mode='w')
+    cuds_file.add_particle_container('test', StreamingContainer())
+    cuds_file.close()
+
+
+def iterate_source():
+    # the time needed to create the particles and bonds of the source
+    source = StreamingContainer()
+    for particle in source.iter_particles():
+        pass
+    for bond in source.iter_bonds():
+        pass
+
+
+def write_array(filename, records):
+    # the time needed to write the particle records without encoding them
+    cuds_file = CudsFile.open(filename, mode='w')
+    cuds_file._file.create_table(
+        '/', 'particles', _ParticleDescription).append(records)
+    cuds_file.close()
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(temp_dir, 'test.cuds')
+        print("Export of {} particles (and {} bonds)".format(
+            NUMBER_OF_PARTICLES, NUMBER_OF_PARTICLES // 10))
+        print("add_particle_container:",
+              bench(lambda: export(filename), repeat=1).summary())
+        print("file size: {:.1f} MB".format(
+            os.path.getsize(filename) / 1e6))
+        print("peak memory: {:.1f} MB".format(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3))
+        print("iterating the source only:",
+              bench(iterate_source, repeat=1).summary())
+        records = numpy.zeros(
+            NUMBER_OF_PARTICLES,
+            dtype=[('id', numpy.uint32), ('coordinates', numpy.float64, 3)])
+        print("writing the particle records only:",
+              bench(lambda: write_array(filename, records),
+                    repeat=1).summary())
+    finally:
+        shutil.rmtree(temp_dir)
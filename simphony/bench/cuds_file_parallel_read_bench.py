@@ -0,0 +1,51 @@
+from __future__ import print_function
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle
+from simphony.io.cuds_file import CudsFile
+from simphony.io.parallel import read_particle_arrays
+
+NUMBER_OF_CONTAINERS = 200
+NUMBER_OF_PARTICLES = 20000
+
+
+def read_sequentially(filename):
+    cuds_file = CudsFile.open(filename, mode='r')
+    for pc, name in cuds_file.iter_particle_containers():
+        pc.read_ids()
+        pc.read_coordinates()
+    cuds_file.close()
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(temp_dir, 'test.cuds')
+        cuds_file = CudsFile.open(filename)
+        for n in xrange(NUMBER_OF_CONTAINERS):
+            pc = cuds_file.add_particle_container('pc{}'.format(n))
+            pc._append_particles(
+                Particle(coordinates=(0.0, 1.1, 2.2), id=i)
+                for i in xrange(NUMBER_OF_PARTICLES))
+        cuds_file.close()
+
+        particles = NUMBER_OF_CONTAINERS * NUMBER_OF_PARTICLES
+        print("Reading {} containers of {} particles".format(
+            NUMBER_OF_CONTAINERS, NUMBER_OF_PARTICLES))
+        result = bench(
+            lambda: read_sequentially(filename), repeat=3).summary()
+        print("iter_particle_containers:", result)
+        for workers in sorted({1, 2, 4, multiprocessing.cpu_count()}):
+            result = bench(
+                lambda: read_particle_arrays(filename, workers=workers),
+                repeat=3).summary()
+            print("read_particle_arrays workers={}:".format(workers), result)
+        print("({} cpus, {} particles in total)".format(
+            multiprocessing.cpu_count(), particles))
+    finally:
+        shutil.rmtree(temp_dir)
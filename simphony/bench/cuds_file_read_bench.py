@@ -0,0 +1,47 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle, ParticleContainer
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 100000
+
+
+def iter_coordinates(pc):
+    for particle in pc.iter_particles():
+        particle.coordinates
+
+
+def read_coordinates(pc):
+    pc.read_coordinates()
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(temp_dir, 'test.cuds')
+        container = ParticleContainer()
+        for i in xrange(NUMBER_OF_PARTICLES):
+            container.add_particle(Particle(coordinates=(0.0, 1.1, 2.2), id=i))
+        cuds_file = CudsFile.open(filename)
+        cuds_file.add_particle_container('test', container)
+        cuds_file.close()
+
+        print(
+            "Reading the coordinates of {} particles".format(
+                NUMBER_OF_PARTICLES))
+        for driver in (None, 'H5FD_CORE'):
+            cuds_file = CudsFile.open(filename, mode='r', driver=driver)
+            pc = cuds_file.get_particle_container('test')
+            print("driver:", driver or 'default')
+            print("iter_particles:",
+                  bench(lambda: iter_coordinates(pc)).summary())
+            print("read_coordinates:",
+                  bench(lambda: read_coordinates(pc)).summary())
+            cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,46 @@
+from __future__ import print_function
+
+import os
+import random
+import shutil
+import tempfile
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 100000
+NUMBER_OF_READS = 1000
+# the reads are spread over a small working set of particles
+HOT_PARTICLES = 100
+
+random.seed(42)
+hot_ids = random.sample(xrange(NUMBER_OF_PARTICLES), HOT_PARTICLES)
+ids = [random.choice(hot_ids) for _ in xrange(NUMBER_OF_READS)]
+
+
+def get_particles(pc):
+    for id in ids:
+        pc.get_particle(id)
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+        pc = cuds_file.add_particle_container('test')
+        pc._append_particles(
+            Particle(coordinates=(0.0, 1.1, 2.2), id=i)
+            for i in xrange(NUMBER_OF_PARTICLES))
+        print("{} calls of get_particle ({} distinct ids) "
+              "in a container of {}".format(
+                  NUMBER_OF_READS, HOT_PARTICLES, NUMBER_OF_PARTICLES))
+        print("get_particle:",
+              bench(lambda: get_particles(pc), repeat=3).summary())
+        pc.enable_read_cache()
+        print("get_particle with the read cache:",
+              bench(lambda: get_particles(pc), repeat=3).summary())
+        print("cache statistics:", pc.read_cache_info()['particles'])
+        cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,53 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 100000
+NUMBER_OF_REMOVED = 1000
+
+
+def fill(pc):
+    pc._replace_contents(_Particles())
+
+
+class _Particles(object):
+    def iter_particles(self):
+        for i in xrange(NUMBER_OF_PARTICLES):
+            yield Particle(coordinates=(0.0, 1.1, 2.2), id=i)
+
+    def iter_bonds(self):
+        return iter(())
+
+
+def remove_one_by_one(pc):
+    fill(pc)
+    for id in xrange(0, NUMBER_OF_PARTICLES, 100):
+        pc.remove_particle(id)
+
+
+def remove_in_bulk(pc):
+    fill(pc)
+    pc.remove_particles(xrange(0, NUMBER_OF_PARTICLES, 100))
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+        pc = cuds_file.add_particle_container('test')
+        print("Removing {} of {} particles (including the refill)".format(
+            NUMBER_OF_REMOVED, NUMBER_OF_PARTICLES))
+        print("remove_particle:",
+              bench(lambda: remove_one_by_one(pc), repeat=1).summary())
+        print("remove_particles:",
+              bench(lambda: remove_in_bulk(pc), repeat=3).summary())
+        print("refill only:", bench(lambda: fill(pc), repeat=3).summary())
+        cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
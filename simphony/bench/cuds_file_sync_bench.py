@@ -0,0 +1,53 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle, ParticleContainer
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 100000
+
+container = ParticleContainer()
+for i in xrange(NUMBER_OF_PARTICLES):
+    container.add_particle(Particle(coordinates=(0.0, 1.1, 2.2), id=i))
+
+
+def move_particles(fraction):
+    for i in xrange(0, NUMBER_OF_PARTICLES, int(1 / fraction)):
+        container.update_particle(
+            Particle(coordinates=(1.0, 1.1, 2.2), id=i))
+
+
+def full_checkpoint(cuds_file):
+    container.track_changes(False)
+    move_particles(0.01)
+    cuds_file.sync('test', container)
+
+
+def incremental_checkpoint(cuds_file):
+    container.track_changes()
+    move_particles(0.01)
+    cuds_file.sync('test', container)
+
+
+if __name__ == '__main__':
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+        cuds_file.sync('test', container)
+        print(
+            "Checkpoint of {} particles after moving 1% of them".format(
+                NUMBER_OF_PARTICLES))
+        print(
+            "full checkpoint:",
+            bench(lambda: full_checkpoint(cuds_file), repeat=3).summary())
+        print(
+            "incremental checkpoint:",
+            bench(lambda: incremental_checkpoint(cuds_file),
+                  repeat=3).summary())
+        cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,102 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle, ParticleContainer
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 1000000
+NUMBER_OF_LOOKUPS = 100
+# the single row additions and removals are measured on a small container
+SMALL_NUMBER_OF_PARTICLES = 3000
+NUMBER_OF_REMOVALS = 100
+LO = (0.45, 0.45, 0.45)
+HI = (0.55, 0.55, 0.55)
+
+
+def get_particles(pc, ids):
+    for id in ids:
+        pc.get_particle(id)
+
+
+def box_query(pc):
+    return list(pc.iter_particles_in_box(LO, HI))
+
+
+def add_and_remove(cuds_file, name, container, zone_maps):
+    pc = cuds_file.add_particle_container(name)
+    if not zone_maps:
+        pc._zone_maps = {}
+    print("  add_particle ({} particles):".format(
+        SMALL_NUMBER_OF_PARTICLES), bench(
+        lambda: [pc.add_particle(Particle((float(i), 0.0, 0.0), id=i))
+                 for i in xrange(SMALL_NUMBER_OF_PARTICLES)],
+        lambda: pc._replace_contents(ParticleContainer()),
+        repeat=3, number=1).summary())
+    step = SMALL_NUMBER_OF_PARTICLES // NUMBER_OF_REMOVALS
+    print("  remove_particle ({} ids):".format(NUMBER_OF_REMOVALS), bench(
+        lambda: [pc.remove_particle(i) for i in
+                 xrange(0, SMALL_NUMBER_OF_PARTICLES, step)],
+        lambda: pc._replace_contents(container),
+        repeat=3, number=1).summary())
+    # the zone maps are saved by the first flush
+    print("  flush:", bench(
+        pc.flush, repeat=1, number=1, warmup=0).summary())
+
+
+def run(pc, ids):
+    print("  get_particle ({} ids):".format(len(ids)), bench(
+        lambda: get_particles(pc, ids), repeat=3, number=1).summary())
+    print("  iter_particles_in_box:", bench(
+        lambda: box_query(pc), repeat=3, number=1).summary())
+
+
+if __name__ == '__main__':
+    numpy.random.seed(42)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+        container = ParticleContainer()
+        for i in xrange(SMALL_NUMBER_OF_PARTICLES):
+            container.add_particle(Particle((float(i), 0.0, 0.0), id=i))
+        print("Container of {} particles".format(SMALL_NUMBER_OF_PARTICLES))
+        print(" with zone maps:")
+        add_and_remove(cuds_file, 'small', container, True)
+        print(" without zone maps:")
+        add_and_remove(
+            cuds_file, 'small_without_zones', container, False)
+
+        pc = cuds_file.add_particle_container('test')
+        # the ids are added in increasing order, the positions at random
+        pc._append_particles(
+            Particle(tuple(xyz), id=i) for i, xyz in
+            enumerate(numpy.random.rand(NUMBER_OF_PARTICLES, 3).tolist()))
+        ids = numpy.random.randint(
+            NUMBER_OF_PARTICLES, size=NUMBER_OF_LOOKUPS).tolist()
+        zone_maps = pc._zone_maps
+
+        print("Container of {} particles, in the order of their ids".format(
+            NUMBER_OF_PARTICLES))
+        print(" with zone maps:")
+        run(pc, ids)
+        pc._zone_maps = {}
+        print(" without zone maps:")
+        run(pc, ids)
+        pc._zone_maps = zone_maps
+
+        pc.reorder()
+        print("After reorder (Hilbert curve)")
+        print(" with zone maps:")
+        run(pc, ids)
+        pc._zone_maps = {}
+        print(" without zone maps:")
+        run(pc, ids)
+        pc._zone_maps = zone_maps
+        cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
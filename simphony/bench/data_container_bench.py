@@ -29,7 +29,9 @@ def setitem_with_CUBA_keys(data):
         data[item] = int(item)
     return data
 
-print("""
+
+if __name__ == '__main__':
+    print("""
 Benchmarking various operations between different data containers
 
 .. note:
@@ -38,26 +40,32 @@ Benchmarking various operations between different data containers
     section is comparable.
 
 """)
-print('Initialization:')
-print("dict:", bench(lambda: dict(dict_data)))
-print("DataContainer:", bench(lambda: DataContainer(dict_data)))
-print("dict == DataContainer", dict(dict_data) == DataContainer(dict_data))
-print()
-print('Iterations:')
-print("dict:", bench(lambda: iteration(dict_data)))
-print("DataContainer:", bench(lambda: iteration(data_container)))
-print()
-print('getitem access:')
-print("dict:", bench(lambda: getitem_access(dict_data, indices)))
-print("DataContainer:", bench(lambda: getitem_access(data_container, indices)))
-print(
-    "dict == DataContainer",
-    getitem_access(dict_data, indices) == getitem_access(data_container, indices))  # noqa
-print()
-print('setitem with CUBA keys:')
-print("dict:", bench(lambda: setitem_with_CUBA_keys(dict_data)))
-print(
-    "DataContainer:", bench(lambda: setitem_with_CUBA_keys(data_container)))
-print(
-    "dict == DataContainer",
-    setitem_with_CUBA_keys(dict_data) == setitem_with_CUBA_keys(data_container))  # noqa
+    print('Initialization:')
+    print("dict:", bench(lambda: dict(dict_data)).summary())
+    print("DataContainer:", bench(lambda: DataContainer(dict_data)).summary())
+    print("dict == DataContainer", dict(dict_data) == DataContainer(dict_data))
+    print()
+    print('Iterations:')
+    print("dict:", bench(lambda: iteration(dict_data)).summary())
+    print(
+        "DataContainer:", bench(lambda: iteration(data_container)).summary())
+    print()
+    print('getitem access:')
+    print(
+        "dict:", bench(lambda: getitem_access(dict_data, indices)).summary())
+    print(
+        "DataContainer:",
+        bench(lambda: getitem_access(data_container, indices)).summary())
+    print(
+        "dict == DataContainer",
+        getitem_access(dict_data, indices) == getitem_access(data_container, indices))  # noqa
+    print()
+    print('setitem with CUBA keys:')
+    print(
+        "dict:", bench(lambda: setitem_with_CUBA_keys(dict_data)).summary())
+    print(
+        "DataContainer:",
+        bench(lambda: setitem_with_CUBA_keys(data_container)).summary())
+    print(
+        "dict == DataContainer",
+        setitem_with_CUBA_keys(dict_data) == setitem_with_CUBA_keys(data_container))  # noqa
@@ -0,0 +1,70 @@
+"""Scaling of a stencil operation on a decomposed 3D cubic lattice.
+
+A D3Q7 diffusion step is applied to a 96^3 cubic lattice, first on the
+whole lattice and then block by block (halo exchange and map_blocks) with
+an increasing number of worker processes.
+
+Usage::
+
+    python -m simphony.bench.lattice_decomposition_bench --workers 1,2,4
+
+"""
+from __future__ import print_function
+
+import argparse
+
+import numpy as np
+
+from simphony.bench.util import bench
+from simphony.cuds.decomposition import decompose_lattice, map_blocks
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.stencil import gather_neighbors
+
+SIZE = (96, 96, 96)
+STEPS = 5
+
+
+def diffuse(block, array):
+    neighbors = gather_neighbors(array, 'D3Q7', periodic=False)
+    return (0.4 * array + 0.1 * neighbors[1:].sum(axis=0))[block.interior]
+
+
+def whole_lattice(field):
+    for _ in xrange(STEPS):
+        neighbors = gather_neighbors(field, 'D3Q7')
+        field = 0.4 * field + 0.1 * neighbors[1:].sum(axis=0)
+    return field
+
+
+def decomposed(field, workers):
+    for _ in xrange(STEPS):
+        field.exchange()
+        map_blocks(diffuse, field, workers=workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Scaling of the lattice decomposition')
+    parser.add_argument(
+        '--workers', default='1,2,4',
+        help='comma separated numbers of workers (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    lattice = make_cubic_lattice('test', 0.1, SIZE)
+    data = np.random.rand(*SIZE)
+    print("{} D3Q7 diffusion steps on a {} cubic lattice".format(
+        STEPS, SIZE))
+    print("whole lattice:", bench(
+        lambda: whole_lattice(data), repeat=3, number=1).summary())
+    for workers in [int(workers) for workers in args.workers.split(',')]:
+        decomposition = decompose_lattice(lattice, workers, halo=1)
+        field = decomposition.allocate_field()
+        field.scatter(data)
+        print("{} blocks {}, {} workers:".format(
+            len(decomposition), decomposition.grid, workers), bench(
+                lambda: decomposed(field, workers), repeat=3,
+                number=1).summary())
+
+
+if __name__ == '__main__':
+    main()
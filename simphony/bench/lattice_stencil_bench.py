@@ -0,0 +1,41 @@
+from __future__ import print_function
+
+import numpy as np
+
+from simphony.bench.util import bench
+from simphony.core.cuba import CUBA
+from simphony.cuds.lattice import make_cubic_lattice
+
+SIZE = (32, 32, 32)
+
+
+def node_loop_sum(lattice, stencil):
+    # sum of the densities of the neighbours, one node at a time
+    size = tuple(lattice.size)
+    result = np.empty(size)
+    for node in lattice.iter_nodes():
+        total = 0.0
+        for offset in stencil.offsets:
+            id = tuple((np.add(node.id, offset) % size).tolist())
+            total += lattice.get_node(id).data[CUBA.DENSITY]
+        result[node.id] = total
+    return result
+
+
+def gathered_sum(lattice, stencil, field):
+    return lattice.gather_neighbors(field, stencil).sum(axis=0)
+
+
+if __name__ == '__main__':
+    lattice = make_cubic_lattice('test', 0.1, SIZE)
+    field = np.random.rand(*SIZE)
+    for node in lattice.iter_nodes():
+        node.data[CUBA.DENSITY] = field[node.id]
+        lattice.update_node(node)
+    stencil = lattice.get_stencil('D3Q19')
+    print("Sum over the D3Q19 neighbours of a {} lattice".format(SIZE))
+    print("get_node loop:", bench(
+        lambda: node_loop_sum(lattice, stencil), repeat=1, number=1,
+        warmup=0).summary())
+    print("gather_neighbors:", bench(
+        lambda: gathered_sum(lattice, stencil, field), repeat=5).summary())
@@ -0,0 +1,156 @@
+"""Memory footprint of the cuds containers.
+
+Reports the bytes per element of ParticleContainer, Mesh (cells with
+their points) and Lattice (nodes) holding representative DataContainer
+contents. Each container is built in a fresh worker process, and two
+numbers are reported: the growth of the resident set size (RSS) of the
+process while the container is built, and the ``memory_usage()`` of the
+container.
+
+Usage::
+
+    python -m simphony.bench.memory_bench --sizes 10000,100000 -o memory.json
+
+.. note::
+
+    The RSS is sampled from /proc/self/statm, so the RSS numbers are only
+    available on Linux (the maximum RSS is used elsewhere).
+
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import resource
+
+from simphony.core.cuba import CUBA
+from simphony.cuds.concurrent_particles import ConcurrentParticleContainer
+from simphony.cuds.lattice import make_cubic_lattice
+from simphony.cuds.mesh import Mesh, Point, Cell
+from simphony.cuds.particles import Particle, ParticleContainer
+
+DEFAULT_SIZES = (10000, 100000)
+
+
+def rss():
+    """ The current resident set size of the process in bytes
+
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize()
+    except IOError:
+        # the maximum resident set size (in kilobytes on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _particle_data(i):
+    return {CUBA.VELOCITY: (0.1, 0.2, 0.3), CUBA.MASS: 1.0,
+            CUBA.MATERIAL_ID: i % 4}
+
+
+def build_particles(size, cls=ParticleContainer):
+    container = cls()
+    for i in xrange(size):
+        container.add_particle(
+            Particle((0.0, 1.1, 2.2), id=i, data=_particle_data(i)))
+    return container
+
+
+def build_concurrent_particles(size):
+    return build_particles(size, ConcurrentParticleContainer)
+
+
+def build_mesh(size):
+    # 'size' tetrahedral cells that share points (about one point per cell)
+    mesh = Mesh()
+    points = [mesh.add_point(
+        Point((0.0, 1.1, 2.2), data={CUBA.TEMPERATURE: 300.0}))
+        for _ in xrange(size + 3)]
+    for i in xrange(size):
+        mesh.add_cell(
+            Cell(points[i:i + 4],
+                 data={CUBA.VELOCITY: (0.1, 0.2, 0.3), CUBA.DENSITY: 1.0}))
+    return mesh
+
+
+def build_lattice(size):
+    side = max(1, int(round(size ** (1.0 / 3))))
+    lattice = make_cubic_lattice('test', 0.1, (side, side, side))
+    for node in lattice.iter_nodes():
+        node.data[CUBA.DENSITY] = 1.0
+        node.data[CUBA.VELOCITY] = (0.1, 0.2, 0.3)
+        lattice.update_node(node)
+    return lattice, side ** 3
+
+
+BUILDERS = [
+    ('ParticleContainer', build_particles),
+    ('ConcurrentParticleContainer', build_concurrent_particles),
+    ('Mesh', build_mesh),
+    ('Lattice', build_lattice),
+]
+
+
+def _measure(name, builder, size, queue):
+    before = rss()
+    result = builder(size)
+    if isinstance(result, tuple):
+        container, size = result
+    else:
+        container = result
+    after = rss()
+    queue.put({
+        'name': name,
+        'size': size,
+        'rss_per_element': float(after - before) / size,
+        'memory_usage_per_element': float(container.memory_usage()) / size})
+
+
+def measure(name, builder, size):
+    """ Build a container in a new process and measure its footprint
+
+    Returns
+    -------
+    dict
+        the name, number of elements and bytes per element (RSS growth
+        and memory_usage)
+
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_measure, args=(name, builder, size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Memory footprint of the cuds containers')
+    parser.add_argument(
+        '--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+        help='comma separated container sizes (default: %(default)s)')
+    parser.add_argument(
+        '-o', '--output', help='JSON file where the results are written')
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, builder in BUILDERS:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            result = measure(name, builder, size)
+            results.append(result)
+            print(
+                '{name} size={size}: {rss_per_element:.0f} bytes per element '
+                '(RSS), {memory_usage_per_element:.0f} bytes per element '
+                '(memory_usage)'.format(**result))
+    if args.output is not None:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Partitioning time of a large mesh.
+
+A structured mesh of n x n square cells (1M cells by default) is split in
+parts with recursive coordinate bisection.
+
+Usage::
+
+    python -m simphony.bench.mesh_partition_bench --side 1000 --parts 2,8,64
+
+"""
+from __future__ import print_function
+
+import argparse
+
+from simphony.bench.util import bench
+from simphony.cuds.mesh import Mesh, Point, Cell
+from simphony.cuds.mesh_partition import partition_mesh
+
+
+def grid_mesh(side):
+    mesh = Mesh()
+    points = [[mesh.add_point(Point((float(i), float(j), 0.0)))
+               for j in xrange(side + 1)] for i in xrange(side + 1)]
+    for i in xrange(side):
+        for j in xrange(side):
+            mesh.add_cell(Cell([points[i][j], points[i + 1][j],
+                                points[i + 1][j + 1], points[i][j + 1]]))
+    return mesh
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Partitioning time of a large mesh')
+    parser.add_argument(
+        '--side', type=int, default=1000,
+        help='number of cells along each side (default: %(default)s)')
+    parser.add_argument(
+        '--parts', default='2,8,64',
+        help='comma separated numbers of parts (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    mesh = grid_mesh(args.side)
+    print("Partitioning a mesh of {} cells".format(args.side ** 2))
+    for parts in [int(parts) for parts in args.parts.split(',')]:
+        result = bench(
+            lambda: partition_mesh(mesh, parts), repeat=3, number=1,
+            warmup=0)
+        partition = partition_mesh(mesh, parts)
+        print("{} parts ({} interface points):".format(
+            parts, len(partition.boundary_points)), result.summary())
+
+
+if __name__ == '__main__':
+    main()
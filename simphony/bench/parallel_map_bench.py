@@ -0,0 +1,35 @@
+from __future__ import print_function
+
+import math
+import multiprocessing
+
+from simphony.bench.util import bench
+from simphony.core.cuba import CUBA
+from simphony.cuds.parallel import map_particles
+from simphony.cuds.particles import Particle, ParticleContainer
+
+
+def compute_energy(particle):
+    # some cpu bound work for each particle
+    x, y, z = particle.coordinates
+    energy = 0.0
+    for i in xrange(1, 200):
+        energy += math.sin(x * i) * math.cos(y / i) + math.sqrt(z + i)
+    particle.data[CUBA.TEMPERATURE] = energy
+    return particle
+
+
+if __name__ == '__main__':
+    container = ParticleContainer()
+    for i in xrange(20000):
+        container.add_particle(Particle((0.1 * i, 0.2 * i, 0.3 * i)))
+
+    print("""
+Benchmarking map_particles on 20000 particles with a cpu bound function
+
+""")
+    for workers in sorted({1, 2, 4, multiprocessing.cpu_count()}):
+        result = bench(
+            lambda: map_particles(compute_energy, container, workers=workers),
+            repeat=2)
+        print("workers={}:".format(workers), result.summary())
@@ -0,0 +1,93 @@
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from simphony.bench.util import bench
+from simphony.cuds.particles import Particle, ParticleContainer
+from simphony.io.cuds_file import CudsFile
+
+NUMBER_OF_PARTICLES = 100000
+NUMBER_OF_FILE_PARTICLES = 1000000
+# the neighbour queries visit the particles of a few random grid cells
+GRID = 20
+NUMBER_OF_QUERIES = 200
+# the box of the chunked reads, at the centre of the domain (a fraction
+# of the side of the domain)
+BOX = 0.1
+
+numpy.random.seed(42)
+
+
+def random_particles(n):
+    coordinates = numpy.random.rand(n, 3)
+    return [Particle(tuple(xyz), id=i)
+            for i, xyz in enumerate(coordinates.tolist())]
+
+
+def neighbour_cells(particles):
+    # the ids of the particles of the GRID^3 cells
+    cells = {}
+    for particle in particles:
+        cell = tuple(int(x * GRID) for x in particle.coordinates)
+        cells.setdefault(cell, []).append(particle.id)
+    keys = sorted(cells)
+    picked = numpy.random.randint(len(keys), size=NUMBER_OF_QUERIES)
+    return [cells[keys[i]] for i in picked.tolist()]
+
+
+def neighbour_queries(pc, queries):
+    for ids in queries:
+        for particle in pc.iter_particles(ids):
+            particle.coordinates
+
+
+def box_rows(pc):
+    coordinates = pc.read_coordinates()
+    inside = numpy.all(numpy.abs(coordinates - 0.5) < BOX / 2, axis=1)
+    return numpy.flatnonzero(inside)
+
+
+def chunked_read(table, rows):
+    table.read_coordinates(rows)
+
+
+if __name__ == '__main__':
+    particles = random_particles(NUMBER_OF_PARTICLES)
+    queries = neighbour_cells(particles)
+    pc = ParticleContainer()
+    for particle in particles:
+        pc.add_particle(particle)
+    print("{} neighbour queries (particles of a cell of a {}^3 grid) in a "
+          "container of {}".format(NUMBER_OF_QUERIES, GRID,
+                                   NUMBER_OF_PARTICLES))
+    print("insertion order:", bench(
+        lambda: neighbour_queries(pc, queries), repeat=3).summary())
+    pc.reorder()
+    print("hilbert order:", bench(
+        lambda: neighbour_queries(pc, queries), repeat=3).summary())
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+        file_pc = cuds_file.add_particle_container('test')
+        file_pc._append_particles(
+            random_particles(NUMBER_OF_FILE_PARTICLES))
+        table = file_pc._group.particles
+        print("Reading the particles in a box of {} of the side from a "
+              "file of {} particles ({} rows per chunk)".format(
+                  BOX, NUMBER_OF_FILE_PARTICLES, table.chunkshape[0]))
+        for order in ('insertion', 'hilbert', 'morton'):
+            if order != 'insertion':
+                file_pc.reorder(order)
+            rows = box_rows(file_pc)
+            chunks = len(numpy.unique(rows // table.chunkshape[0]))
+            result = bench(lambda: chunked_read(table, rows), repeat=3)
+            print("{} order ({} particles in {} chunks):".format(
+                order, len(rows), chunks), result.summary())
+        cuds_file.close()
+    finally:
+        shutil.rmtree(temp_dir)
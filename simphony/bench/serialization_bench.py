@@ -0,0 +1,73 @@
+from __future__ import print_function
+
+import cPickle
+import pickle
+import random
+import uuid
+
+from simphony.bench.util import bench
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.core.serialization import pack_records, unpack_records
+from simphony.cuds.particles import Particle
+
+
+def create_particle():
+    data = DataContainer({
+        CUBA.MASS: random.random(),
+        CUBA.RADIUS: random.random(),
+        CUBA.MATERIAL_ID: random.randint(0, 10),
+        CUBA.VELOCITY: (random.random(), random.random(), random.random()),
+        CUBA.FORCE: (random.random(), random.random(), random.random())})
+    coordinates = (random.random(), random.random(), random.random())
+    return Particle(coordinates=coordinates, id=uuid.uuid4(), data=data)
+
+
+particles = [create_particle() for i in range(1000)]
+
+pickled = pickle.dumps(particles)
+cpickled = cPickle.dumps(particles, cPickle.HIGHEST_PROTOCOL)
+packed = pack_records(particles)
+
+
+def pickle_round_trip():
+    return pickle.loads(pickle.dumps(particles))
+
+
+def cpickle_round_trip():
+    return cPickle.loads(cPickle.dumps(particles, cPickle.HIGHEST_PROTOCOL))
+
+
+def records_round_trip():
+    return unpack_records(pack_records(particles), Particle.from_bytes)
+
+
+print("""
+Benchmarking the encoding of 1000 particles (with 5 data values each)
+
+""")
+print('Size in bytes:')
+print("pickle:", len(pickled))
+print("cPickle (highest protocol):", len(cpickled))
+print("pack_records:", len(packed))
+print()
+print('Encoding:')
+print("pickle:", bench(lambda: pickle.dumps(particles), repeat=3).summary())
+print(
+    "cPickle (highest protocol):",
+    bench(lambda: cPickle.dumps(
+        particles, cPickle.HIGHEST_PROTOCOL)).summary())
+print("pack_records:", bench(lambda: pack_records(particles)).summary())
+print()
+print('Decoding:')
+print("pickle:", bench(lambda: pickle.loads(pickled), repeat=3).summary())
+print("cPickle (highest protocol):",
+      bench(lambda: cPickle.loads(cpickled)).summary())
+print(
+    "unpack_records:",
+    bench(lambda: unpack_records(packed, Particle.from_bytes)).summary())
+print()
+print('Round trip:')
+print("pickle:", bench(pickle_round_trip, repeat=3).summary())
+print("cPickle (highest protocol):", bench(cpickle_round_trip).summary())
+print("pack_records:", bench(records_round_trip).summary())
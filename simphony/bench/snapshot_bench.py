@@ -0,0 +1,45 @@
+from __future__ import print_function
+
+from simphony.bench.util import bench
+from simphony.cuds.concurrent_particles import ConcurrentParticleContainer
+from simphony.cuds.particles import Particle, ParticleContainer
+
+SIZES = (10000, 100000, 1000000)
+# number of snapshots kept alive (e.g. analyses that are still running)
+LIVE_SNAPSHOTS = 2
+
+
+def create_container(factory, size):
+    container = factory()
+    ids = [container.add_particle(Particle((0.0, 0.0, float(i))))
+           for i in xrange(size)]
+    return container, ids
+
+
+def snapshot_and_write(container, ids, snapshots, step):
+    # one timestep: take a snapshot and update a particle
+    snapshots.append(container.snapshot())
+    del snapshots[:-LIVE_SNAPSHOTS]
+    step[0] += 1
+    container.update_particle(
+        Particle((1.0, 0.0, 0.0), id=ids[step[0] % len(ids)]))
+
+
+def run(factory):
+    for size in SIZES:
+        container, ids = create_container(factory, size)
+        snapshots, step = [], [0]
+        print("  {} particles, snapshot + first write:".format(size), bench(
+            lambda: snapshot_and_write(container, ids, snapshots, step),
+            repeat=5).summary())
+        print("  {} particles, full copy (for comparison):".format(size),
+              bench(lambda: {particle.id: particle for particle in
+                             container._particles.itervalues()},
+                    repeat=3, number=1).summary())
+
+
+if __name__ == '__main__':
+    print("ParticleContainer")
+    run(ParticleContainer)
+    print("ConcurrentParticleContainer")
+    run(ConcurrentParticleContainer)
@@ -0,0 +1,487 @@
+"""Benchmark suite of the cuds containers with regression tracking.
+
+The add, get, update, iter and remove operations are timed on every
+particle container backend (ParticleContainer, ConcurrentParticleContainer
+and FileParticleContainer), together with the points of the Mesh, the
+nodes of the Lattice and the writing and reading of CUDS files, for a
+range of container sizes. The results are written as JSON, and two result
+files can be compared to flag the regressions.
+
+Usage::
+
+    python -m simphony.bench.suite run --sizes 1000,100000 -o results.json
+    python -m simphony.bench.suite compare baseline.json results.json
+
+Each benchmark is set up again for each repeat, and only the operation is
+timed. The get, update, add and remove benchmarks time OPERATIONS calls
+on a container of the given size, while the iter, sweep, write and read
+benchmarks touch every element of the container.
+
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from simphony.bench.util import BenchResult
+from simphony.cuds.concurrent_particles import ConcurrentParticleContainer
+from simphony.cuds.lattice import LatticeNode, make_cubic_lattice
+from simphony.cuds.mesh import Mesh, Point
+from simphony.cuds.particles import Particle, ParticleContainer
+from simphony.io.cuds_file import CudsFile
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+# number of timed calls of the benchmarks of single elements
+OPERATIONS = 1000
+# relative slowdown above which a result is flagged as a regression
+DEFAULT_THRESHOLD = 0.2
+
+_BENCHMARKS = []
+
+
+class Benchmark(object):
+    """ A timed operation on a container of a given size
+
+    Parameters
+    ----------
+    name : str
+        dotted name of the benchmark (e.g. 'particles.ParticleContainer.get')
+    setup : callable
+        called as ``setup(size)``, returns the state of a run
+    run : callable
+        called as ``run(state)``, the timed operation. It returns the
+        number of operations that it performed.
+    teardown : callable, optional
+        called as ``teardown(state)`` after each run
+
+    """
+    def __init__(self, name, setup, run, teardown=None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.teardown = teardown
+
+    def measure(self, size, repeat=DEFAULT_REPEAT):
+        """ Time the benchmark for a container size
+
+        Returns
+        -------
+        dict
+            the name, size, number of operations, the best and mean times
+            of a run, and the best ('per_operation'), median, 95th
+            percentile and standard deviation of the time per operation
+            in seconds
+
+        """
+        times = []
+        for _ in xrange(repeat):
+            state = self.setup(size)
+            try:
+                start = time.time()
+                operations = self.run(state)
+                times.append(time.time() - start)
+            finally:
+                if self.teardown is not None:
+                    self.teardown(state)
+        result = BenchResult(
+            operations, [t / max(operations, 1) for t in times],
+            name=self.name)
+        return {
+            'name': self.name,
+            'size': size,
+            'operations': operations,
+            'repeat': repeat,
+            'best': min(times),
+            'mean': sum(times) / len(times),
+            'per_operation': result.min,
+            'median': result.median,
+            'p95': result.p95,
+            'stdev': result.stdev}
+
+
+def register(name, setup, run, teardown=None):
+    """ Add a benchmark to the suite
+
+    """
+    _BENCHMARKS.append(Benchmark(name, setup, run, teardown))
+
+
+def benchmarks(pattern='*'):
+    """ The benchmarks of the suite whose names match the (glob) pattern
+
+    """
+    return [benchmark for benchmark in _BENCHMARKS
+            if fnmatch.fnmatch(benchmark.name, pattern)]
+
+
+def run_suite(sizes=DEFAULT_SIZES, pattern='*', repeat=DEFAULT_REPEAT,
+              stream=None):
+    """ Run the benchmarks of the suite
+
+    Parameters
+    ----------
+    sizes : sequence of int
+        the container sizes
+    pattern : str
+        glob pattern of the names of the benchmarks to run
+    repeat : int
+        number of runs of each benchmark (the best one is reported)
+    stream : file, optional
+        where the progress is printed
+
+    Returns
+    -------
+    dict
+        the description of the machine ('machine') and the results
+        ('results') of the benchmarks
+
+    """
+    results = []
+    for benchmark in benchmarks(pattern):
+        for size in sizes:
+            result = benchmark.measure(size, repeat)
+            results.append(result)
+            if stream is not None:
+                print(_format_result(result), file=stream)
+    return {
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'date': datetime.datetime.now().isoformat()},
+        'results': results}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """ Compare the per operation times of two runs of the suite
+
+    Parameters
+    ----------
+    baseline, current : dict
+        results of run_suite (e.g. loaded from the JSON files)
+    threshold : float
+        relative slowdown (e.g. 0.2 for 20%) above which a benchmark is
+        flagged as a regression (and relative speedup above which it is
+        flagged as an improvement)
+
+    Returns
+    -------
+    list of tuple
+        (name, size, baseline time, current time, ratio, status) for the
+        benchmarks found in both runs, where status is 'regression',
+        'improvement' or 'ok'
+
+    """
+    old = {(result['name'], result['size']): result['per_operation']
+           for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        key = (result['name'], result['size'])
+        if key not in old:
+            continue
+        before, after = old[key], result['per_operation']
+        ratio = after / before if before > 0 else float('inf')
+        if ratio > 1.0 + threshold:
+            status = 'regression'
+        elif ratio < 1.0 / (1.0 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append(key + (before, after, ratio, status))
+    return rows
+
+
+def _format_result(result):
+    return '{name} size={size}: {per_operation:.3e} sec per operation ' \
+        '({operations} operations, best of {repeat}: {best:f} sec)'.format(
+            **result)
+
+
+# Particle containers #######################################################
+
+def _sample(size):
+    return random.sample(xrange(size), min(size, OPERATIONS))
+
+
+def _make_particles(start, stop):
+    return (Particle(coordinates=(0.0, 1.1, 2.2), id=i)
+            for i in xrange(start, stop))
+
+
+def _memory_container(cls):
+    def setup(size):
+        container = cls()
+        for particle in _make_particles(0, size):
+            container.add_particle(particle)
+        return {'container': container, 'size': size, 'ids': _sample(size)}
+    return setup
+
+
+def _file_container(size):
+    temp_dir = tempfile.mkdtemp()
+    cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+    container = cuds_file.add_particle_container('test')
+    container._append_particles(_make_particles(0, size))
+    cuds_file.flush()
+    return {'container': container, 'size': size, 'ids': _sample(size),
+            'file': cuds_file, 'temp_dir': temp_dir}
+
+
+def _close_file(state):
+    state['file'].close()
+    shutil.rmtree(state['temp_dir'])
+
+
+def _add_particles(state):
+    size = state['size']
+    for particle in _make_particles(size, size + OPERATIONS):
+        state['container'].add_particle(particle)
+    return OPERATIONS
+
+
+def _get_particles(state):
+    container = state['container']
+    for id in state['ids']:
+        container.get_particle(id)
+    return len(state['ids'])
+
+
+def _update_particles(state):
+    container = state['container']
+    for id in state['ids']:
+        container.update_particle(
+            Particle(coordinates=(1.0, 1.1, 2.2), id=id))
+    return len(state['ids'])
+
+
+def _iter_particles(state):
+    count = 0
+    for particle in state['container'].iter_particles():
+        count += 1
+    return count
+
+
+def _remove_particles(state):
+    container = state['container']
+    for id in state['ids']:
+        container.remove_particle(id)
+    return len(state['ids'])
+
+
+for _cls in (ParticleContainer, ConcurrentParticleContainer):
+    for _operation, _run in (('add', _add_particles),
+                             ('get', _get_particles),
+                             ('update', _update_particles),
+                             ('iter', _iter_particles),
+                             ('remove', _remove_particles)):
+        register('particles.{}.{}'.format(_cls.__name__, _operation),
+                 _memory_container(_cls), _run)
+
+for _operation, _run in (('add', _add_particles),
+                         ('get', _get_particles),
+                         ('update', _update_particles),
+                         ('iter', _iter_particles),
+                         ('remove', _remove_particles)):
+    register('particles.FileParticleContainer.{}'.format(_operation),
+             _file_container, _run, _close_file)
+
+
+# CUDS files ################################################################
+
+def _file_with_source(size):
+    source = ParticleContainer()
+    for particle in _make_particles(0, size):
+        source.add_particle(particle)
+    temp_dir = tempfile.mkdtemp()
+    return {'source': source, 'size': size, 'temp_dir': temp_dir,
+            'filename': os.path.join(temp_dir, 'test.cuds')}
+
+
+def _written_file(size):
+    state = _file_with_source(size)
+    _write_file(state)
+    return state
+
+
+def _remove_temp_dir(state):
+    shutil.rmtree(state['temp_dir'])
+
+
+def _write_file(state):
+    cuds_file = CudsFile.open(state['filename'], mode='w')
+    cuds_file.add_particle_container('test', state['source'])
+    cuds_file.close()
+    return state['size']
+
+
+def _read_file(state):
+    cuds_file = CudsFile.open(state['filename'], mode='r')
+    container = cuds_file.get_particle_container('test')
+    count = sum(1 for particle in container.iter_particles())
+    cuds_file.close()
+    return count
+
+
+register('file.write', _file_with_source, _write_file, _remove_temp_dir)
+register('file.read', _written_file, _read_file, _remove_temp_dir)
+
+
+# Mesh ######################################################################
+
+def _mesh(size):
+    mesh = Mesh()
+    uuids = [mesh.add_point(Point((0.0, 1.1, 2.2))) for _ in xrange(size)]
+    return {'mesh': mesh, 'ids': random.sample(uuids, min(size, OPERATIONS))}
+
+
+def _add_points(state):
+    mesh = state['mesh']
+    for _ in xrange(OPERATIONS):
+        mesh.add_point(Point((0.0, 1.1, 2.2)))
+    return OPERATIONS
+
+
+def _get_points(state):
+    mesh = state['mesh']
+    for uuid in state['ids']:
+        mesh.get_point(uuid)
+    return len(state['ids'])
+
+
+def _update_points(state):
+    mesh = state['mesh']
+    for uuid in state['ids']:
+        mesh.update_point(Point((1.0, 1.1, 2.2), uuid=uuid))
+    return len(state['ids'])
+
+
+def _iter_points(state):
+    return sum(1 for point in state['mesh'].iter_points())
+
+
+register('mesh.points.add', _mesh, _add_points)
+register('mesh.points.get', _mesh, _get_points)
+register('mesh.points.update', _mesh, _update_points)
+register('mesh.points.iter', _mesh, _iter_points)
+
+
+# Lattice ###################################################################
+
+def _lattice(size):
+    # a cubic lattice with (about) 'size' nodes
+    side = max(1, int(round(size ** (1.0 / 3))))
+    lattice = make_cubic_lattice('test', 0.1, (side, side, side))
+    number_of_nodes = side ** 3
+    ids = [(i // (side * side), (i // side) % side, i % side)
+           for i in _sample(number_of_nodes)]
+    return {'lattice': lattice, 'ids': ids}
+
+
+def _get_nodes(state):
+    lattice = state['lattice']
+    for id in state['ids']:
+        lattice.get_node(id)
+    return len(state['ids'])
+
+
+def _update_nodes(state):
+    lattice = state['lattice']
+    for id in state['ids']:
+        lattice.update_node(LatticeNode(id))
+    return len(state['ids'])
+
+
+def _iter_nodes(state):
+    return sum(1 for node in state['lattice'].iter_nodes())
+
+
+def _sweep_nodes(state):
+    # read and write back every node of the lattice
+    lattice = state['lattice']
+    count = 0
+    for node in lattice.iter_nodes():
+        lattice.update_node(node)
+        count += 1
+    return count
+
+
+register('lattice.get', _lattice, _get_nodes)
+register('lattice.update', _lattice, _update_nodes)
+register('lattice.iter', _lattice, _iter_nodes)
+register('lattice.sweep', _lattice, _sweep_nodes)
+
+
+# Command line ##############################################################
+
+def main(argv=None, stream=None):
+    """ Run the command line (argv) and return the exit status
+
+    The progress and the report are printed to 'stream' (the standard
+    output by default).
+
+    """
+    if stream is None:
+        stream = sys.stdout
+    parser = argparse.ArgumentParser(
+        description='Benchmark suite of the cuds containers')
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument(
+        '--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+        help='comma separated container sizes (default: %(default)s)')
+    run_parser.add_argument(
+        '--match', default='*',
+        help='glob pattern of the benchmark names (default: %(default)s)')
+    run_parser.add_argument(
+        '--repeat', type=int, default=DEFAULT_REPEAT,
+        help='runs of each benchmark (default: %(default)s)')
+    run_parser.add_argument(
+        '-o', '--output', help='JSON file where the results are written')
+
+    compare_parser = commands.add_parser(
+        'compare', help='compare the results with a baseline')
+    compare_parser.add_argument('baseline', help='JSON file of the baseline')
+    compare_parser.add_argument('current', help='JSON file of the results')
+    compare_parser.add_argument(
+        '--threshold', type=float, default=DEFAULT_THRESHOLD,
+        help='relative slowdown flagged as regression (default: '
+        '%(default)s)')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        sizes = [int(size) for size in args.sizes.split(',')]
+        results = run_suite(sizes, args.match, args.repeat, stream)
+        if args.output is not None:
+            with open(args.output, 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+        return 0
+    else:
+        with open(args.baseline) as baseline:
+            baseline = json.load(baseline)
+        with open(args.current) as current:
+            current = json.load(current)
+        rows = compare(baseline, current, args.threshold)
+        for name, size, before, after, ratio, status in rows:
+            print('{:<45} {:>9} {:.3e} -> {:.3e} x{:.2f} {}'.format(
+                name, size, before, after, ratio,
+                status.upper() if status == 'regression' else status),
+                file=stream)
+        regressions = sum(1 for row in rows if row[-1] == 'regression')
+        print('{} regressions in {} benchmarks'.format(
+            regressions, len(rows)), file=stream)
+        return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
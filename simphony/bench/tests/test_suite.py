@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+from simphony.bench.suite import benchmarks, compare, main, run_suite
+
+
+def _results(*times):
+    return {'results': [
+        {'name': name, 'size': size, 'per_operation': per_operation}
+        for name, size, per_operation in times]}
+
+
+class TestSuite(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_every_backend_is_benchmarked(self):
+        names = [benchmark.name for benchmark in benchmarks()]
+        for backend in ('ParticleContainer', 'ConcurrentParticleContainer',
+                        'FileParticleContainer'):
+            for operation in ('add', 'get', 'update', 'iter', 'remove'):
+                self.assertIn(
+                    'particles.{}.{}'.format(backend, operation), names)
+        self.assertEqual(len(benchmarks('lattice.*')), 4)
+
+    def test_run_suite(self):
+        results = run_suite(sizes=[10], pattern='particles.*.get', repeat=1)
+        self.assertIn('python', results['machine'])
+        self.assertEqual(len(results['results']), 3)
+        for result in results['results']:
+            self.assertEqual(result['size'], 10)
+            self.assertEqual(result['operations'], 10)
+            self.assertGreaterEqual(result['best'], 0.0)
+
+    def test_compare(self):
+        baseline = _results(('a', 10, 1.0), ('b', 10, 1.0), ('c', 10, 1.0),
+                            ('d', 10, 1.0))
+        current = _results(('a', 10, 1.5), ('b', 10, 1.1), ('c', 10, 0.5),
+                           ('e', 10, 1.0))
+        rows = compare(baseline, current, threshold=0.2)
+        self.assertEqual(
+            [(row[0], row[-1]) for row in rows],
+            [('a', 'regression'), ('b', 'ok'), ('c', 'improvement')])
+
+    def test_command_line(self):
+        baseline = os.path.join(self.temp_dir, 'baseline.json')
+        current = os.path.join(self.temp_dir, 'current.json')
+        with open(baseline, 'w') as output:
+            json.dump(_results(('a', 10, 1.0)), output)
+        with open(current, 'w') as output:
+            json.dump(_results(('a', 10, 2.0)), output)
+        stream = StringIO()
+        self.assertEqual(
+            main(['compare', baseline, baseline], stream=stream), 0)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('a '))
+        self.assertIn('x1.00 ok', lines[0])
+        self.assertEqual(lines[1], '0 regressions in 1 benchmarks')
+
+        stream = StringIO()
+        self.assertEqual(
+            main(['compare', baseline, current], stream=stream), 1)
+        lines = stream.getvalue().splitlines()
+        self.assertIn('1.000e+00 -> 2.000e+00 x2.00 REGRESSION', lines[0])
+        self.assertEqual(lines[1], '1 regressions in 1 benchmarks')
+
+    def test_command_line_run(self):
+        output = os.path.join(self.temp_dir, 'results.json')
+        stream = StringIO()
+        self.assertEqual(main(
+            ['run', '--sizes', '10', '--match', 'lattice.iter',
+             '--repeat', '1', '-o', output], stream=stream), 0)
+        self.assertIn('lattice.iter', stream.getvalue())
+        with open(output) as results:
+            self.assertEqual(
+                [result['name'] for result in json.load(results)['results']],
+                ['lattice.iter'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import unittest
+
+from simphony.bench import util
+from simphony.bench.util import BenchResult, bench, bench_cases
+
+
+class TestBenchResult(unittest.TestCase):
+
+    def test_statistics(self):
+        result = BenchResult(10, [4.0, 1.0, 3.0, 2.0, 5.0], name='test')
+        self.assertEqual(result.repeat, 5)
+        self.assertEqual(result.min, 1.0)
+        self.assertEqual(result.max, 5.0)
+        self.assertEqual(result.median, 3.0)
+        self.assertAlmostEqual(result.p95, 4.8)
+        self.assertEqual(result.mean, 3.0)
+        self.assertAlmostEqual(result.stdev, 2.5 ** 0.5)
+        self.assertEqual(result.ops_per_sec, 1.0)
+        self.assertEqual(result.as_dict()['name'], 'test')
+
+    def test_classic_report(self):
+        result = BenchResult(100, [0.5, 0.25])
+        self.assertEqual(
+            str(result), '100 calls, best of 2 repeats: 0.250000 sec per call')
+        self.assertIn('median 0.375000', result.summary())
+
+
+class TestBench(unittest.TestCase):
+
+    def test_bench_callable(self):
+        calls = []
+        result = bench(lambda: calls.append(1), number=10, repeat=3,
+                       warmup=2)
+        self.assertEqual(result.number, 10)
+        self.assertEqual(len(result.times), 3)
+        self.assertEqual(len(calls), 32)
+        self.assertIsNone(result.allocations)
+
+    def test_bench_string(self):
+        result = bench('x.append(1)', 'x = []', number=5, repeat=2,
+                       disable_gc=False)
+        self.assertEqual(result.repeat, 2)
+
+    def test_allocations(self):
+        kept = []
+        result = bench(lambda: kept.append([]), number=1, repeat=1,
+                       allocations=True)
+        self.assertEqual(result.allocations, 1.0)
+
+    def test_allocations_of_string_with_callable_setup(self):
+        setups = []
+        result = bench('[]', lambda: setups.append(1), number=1, repeat=1,
+                       allocations=True)
+        self.assertLess(result.allocations, 1.0)
+        # the setup ran before the timing and before the counting
+        self.assertEqual(len(setups), 3)
+
+    def test_isolated_process_exits(self):
+        default_interval = util.ISOLATED_POLL_INTERVAL
+        util.ISOLATED_POLL_INTERVAL = 0.05
+        try:
+            with self.assertRaises(RuntimeError):
+                bench(lambda: os._exit(3), number=1, repeat=1, isolate=True)
+        finally:
+            util.ISOLATED_POLL_INTERVAL = default_interval
+
+    def test_isolated(self):
+        calls = []
+        result = bench(lambda: calls.append(1), number=10, repeat=2,
+                       isolate=True)
+        self.assertEqual(result.number, 10)
+        # the statement ran in the child process only
+        self.assertEqual(calls, [])
+
+    def test_bench_cases(self):
+        results = bench_cases(
+            lambda n: (lambda: range(n)), [1, 10], number=2, repeat=2,
+            name='range')
+        self.assertEqual(list(results), [1, 10])
+        self.assertEqual(results[10].name, 'range[10]')
+
+
+if __name__ == '__main__':
+    unittest.main()
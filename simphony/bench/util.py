@@ -1,18 +1,271 @@
 from __future__ import print_function
+
+import gc
+import math
+import multiprocessing
+from collections import OrderedDict
+from Queue import Empty
 from timeit import Timer
 
+# seconds between the checks that an isolated benchmark process is alive
+ISOLATED_POLL_INTERVAL = 1.0
+
+
+class BenchResult(object):
+    """ The timings of a benchmarked statement
 
-def bench(stmt='pass', setup='pass', repeat=5):
-    """ BenchMark the function.
+    Converting the result to a string gives the classic one line report
+    (e.g. '100 calls, best of 5 repeats: 0.000012 sec per call').
+
+    Attributes
+    ----------
+    name : str
+        name of the benchmark (or None)
+    number : int
+        number of calls of the statement in each repeat
+    repeat : int
+        number of repeats
+    times : list of float
+        the time per call (in seconds) of each repeat
+    allocations : float
+        net number of objects tracked by the garbage collector that were
+        created by each call (None if not measured)
 
     """
+    def __init__(self, number, times, allocations=None, name=None):
+        self.name = name
+        self.number = number
+        self.repeat = len(times)
+        self.times = list(times)
+        self.allocations = allocations
+
+    @property
+    def min(self):
+        """ The best time per call """
+        return min(self.times)
+
+    @property
+    def max(self):
+        """ The worst time per call """
+        return max(self.times)
+
+    @property
+    def median(self):
+        """ The median time per call """
+        return self.percentile(50)
+
+    @property
+    def p95(self):
+        """ The 95th percentile of the time per call """
+        return self.percentile(95)
+
+    @property
+    def mean(self):
+        """ The mean time per call """
+        return sum(self.times) / len(self.times)
+
+    @property
+    def stdev(self):
+        """ The (sample) standard deviation of the time per call """
+        if len(self.times) < 2:
+            return 0.0
+        mean = self.mean
+        return math.sqrt(
+            sum((time - mean) ** 2 for time in self.times) /
+            (len(self.times) - 1))
+
+    @property
+    def ops_per_sec(self):
+        """ The number of calls per second (for the best time) """
+        return 1.0 / self.min if self.min > 0 else float('inf')
+
+    def percentile(self, percent):
+        """ The percentile of the time per call (linear interpolation)
+
+        """
+        times = sorted(self.times)
+        position = (len(times) - 1) * percent / 100.0
+        low = int(math.floor(position))
+        high = min(low + 1, len(times) - 1)
+        return times[low] + (times[high] - times[low]) * (position - low)
+
+    def as_dict(self):
+        """ The result and its statistics as a (JSON serializable) dict
+
+        """
+        return OrderedDict([
+            ('name', self.name), ('number', self.number),
+            ('repeat', self.repeat), ('min', self.min),
+            ('median', self.median), ('p95', self.p95),
+            ('mean', self.mean), ('stdev', self.stdev),
+            ('ops_per_sec', self.ops_per_sec),
+            ('allocations', self.allocations), ('times', self.times)])
+
+    def summary(self):
+        """ One line report with the statistics of the result
+
+        """
+        message = (
+            '{number} calls x {repeat} repeats: min {min:.6f}, median '
+            '{median:.6f}, p95 {p95:.6f}, stdev {stdev:.6f} sec per call '
+            '({ops_per_sec:.1f} ops/s')
+        if self.allocations is not None:
+            message += ', {allocations:.1f} objects per call'
+        return (message + ')').format(**self.as_dict())
+
+    def __str__(self):
+        message = '{} calls, best of {} repeats: {:f} sec per call'
+        return message.format(self.number, self.repeat, self.min)
+
+    def __repr__(self):
+        return '<BenchResult {}>'.format(self.summary())
+
+
+def bench(stmt='pass', setup='pass', repeat=5, number=None, warmup=1,
+          disable_gc=True, allocations=False, isolate=False, name=None):
+    """ Benchmark a statement
+
+    Parameters
+    ----------
+    stmt : callable or str
+        the statement to time
+    setup : callable or str
+        executed once before each repeat (it is not timed)
+    repeat : int
+        number of timed repeats
+    number : int, optional
+        number of calls in each repeat. By default it is the smallest
+        power of ten that makes a repeat last more than 0.2 seconds.
+    warmup : int
+        number of untimed calls before the timing starts
+    disable_gc : bool
+        disable the garbage collector while timing (the default, so that
+        a collection does not fall in a random repeat)
+    allocations : bool
+        also count the net number of objects (tracked by the garbage
+        collector) that each call creates
+    isolate : bool
+        run the benchmark in a forked child process, so that the state
+        of the interpreter (heap, caches, garbage) left by the previous
+        benchmarks does not interfere
+
+    Returns
+    -------
+    BenchResult
+        the timings (its string is the classic one line report)
+
+    """
+    if isolate:
+        return _run_isolated(
+            bench, stmt, setup, repeat=repeat, number=number, warmup=warmup,
+            disable_gc=disable_gc, allocations=allocations, name=name)
+
+    if not disable_gc:
+        setup = _with_gc(setup)
     timer = Timer(stmt, setup)
-    for i in range(100):
-        number = 10**i
-        time = timer.timeit(number)
-        if time > 0.2:
-            break
+    if warmup > 0:
+        timer.timeit(warmup)
+
+    if number is None:
+        for i in range(10):
+            number = 10 ** i
+            if timer.timeit(number) > 0.2:
+                break
+
+    times = [timer.timeit(number) / number for i in range(repeat)]
+    objects = _count_allocations(stmt, setup) if allocations else None
+    return BenchResult(number, times, objects, name)
+
+
+def bench_cases(cases, params, **kwargs):
+    """ Benchmark a parametrized statement
+
+    Parameters
+    ----------
+    cases : callable
+        called with each parameter, returns the statement to time (or a
+        (stmt, setup) pair)
+    params : sequence
+        the parameters
+    kwargs :
+        the options of bench
+
+    Returns
+    -------
+    OrderedDict
+        parameter -> BenchResult
 
-    times = [timer.timeit(number) for i in range(repeat)]
-    message = '{} calls, best of {} repeats: {:f} sec per call'
-    return message.format(number, repeat, min(times)/number)
+    """
+    name = kwargs.pop('name', None)
+    results = OrderedDict()
+    for param in params:
+        case = cases(param)
+        stmt, setup = case if isinstance(case, tuple) else (case, 'pass')
+        results[param] = bench(
+            stmt, setup, name='{}[{}]'.format(name, param) if name else
+            str(param), **kwargs)
+    return results
+
+
+def _with_gc(setup):
+    if callable(setup):
+        def setup_with_gc():
+            setup()
+            gc.enable()
+        return setup_with_gc
+    return setup + '\nimport gc\ngc.enable()'
+
+
+def _count_allocations(stmt, setup):
+    # as in timeit, the statement and the setup can each be a callable
+    # or a string (executed in the same namespace)
+    namespace = {}
+    if callable(setup):
+        setup()
+    else:
+        exec setup in namespace
+    if not callable(stmt):
+        code = compile(stmt, '<bench>', 'exec')
+        stmt = lambda: eval(code, namespace)  # noqa
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        calls = 10
+        before = len(gc.get_objects())
+        for _ in xrange(calls):
+            stmt()
+        return float(len(gc.get_objects()) - before) / calls
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _run_isolated(function, *args, **kwargs):
+    # the statements do not need to be picklable, since the child process
+    # is forked and only the result is sent back
+    queue = multiprocessing.Queue()
+
+    def target():
+        try:
+            queue.put((True, function(*args, **kwargs)))
+        except Exception as error:
+            queue.put((False, error))
+
+    process = multiprocessing.Process(target=target)
+    process.start()
+    while True:
+        try:
+            succeeded, result = queue.get(timeout=ISOLATED_POLL_INTERVAL)
+            break
+        except Empty:
+            # the result of a child that has exited is already in the pipe
+            if not process.is_alive() and queue.empty():
+                process.join()
+                raise RuntimeError(
+                    'The benchmark process exited without a result (exit '
+                    'code {})'.format(process.exitcode))
+    process.join()
+    if not succeeded:
+        raise result
+    return result
@@ -1,3 +1,4 @@
+from simphony.core import instrumentation, serialization
 from simphony.core.cuba import CUBA
 
 _CUBA_MEMBERS = CUBA.__members__
@@ -28,6 +29,9 @@ class DataContainer(dict):
         Initialization follows the behaviour of the python dict class.
 
         """
+        if not args and not kwargs:
+            # Fast path for the empty container.
+            return
         self._check_arguments(args, kwargs)
         if len(args) == 1 and not hasattr(args[0], 'keys'):
             super(DataContainer, self).__init__()
@@ -74,6 +78,34 @@ class DataContainer(dict):
         super(DataContainer, self).update(
             {CUBA[kwarg]: value for kwarg, value in kwargs.viewitems()})
 
+    def to_bytes(self):
+        """ Return a compact binary representation of the container.
+
+        The CUBA keys are encoded as their integer value.
+
+        """
+        return serialization.pack_items(self)
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """ Create a DataContainer from the output of ``to_bytes``.
+
+        """
+        items, _ = serialization.unpack_items(buffer)
+        return cls._from_items(items)
+
+    @classmethod
+    def _from_items(cls, items):
+        """ Create a DataContainer from trusted (CUBA key, value) pairs.
+
+        The keys are not validated, the caller is responsible to provide
+        only CUBA members.
+
+        """
+        container = dict.__new__(cls)
+        dict.update(container, items)
+        return container
+
     def _check_arguments(self, args, kwargs):
         """ Check for the right arguments.
 
@@ -87,3 +119,7 @@ class DataContainer(dict):
         if len(args) > 1:
             message = 'DataContainer expected at most 1 arguments, got {}'
             raise TypeError(message.format(len(args)))
+
+
+instrumentation.instrument(
+    DataContainer, ('__init__', '__setitem__', 'update', 'from_bytes'))
@@ -0,0 +1,246 @@
+""" Optional instrumentation of the operations of the containers
+
+The modules of the containers register their operations (e.g. the add,
+get, update, iter, remove and flush methods) with ``instrument``. While
+the instrumentation is disabled (the default) the registered methods are
+left untouched, so there is no overhead at all. ``enable`` replaces them
+with wrappers that count the calls and time them (the iterators that they
+return are timed and counted while they are consumed), and ``disable``
+restores the original methods.
+
+Only the calls made at the outermost level (in each thread) are counted
+as calls and timed. The instrumented operations that are called by
+another one (e.g. ``add_particle`` by ``add_particles``) are counted as
+'nested_calls' of their own operation instead, since their time is
+already part of the time of the outer operation.
+
+The file backends also report the number of bytes that they read and
+write with ``add_bytes``.
+
+The counters are returned by ``stats`` (also available as
+``simphony.stats``) as a plain dictionary that can be serialized to JSON,
+and callbacks registered with ``register_callback`` are called after each
+instrumented operation.
+
+Example
+-------
+>>> from simphony.core import instrumentation
+>>> instrumentation.enable()
+>>> ...  # use the containers
+>>> instrumentation.stats()['ParticleContainer.add_particle']
+{'calls': 1000, 'time': 0.012, 'items': 0, 'nested_calls': 0,
+ 'bytes_read': 0, 'bytes_written': 0}
+
+"""
+import functools
+import threading
+import time
+import types
+
+# (owner class, attribute name, operation name) of the registered methods
+_operations = []
+# (owner class, attribute name) -> original attribute of the wrapped methods
+_originals = {}
+_callbacks = []
+_counters = {}
+_lock = threading.Lock()
+# the 'depth' of the instrumented operations running in each thread
+_local = threading.local()
+_enabled = False
+
+
+def instrument(owner, attributes, prefix=None):
+    """ Register methods (or class and static methods) of a class
+
+    Parameters
+    ----------
+    owner : type
+        the class that defines the methods
+    attributes : sequence of str
+        the names of the methods
+    prefix : str, optional
+        prefix of the operation names (the class name by default), the
+        operations are named '<prefix>.<attribute>'
+
+    """
+    prefix = owner.__name__ if prefix is None else prefix
+    for attribute in attributes:
+        if attribute not in owner.__dict__:
+            raise ValueError(
+                '{} does not define {}'.format(owner.__name__, attribute))
+        operation = (owner, attribute, '{}.{}'.format(prefix, attribute))
+        _operations.append(operation)
+        if _enabled:
+            _wrap(*operation)
+
+
+def enable():
+    """ Start collecting the statistics of the registered operations
+
+    """
+    global _enabled
+    if not _enabled:
+        for operation in _operations:
+            _wrap(*operation)
+        _enabled = True
+
+
+def disable():
+    """ Stop collecting statistics and restore the original methods
+
+    The collected statistics are kept (see reset).
+
+    """
+    global _enabled
+    if _enabled:
+        for (owner, attribute), original in _originals.items():
+            setattr(owner, attribute, original)
+        _originals.clear()
+        _enabled = False
+
+
+def is_enabled():
+    """ Checks if the statistics are collected
+
+    """
+    return _enabled
+
+
+def reset():
+    """ Forget the collected statistics
+
+    """
+    with _lock:
+        _counters.clear()
+
+
+def stats():
+    """ The statistics collected since the last reset
+
+    Returns
+    -------
+    dict
+        operation name -> dict with the number of outermost 'calls',
+        their total 'time' in seconds, the number of 'items' yielded by
+        the iterators that they returned, the number of 'nested_calls'
+        (made by other instrumented operations) and the 'bytes_read'
+        and 'bytes_written'
+
+    """
+    with _lock:
+        return {name: dict(counter) for name, counter in _counters.items()}
+
+
+def register_callback(callback):
+    """ Call 'callback(name, elapsed)' after each instrumented operation
+
+    The callbacks are only called while the instrumentation is enabled
+    and only for the outermost calls.
+    For the operations that return an iterator, the callback is called
+    when the iterator is exhausted (or closed) with the total time.
+
+    """
+    _callbacks.append(callback)
+
+
+def unregister_callback(callback):
+    """ Remove a callback that was added with register_callback
+
+    """
+    _callbacks.remove(callback)
+
+
+def add_bytes(name, read=0, written=0):
+    """ Count bytes read and written by an operation (if enabled)
+
+    """
+    if _enabled:
+        with _lock:
+            counter = _counter(name)
+            counter['bytes_read'] += read
+            counter['bytes_written'] += written
+
+
+def _counter(name):
+    counter = _counters.get(name)
+    if counter is None:
+        counter = _counters[name] = {
+            'calls': 0, 'time': 0.0, 'items': 0, 'nested_calls': 0,
+            'bytes_read': 0, 'bytes_written': 0}
+    return counter
+
+
+def _record(name, elapsed, items=0, nested=False):
+    with _lock:
+        counter = _counter(name)
+        if nested:
+            counter['nested_calls'] += 1
+            return
+        counter['calls'] += 1
+        counter['time'] += elapsed
+        counter['items'] += items
+    for callback in _callbacks:
+        callback(name, elapsed)
+
+
+def _enter():
+    """ Enter an instrumented operation, returns True if it is nested
+
+    """
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    return depth > 0
+
+
+def _exit():
+    _local.depth -= 1
+
+
+def _wrap(owner, attribute, name):
+    if (owner, attribute) in _originals:
+        return
+    original = owner.__dict__[attribute]
+    _originals[(owner, attribute)] = original
+    if isinstance(original, (classmethod, staticmethod)):
+        wrapper = type(original)(_timed(original.__func__, name))
+    else:
+        wrapper = _timed(original, name)
+    setattr(owner, attribute, wrapper)
+
+
+def _timed(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nested = _enter()
+        try:
+            start = time.time()
+            result = func(*args, **kwargs)
+            elapsed = time.time() - start
+        finally:
+            _exit()
+        if isinstance(result, types.GeneratorType):
+            return _timed_iterator(result, name, elapsed, nested)
+        _record(name, elapsed, nested=nested)
+        return result
+    return wrapper
+
+
+def _timed_iterator(iterator, name, elapsed, nested):
+    # the operations called while the iterator is advanced are nested in
+    # it, whoever consumes it
+    items = 0
+    try:
+        while True:
+            _enter()
+            start = time.time()
+            try:
+                item = next(iterator)
+            finally:
+                elapsed += time.time() - start
+                _exit()
+            items += 1
+            yield item
+    except StopIteration:
+        pass
+    finally:
+        _record(name, elapsed, items=items, nested=nested)
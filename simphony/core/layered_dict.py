@@ -0,0 +1,190 @@
+""" Mapping stored as a stack of layers, with O(1) read-only views
+
+Used by the particle containers to take snapshots without copying their
+storage: a view shares the layers of the mapping, which are frozen, and
+the writes that follow go to a new top layer.
+
+"""
+
+# the value of the keys that are removed while a lower layer holds them
+_REMOVED = object()
+# the value of the keys that are not in a layer
+_MISSING = object()
+
+
+class LayeredDict(object):
+    """ Mapping made of layers, looked up from the top layer down
+
+    Only the top layer is modified. The lower layers are frozen, they can
+    be shared with the views returned by ``freeze``: taking a view and the
+    writes that follow cost O(1), whatever the size of the mapping. The
+    keys that are removed while a lower layer holds them are marked with
+    a tombstone in the top layer.
+
+    ``compact`` bounds the number of layers: the frozen layers are merged
+    (into new dictionaries, so the views are not affected) when a layer
+    is at least half as large as the one below it, so each entry is
+    copied O(log N) times, and the bottom layer is rebuilt when the upper
+    layers hold half as many entries, which costs O(1) per write
+    (amortized). Once no view holds the layers, ``collapse`` applies them
+    in place to the bottom layer.
+
+    Parameters
+    ----------
+    items : dict, optional
+        the bottom layer (it is used as is, not copied)
+
+    """
+    def __init__(self, items=None):
+        self.layers = [items if items is not None else {}]
+        self._size = len(self.layers[0])
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _REMOVED
+
+    def __iter__(self):
+        return self.iterkeys()
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is _REMOVED:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        """ Return the value of the key (or default if it is missing)
+
+        """
+        value = self._lookup(key)
+        return default if value is _REMOVED else value
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._size += 1
+        self.layers[-1][key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._size -= 1
+        if len(self.layers) == 1:
+            del self.layers[0][key]
+        else:
+            self.layers[-1][key] = _REMOVED
+
+    def iteritems(self):
+        """ Iterate over the (key, value) pairs
+
+        """
+        if len(self.layers) == 1:
+            for item in self.layers[0].iteritems():
+                yield item
+            return
+        # the keys of the upper layers hide the ones of the lower layers
+        seen = set()
+        for layer in reversed(self.layers[1:]):
+            for key, value in layer.iteritems():
+                if key not in seen:
+                    seen.add(key)
+                    if value is not _REMOVED:
+                        yield key, value
+        for key, value in self.layers[0].iteritems():
+            if key not in seen:
+                yield key, value
+
+    def iterkeys(self):
+        """ Iterate over the keys
+
+        """
+        return (key for key, _ in self.iteritems())
+
+    def itervalues(self):
+        """ Iterate over the values
+
+        """
+        return (value for _, value in self.iteritems())
+
+    def keys(self):
+        return list(self.iterkeys())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def copy(self):
+        """ A plain dictionary with the same items
+
+        """
+        return dict(self.iteritems())
+
+    def freeze(self):
+        """ Return a view of the current items, in O(1)
+
+        The view shares the layers, so it should not be modified. The top
+        layer is frozen with them and a new empty top layer is used for
+        the next writes.
+
+        """
+        view = LayeredDict.__new__(LayeredDict)
+        view._size = self._size
+        if len(self.layers) > 1 and len(self.layers[-1]) == 0:
+            # the empty top layer does not need to be shared
+            view.layers = self.layers[:-1]
+        else:
+            view.layers = list(self.layers)
+            self.layers.append({})
+        return view
+
+    def compact(self):
+        """ Merge the frozen layers (see the class documentation)
+
+        """
+        if len(self.layers) < 3:
+            return
+        base, top = self.layers[0], self.layers[-1]
+        deltas = self.layers[1:-1]
+        while len(deltas) > 1 and 2 * len(deltas[-1]) >= len(deltas[-2]):
+            merged = dict(deltas[-2])
+            merged.update(deltas[-1])
+            deltas[-2:] = [merged]
+        if 2 * sum(len(delta) for delta in deltas) >= len(base):
+            base = dict(base)
+            for delta in deltas:
+                _apply(base, delta)
+            deltas = []
+        self.layers = [base] + deltas + [top]
+
+    def collapse(self):
+        """ Return the items as a single dictionary
+
+        The upper layers are applied in place to the bottom layer, so no
+        view should hold the layers any more.
+
+        """
+        base = self.layers[0]
+        for layer in self.layers[1:]:
+            _apply(base, layer)
+        self.layers = [base]
+        return base
+
+    def _lookup(self, key):
+        # the value of the key, _REMOVED if it is missing
+        for layer in reversed(self.layers):
+            value = layer.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        return _REMOVED
+
+
+def _apply(base, layer):
+    # write the items (and the removals) of an upper layer to a lower one
+    for key, value in layer.iteritems():
+        if value is _REMOVED:
+            base.pop(key, None)
+        else:
+            base[key] = value
@@ -0,0 +1,90 @@
+""" Bounded mapping that discards the least recently used items
+
+The cache is used to keep a limited number of objects (e.g. the handles of
+the containers of a CUDS file) alive, while giving fast access to the ones
+that are in use.
+
+"""
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """ Mapping with a maximum size and least recently used eviction
+
+    Getting or setting an item makes it the most recently used one. When
+    an item is added to a full cache, the least recently used item is
+    removed and passed, with its key, to the ``on_evict`` callback. The
+    lookups with ``get`` are counted in the ``hits`` and ``misses``
+    attributes.
+
+    Parameters
+    ----------
+    maxsize : int
+        maximum number of items (at least one)
+    on_evict : callable, optional
+        called as ``on_evict(key, value)`` for each evicted item
+
+    """
+    def __init__(self, maxsize, on_evict=None):
+        if maxsize < 1:
+            raise ValueError('The size of the cache should be positive')
+        self.maxsize = maxsize
+        self._on_evict = on_evict
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, key):
+        value = self._items.pop(key)
+        self._items[key] = value
+        return value
+
+    def get(self, key, default=None):
+        """ Return the item of the key (or default if it is not cached)
+
+        """
+        try:
+            value = self[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        self._items.pop(key, None)
+        self._items[key] = value
+        while len(self._items) > self.maxsize:
+            old_key, old_value = self._items.popitem(last=False)
+            if self._on_evict is not None:
+                self._on_evict(old_key, old_value)
+
+    def __delitem__(self, key):
+        del self._items[key]
+
+    def pop(self, key, *default):
+        """ Remove the item of the key and return it (without eviction)
+
+        """
+        return self._items.pop(key, *default)
+
+    def values(self):
+        """ The cached values (from the least to the most recently used)
+
+        """
+        return self._items.values()
+
+    def clear(self):
+        """ Remove all the items (without eviction)
+
+        """
+        self._items.clear()
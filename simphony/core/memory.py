@@ -0,0 +1,60 @@
+""" Approximate memory accounting of python object graphs
+
+Used by the ``memory_usage`` methods of the containers.
+
+"""
+import sys
+import types
+from enum import Enum
+
+import numpy
+
+# objects that are shared by the whole process and are never counted
+_SHARED_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+    types.MethodType, Enum, bool, types.NoneType)
+
+
+def deep_getsizeof(*objects):
+    """ Approximate number of bytes used by the objects and their contents
+
+    The object graph is followed through the items of the containers
+    (dict, list, tuple, set and numpy object arrays), the ``__dict__`` and
+    the ``__slots__`` of the instances. Each object is counted once, and
+    the objects that are shared by the whole process (classes, modules,
+    functions, enum members such as the CUBA keys, None and the booleans)
+    are not counted.
+
+    """
+    seen = set()
+    stack = list(objects)
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            stack.extend(obj.iterkeys())
+            stack.extend(obj.itervalues())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, numpy.ndarray):
+            if obj.dtype == object:
+                stack.extend(obj.flat)
+            continue
+        elif isinstance(obj, (basestring, int, long, float, complex)):
+            continue
+
+        if hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+        for cls in type(obj).__mro__:
+            slots = cls.__dict__.get('__slots__', ())
+            if isinstance(slots, basestring):
+                slots = (slots,)
+            for name in slots:
+                if hasattr(obj, name) and name != '__weakref__':
+                    stack.append(getattr(obj, name))
+    return size
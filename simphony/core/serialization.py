@@ -0,0 +1,308 @@
+""" Compact binary encoding of CUDS objects
+
+This module provides the low level routines used by the ``to_bytes`` and
+``from_bytes`` methods of the DataContainer and the cuds element classes.
+Ids, coordinates and data values are packed with ``struct`` and the CUBA
+keys of a DataContainer are stored as their integer value (a single byte)
+instead of the pickled enum member.
+
+Values that do not have a native encoding (e.g. numpy arrays) are stored
+as a pickle.
+
+"""
+import cPickle
+import struct
+import uuid
+
+from simphony.core.cuba import CUBA
+
+_CUBA_BY_VALUE = {int(key): key for key in CUBA}
+
+_BYTE = struct.Struct('<B')
+_COUNT = struct.Struct('<I')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+_TAGGED_INT = struct.Struct('<Bq')
+_KEY_TAG = struct.Struct('<BB')
+_KEY_TAG_INT = struct.Struct('<BBq')
+_KEY_TAG_FLOAT = struct.Struct('<BBd')
+_SIZE = _COUNT.size
+
+# tags used for the ids
+_ID_NONE = 0
+_ID_UUID = 1
+_ID_INT = 2
+
+# tags used for the data values
+_VALUE_INT = 0
+_VALUE_FLOAT = 1
+_VALUE_BOOL = 2
+_VALUE_NONE = 3
+_VALUE_STR = 4
+_VALUE_UNICODE = 5
+_VALUE_FLOAT_TUPLE = 6
+_VALUE_INT_TUPLE = 7
+_VALUE_PICKLE = 8
+
+_MIN_INT = -2 ** 63
+_MAX_INT = 2 ** 63 - 1
+
+_new_uuid = uuid.UUID.__new__
+
+# cache of the struct objects used for sequences of floats and ints
+_STRUCTS = {}
+
+
+def _get_struct(code, count):
+    key = code, count
+    try:
+        return _STRUCTS[key]
+    except KeyError:
+        packer = _STRUCTS[key] = struct.Struct('<{}{}'.format(count, code))
+        return packer
+
+
+def pack_id(id):
+    """ Pack an id (None, uuid.UUID or int) into bytes.
+
+    """
+    if id is None:
+        return '\x00'
+    elif isinstance(id, uuid.UUID):
+        # faster than the UUID.bytes property in python 2
+        return '\x01' + ('%032x' % id.int).decode('hex')
+    elif isinstance(id, (int, long)) and _MIN_INT <= id <= _MAX_INT:
+        return _TAGGED_INT.pack(_ID_INT, id)
+    else:
+        message = 'Id {!r} can not be packed into bytes'
+        raise TypeError(message.format(id))
+
+
+def unpack_id(buffer, offset=0):
+    """ Unpack an id from the buffer at the given offset.
+
+    Returns
+    -------
+    tuple
+        the id and the offset after the packed id.
+
+    """
+    tag = ord(buffer[offset])
+    if tag == _ID_UUID:
+        start = offset + 1
+        id = _new_uuid(uuid.UUID)
+        # UUID objects are immutable and do not allow setattr
+        id.__dict__['int'] = int(buffer[start:start + 16].encode('hex'), 16)
+        return id, start + 16
+    elif tag == _ID_INT:
+        return _INT.unpack_from(buffer, offset + 1)[0], offset + 9
+    elif tag == _ID_NONE:
+        return None, offset + 1
+    else:
+        raise ValueError('Unknown id tag: {}'.format(tag))
+
+
+def pack_ids(ids):
+    """ Pack a sequence of ids into bytes.
+
+    """
+    return _COUNT.pack(len(ids)) + ''.join(pack_id(id) for id in ids)
+
+
+def unpack_ids(buffer, offset=0):
+    """ Unpack a sequence of ids from the buffer at the given offset.
+
+    Returns
+    -------
+    tuple
+        the list of ids and the offset after the packed ids.
+
+    """
+    count, = _COUNT.unpack_from(buffer, offset)
+    offset += _SIZE
+    ids = []
+    for _ in xrange(count):
+        id, offset = unpack_id(buffer, offset)
+        ids.append(id)
+    return ids, offset
+
+
+def pack_floats(values):
+    """ Pack a sequence of floats (e.g. coordinates) into bytes.
+
+    """
+    count = len(values)
+    return _COUNT.pack(count) + _get_struct('d', count).pack(*values)
+
+
+def unpack_floats(buffer, offset=0):
+    """ Unpack a tuple of floats from the buffer at the given offset.
+
+    Returns
+    -------
+    tuple
+        the tuple of floats and the offset after the packed floats.
+
+    """
+    count, = _COUNT.unpack_from(buffer, offset)
+    offset += _SIZE
+    values = _get_struct('d', count).unpack_from(buffer, offset)
+    return values, offset + 8 * count
+
+
+def pack_ints(values):
+    """ Pack a sequence of integers (e.g. an index) into bytes.
+
+    """
+    count = len(values)
+    return _COUNT.pack(count) + _get_struct('q', count).pack(*values)
+
+
+def unpack_ints(buffer, offset=0):
+    """ Unpack a tuple of integers from the buffer at the given offset.
+
+    Returns
+    -------
+    tuple
+        the tuple of integers and the offset after the packed integers.
+
+    """
+    count, = _COUNT.unpack_from(buffer, offset)
+    offset += _SIZE
+    values = _get_struct('q', count).unpack_from(buffer, offset)
+    return values, offset + 8 * count
+
+
+def pack_items(mapping):
+    """ Pack the (CUBA key, value) items of a mapping into bytes.
+
+    """
+    parts = [_COUNT.pack(len(mapping))]
+    append = parts.append
+    for key, value in mapping.iteritems():
+        append(_pack_value(key, value))
+    return ''.join(parts)
+
+
+def unpack_items(buffer, offset=0):
+    """ Unpack the (CUBA key, value) items from the buffer.
+
+    Returns
+    -------
+    tuple
+        the list of (CUBA key, value) pairs and the offset after the
+        packed items.
+
+    """
+    count, = _COUNT.unpack_from(buffer, offset)
+    offset += _SIZE
+    items = []
+    append = items.append
+    for _ in xrange(count):
+        key = _CUBA_BY_VALUE[ord(buffer[offset])]
+        value, offset = _unpack_value(buffer, offset + 1)
+        append((key, value))
+    return items, offset
+
+
+def pack_records(objects):
+    """ Pack a sequence of objects into a single bytes batch.
+
+    Each object is encoded with its ``to_bytes`` method and stored as a
+    length prefixed record.
+
+    """
+    parts = [_COUNT.pack(len(objects))]
+    append = parts.append
+    for item in objects:
+        data = item.to_bytes()
+        append(_COUNT.pack(len(data)))
+        append(data)
+    return ''.join(parts)
+
+
+def unpack_records(buffer, from_bytes):
+    """ Unpack a bytes batch created by ``pack_records``.
+
+    Parameters
+    ----------
+    buffer : str
+        the packed batch.
+    from_bytes : callable
+        decodes a single record (e.g. ``Particle.from_bytes``).
+
+    Returns
+    -------
+    list
+        the decoded objects.
+
+    """
+    count, = _COUNT.unpack_from(buffer, 0)
+    offset = _SIZE
+    objects = []
+    append = objects.append
+    for _ in xrange(count):
+        size, = _COUNT.unpack_from(buffer, offset)
+        offset += _SIZE
+        append(from_bytes(buffer[offset:offset + size]))
+        offset += size
+    return objects
+
+
+def _pack_value(key, value):
+    value_type = type(value)
+    if value_type is float:
+        return _KEY_TAG_FLOAT.pack(key, _VALUE_FLOAT, value)
+    elif value_type is bool:
+        return _KEY_TAG.pack(key, _VALUE_BOOL) + _BYTE.pack(value)
+    elif value_type in (int, long) and _MIN_INT <= value <= _MAX_INT:
+        return _KEY_TAG_INT.pack(key, _VALUE_INT, value)
+    elif value is None:
+        return _KEY_TAG.pack(key, _VALUE_NONE)
+    elif value_type is str:
+        return _KEY_TAG.pack(key, _VALUE_STR) + _COUNT.pack(len(value)) + value
+    elif value_type is unicode:
+        encoded = value.encode('utf-8')
+        return (
+            _KEY_TAG.pack(key, _VALUE_UNICODE) + _COUNT.pack(len(encoded)) +
+            encoded)
+    elif value_type is tuple and len(value) > 0:
+        item_type = type(value[0])
+        if all(type(item) is item_type for item in value):
+            if item_type is float:
+                return (
+                    _KEY_TAG.pack(key, _VALUE_FLOAT_TUPLE) +
+                    pack_floats(value))
+            elif item_type is int:
+                return _KEY_TAG.pack(key, _VALUE_INT_TUPLE) + pack_ints(value)
+    data = cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+    return _KEY_TAG.pack(key, _VALUE_PICKLE) + _COUNT.pack(len(data)) + data
+
+
+def _unpack_value(buffer, offset):
+    tag = ord(buffer[offset])
+    offset += 1
+    if tag == _VALUE_FLOAT:
+        return _FLOAT.unpack_from(buffer, offset)[0], offset + 8
+    elif tag == _VALUE_INT:
+        return _INT.unpack_from(buffer, offset)[0], offset + 8
+    elif tag == _VALUE_FLOAT_TUPLE:
+        return unpack_floats(buffer, offset)
+    elif tag == _VALUE_INT_TUPLE:
+        return unpack_ints(buffer, offset)
+    elif tag == _VALUE_BOOL:
+        return bool(ord(buffer[offset])), offset + 1
+    elif tag == _VALUE_NONE:
+        return None, offset
+    size, = _COUNT.unpack_from(buffer, offset)
+    offset += _SIZE
+    data = buffer[offset:offset + size]
+    offset += size
+    if tag == _VALUE_STR:
+        return data, offset
+    elif tag == _VALUE_UNICODE:
+        return data.decode('utf-8'), offset
+    elif tag == _VALUE_PICKLE:
+        return cPickle.loads(data), offset
+    else:
+        raise ValueError('Unknown value tag: {}'.format(tag))
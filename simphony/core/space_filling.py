@@ -0,0 +1,165 @@
+""" Space-filling curve keys of point coordinates
+
+Used by the ``reorder`` methods of the containers to sort their storage
+so that the points that are close in space are close in memory (or on
+disk).
+
+The coordinates are scaled to their bounding box and quantized to
+``bits`` bits along each axis, and each point gets the position of its
+grid cell along a Morton (Z-order) or Hilbert curve. The Hilbert curve
+keeps better locality (consecutive cells are always neighbours), the
+Morton key is cheaper to compute. The keys of all the points are
+computed at once with numpy.
+
+"""
+import numpy
+
+#: the supported curves
+METHODS = ('hilbert', 'morton')
+
+# the quantization (3 x 21 bits fit a 64 bit key)
+DEFAULT_BITS = 21
+
+
+def curve_order(coordinates, method='hilbert', bits=DEFAULT_BITS):
+    """ The permutation that sorts points along a space-filling curve
+
+    Parameters
+    ----------
+    coordinates : array_like
+        the (N, D) coordinates of the points
+    method : str
+        'hilbert' or 'morton'
+    bits : int
+        the bits of the quantization along each axis (D * bits should
+        be at most 64)
+
+    Returns
+    -------
+    numpy.ndarray
+        the indices of the points in curve order (a stable sort, so the
+        points of the same cell keep their relative order)
+
+    Raises
+    ------
+    ValueError
+        if the method is unknown
+
+    """
+    return numpy.argsort(
+        curve_keys(coordinates, method, bits), kind='mergesort')
+
+
+def curve_keys(coordinates, method='hilbert', bits=DEFAULT_BITS):
+    """ The positions of points along a space-filling curve
+
+    See curve_order for the parameters.
+
+    Returns
+    -------
+    numpy.ndarray
+        the (N,) uint64 keys
+
+    """
+    if method == 'hilbert':
+        encode = hilbert_keys
+    elif method == 'morton':
+        encode = morton_keys
+    else:
+        raise ValueError(
+            'Unknown space-filling curve {!r} (use one of {})'.format(
+                method, ', '.join(METHODS)))
+    return encode(quantize(coordinates, bits), bits)
+
+
+def quantize(coordinates, bits=DEFAULT_BITS):
+    """ The grid cells of the points in their bounding box
+
+    Returns
+    -------
+    numpy.ndarray
+        the (N, D) uint64 cell indices, in [0, 2 ** bits)
+
+    """
+    coordinates = numpy.asarray(coordinates, dtype=numpy.float64)
+    if coordinates.ndim != 2:
+        raise ValueError('The coordinates should be a (N, D) array')
+    if coordinates.shape[1] * bits > 64:
+        raise ValueError('The keys do not fit in 64 bits')
+    if len(coordinates) == 0:
+        return numpy.zeros(coordinates.shape, dtype=numpy.uint64)
+    low = coordinates.min(axis=0)
+    extent = coordinates.max(axis=0) - low
+    # the axes where all the points are equal are mapped to cell 0
+    scale = numpy.where(
+        extent > 0, (2 ** bits - 1) / numpy.where(extent > 0, extent, 1), 0)
+    return ((coordinates - low) * scale).astype(numpy.uint64)
+
+
+def morton_keys(cells, bits=DEFAULT_BITS):
+    """ The Morton (Z-order) keys of quantized points
+
+    Parameters
+    ----------
+    cells : numpy.ndarray
+        the (N, D) uint64 cell indices (see quantize)
+
+    """
+    return _interleave(numpy.asarray(cells, dtype=numpy.uint64).T, bits)
+
+
+def hilbert_keys(cells, bits=DEFAULT_BITS):
+    """ The Hilbert keys of quantized points
+
+    The cell indices are converted to the "transposed" Hilbert index of
+    J. Skilling (Programming the Hilbert curve, AIP Conf. Proc. 707,
+    2004), whose bits are then interleaved.
+
+    Parameters
+    ----------
+    cells : numpy.ndarray
+        the (N, D) uint64 cell indices (see quantize)
+
+    """
+    x = numpy.array(cells, dtype=numpy.uint64).T
+    dimension = len(x)
+    one = numpy.uint64(1)
+
+    # inverse undo
+    q = one << numpy.uint64(bits - 1)
+    while q > one:
+        p = q - one
+        for i in xrange(dimension):
+            high = (x[i] & q) != 0
+            # invert the low bits of x[0] where the bit of x[i] is set
+            x[0] ^= numpy.where(high, p, numpy.uint64(0))
+            # exchange the low bits of x[0] and x[i] elsewhere
+            t = numpy.where(high, numpy.uint64(0), (x[0] ^ x[i]) & p)
+            x[0] ^= t
+            x[i] ^= t
+        q >>= one
+
+    # gray encode
+    for i in xrange(1, dimension):
+        x[i] ^= x[i - 1]
+    t = numpy.zeros(x.shape[1], dtype=numpy.uint64)
+    q = one << numpy.uint64(bits - 1)
+    while q > one:
+        t ^= numpy.where((x[dimension - 1] & q) != 0, q - one,
+                         numpy.uint64(0))
+        q >>= one
+    x ^= t
+    return _interleave(x, bits)
+
+
+def _interleave(x, bits):
+    # the bits of x[0], x[1], ... from the most significant ones, the
+    # bit of x[0] first
+    dimension = len(x)
+    keys = numpy.zeros(x.shape[1], dtype=numpy.uint64)
+    one = numpy.uint64(1)
+    for bit in xrange(bits - 1, -1, -1):
+        for i in xrange(dimension):
+            keys <<= one
+            keys |= (x[i] >> numpy.uint64(bit)) & one
+    return keys
@@ -136,6 +136,19 @@ class TestDataContainer(unittest.TestCase):
         with self.assertRaises(ValueError):
             container[100] = 29
 
+    def test_bytes_round_trip(self):
+        data = {key: key + 3 for key in CUBA}
+        container = DataContainer(data)
+        result = DataContainer.from_bytes(container.to_bytes())
+        self.assertIsInstance(result, DataContainer)
+        self.assertEqual(result, container)
+        for key in result:
+            self.assertIsInstance(key, CUBA)
+
+    def test_empty_bytes_round_trip(self):
+        result = DataContainer.from_bytes(DataContainer().to_bytes())
+        self.assertEqual(result, DataContainer())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import simphony
+from simphony.core import instrumentation
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.lattice import make_square_lattice
+from simphony.cuds.particles import Particle, ParticleContainer
+from simphony.io.cuds_file import CudsFile
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        instrumentation.reset()
+        self.add_particle = ParticleContainer.__dict__['add_particle']
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled_by_default(self):
+        self.assertFalse(instrumentation.is_enabled())
+        container = ParticleContainer()
+        container.add_particle(Particle(id=0))
+        self.assertEqual(instrumentation.stats(), {})
+
+    def test_enable_and_disable(self):
+        instrumentation.enable()
+        self.assertTrue(instrumentation.is_enabled())
+        self.assertIsNot(
+            ParticleContainer.__dict__['add_particle'], self.add_particle)
+        instrumentation.disable()
+        self.assertIs(
+            ParticleContainer.__dict__['add_particle'], self.add_particle)
+
+    def test_calls_and_items(self):
+        instrumentation.enable()
+        container = ParticleContainer()
+        for i in xrange(5):
+            container.add_particle(Particle(id=i))
+        container.get_particle(2)
+        particles = list(container.iter_particles())
+
+        stats = simphony.stats()
+        self.assertEqual(stats['ParticleContainer.add_particle']['calls'], 5)
+        self.assertEqual(stats['ParticleContainer.get_particle']['calls'], 1)
+        iter_stats = stats['ParticleContainer.iter_particles']
+        self.assertEqual(iter_stats['calls'], 1)
+        self.assertEqual(iter_stats['items'], len(particles))
+        self.assertGreaterEqual(iter_stats['time'], 0.0)
+        # the class methods are instrumented too, here they are only
+        # called by the other operations
+        from_particle = stats['Particle.from_particle']
+        self.assertEqual(from_particle['calls'], 0)
+        self.assertEqual(from_particle['nested_calls'], 11)
+        self.assertEqual(from_particle['time'], 0.0)
+
+    def test_nested_calls(self):
+        instrumentation.enable()
+        container = ParticleContainer()
+        particles = [Particle(id=i) for i in xrange(3)]
+        for particle in particles:
+            container.add_particle(particle)
+        instrumentation.reset()
+        container.update_particles(particles)
+        Particle.from_particle(particles[0])
+
+        stats = instrumentation.stats()
+        self.assertEqual(
+            stats['ParticleContainer.update_particles']['calls'], 1)
+        self.assertEqual(
+            stats['ParticleContainer.update_particles']['nested_calls'], 0)
+        self.assertEqual(stats['Particle.from_particle']['calls'], 1)
+        self.assertEqual(stats['Particle.from_particle']['nested_calls'], 3)
+
+    def test_nesting_is_per_thread(self):
+        class Worker(object):
+            def inner(self):
+                pass
+
+            def outer(self):
+                thread = threading.Thread(target=self.inner)
+                thread.start()
+                thread.join()
+                self.inner()
+
+        instrumentation.instrument(Worker, ('inner', 'outer'))
+        instrumentation.enable()
+        Worker().outer()
+
+        stats = instrumentation.stats()
+        self.assertEqual(stats['Worker.outer']['calls'], 1)
+        self.assertEqual(stats['Worker.inner']['calls'], 1)
+        self.assertEqual(stats['Worker.inner']['nested_calls'], 1)
+
+    def test_data_container_and_lattice(self):
+        instrumentation.enable()
+        data = DataContainer()
+        data[CUBA.MASS] = 1.0
+        lattice = make_square_lattice('test', 0.1, (2, 2))
+        for node in lattice.iter_nodes():
+            lattice.update_node(node)
+        stats = instrumentation.stats()
+        self.assertEqual(stats['DataContainer.__setitem__']['calls'], 1)
+        self.assertEqual(stats['Lattice.update_node']['calls'], 4)
+        self.assertEqual(stats['Lattice.iter_nodes']['items'], 4)
+
+    def test_callbacks(self):
+        calls = []
+
+        def callback(name, elapsed):
+            calls.append(name)
+
+        instrumentation.register_callback(callback)
+        try:
+            instrumentation.enable()
+            ParticleContainer().add_particle(Particle(id=0))
+        finally:
+            instrumentation.unregister_callback(callback)
+        self.assertIn('ParticleContainer.add_particle', calls)
+
+    def test_bytes_of_file_containers(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            cuds_file = CudsFile.open(os.path.join(temp_dir, 'test.cuds'))
+            instrumentation.enable()
+            pc = cuds_file.add_particle_container('test')
+            for i in xrange(10):
+                pc.add_particle(Particle(id=i))
+            pc.read_coordinates()
+            cuds_file.close()
+        finally:
+            shutil.rmtree(temp_dir)
+        stats = instrumentation.stats()
+        self.assertEqual(
+            stats['FileParticleContainer.add_particle']['calls'], 10)
+        self.assertEqual(stats['io.particles']['bytes_written'], 10 * 28)
+        self.assertGreaterEqual(stats['io.particles']['bytes_read'], 10 * 24)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            instrumentation.instrument(ParticleContainer, ('foo',))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from simphony.core.layered_dict import LayeredDict
+
+
+class TestLayeredDict(unittest.TestCase):
+
+    def setUp(self):
+        self.items = {'a': 1, 'b': 2, 'c': 3}
+        self.mapping = LayeredDict(self.items)
+
+    def assertMappingEqual(self, mapping, items):
+        self.assertEqual(len(mapping), len(items))
+        self.assertEqual(dict(mapping.iteritems()), items)
+        self.assertItemsEqual(mapping.keys(), items.keys())
+        self.assertItemsEqual(mapping.values(), items.values())
+        for key, value in items.iteritems():
+            self.assertIn(key, mapping)
+            self.assertEqual(mapping[key], value)
+
+    def test_mapping(self):
+        self.mapping['d'] = 4
+        self.mapping['a'] = 0
+        del self.mapping['b']
+        self.assertMappingEqual(self.mapping, {'a': 0, 'c': 3, 'd': 4})
+        self.assertIs(self.mapping.layers[0], self.items)
+        self.assertNotIn('b', self.mapping)
+        self.assertIsNone(self.mapping.get('b'))
+        self.assertEqual(self.mapping.get('b', 5), 5)
+        with self.assertRaises(KeyError):
+            self.mapping['b']
+        with self.assertRaises(KeyError):
+            del self.mapping['b']
+
+    def test_freeze(self):
+        view = self.mapping.freeze()
+        self.mapping['a'] = 0
+        self.mapping['d'] = 4
+        del self.mapping['b']
+        self.assertMappingEqual(view, {'a': 1, 'b': 2, 'c': 3})
+        self.assertMappingEqual(self.mapping, {'a': 0, 'c': 3, 'd': 4})
+        # the writes go to the top layer only
+        self.assertIs(self.mapping.layers[0], self.items)
+        self.assertEqual(self.items, {'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(len(self.mapping.layers), 2)
+
+        # the empty top layer is not shared
+        self.mapping.freeze()
+        top = self.mapping.layers[-1]
+        self.assertEqual(top, {})
+        other = self.mapping.freeze()
+        self.assertIs(self.mapping.layers[-1], top)
+        self.assertFalse(any(layer is top for layer in other.layers))
+
+    def test_collapse(self):
+        self.mapping.freeze()
+        self.mapping['d'] = 4
+        del self.mapping['a']
+        items = self.mapping.collapse()
+        self.assertIs(items, self.items)
+        self.assertEqual(items, {'b': 2, 'c': 3, 'd': 4})
+        self.assertEqual(self.mapping.layers, [items])
+        self.assertMappingEqual(self.mapping, items)
+
+    def test_compact(self):
+        reference = dict(self.items)
+        views = []
+        for step in xrange(200):
+            for _ in xrange(random.randint(0, 5)):
+                key = random.randint(0, 50)
+                if key in reference and random.random() < 0.3:
+                    del self.mapping[key]
+                    del reference[key]
+                else:
+                    self.mapping[key] = step
+                    reference[key] = step
+            views.append((self.mapping.freeze(), dict(reference)))
+            self.mapping.compact()
+            self.assertLess(len(self.mapping.layers), 12)
+        self.assertMappingEqual(self.mapping, reference)
+        for view, items in views:
+            self.assertMappingEqual(view, items)
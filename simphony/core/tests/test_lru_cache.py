@@ -0,0 +1,63 @@
+import unittest
+
+from simphony.core.lru_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def setUp(self):
+        self.evicted = []
+        self.cache = LRUCache(
+            3, on_evict=lambda key, value: self.evicted.append((key, value)))
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            LRUCache(0)
+
+    def test_get_set(self):
+        self.cache['a'] = 1
+        self.cache['b'] = 2
+        self.assertEqual(self.cache['a'], 1)
+        self.assertEqual(self.cache.get('b'), 2)
+        self.assertIsNone(self.cache.get('c'))
+        self.assertEqual(self.cache.get('c', 3), 3)
+        self.assertIn('a', self.cache)
+        self.assertNotIn('c', self.cache)
+        self.assertEqual(len(self.cache), 2)
+        with self.assertRaises(KeyError):
+            self.cache['c']
+
+    def test_hits_and_misses(self):
+        self.cache['a'] = 1
+        self.cache.get('a')
+        self.cache.get('a')
+        self.cache.get('b')
+        self.cache['a']
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_eviction_of_least_recently_used(self):
+        for key in 'abc':
+            self.cache[key] = key.upper()
+        self.cache['a']
+        self.cache['b'] = 'B2'
+        self.cache['d'] = 'D'
+        self.assertEqual(self.evicted, [('c', 'C')])
+        self.cache['e'] = 'E'
+        self.assertEqual(self.evicted, [('c', 'C'), ('a', 'A')])
+        self.assertEqual(list(self.cache), ['b', 'd', 'e'])
+        self.assertEqual(self.cache.values(), ['B2', 'D', 'E'])
+
+    def test_removal_does_not_evict(self):
+        for key in 'abc':
+            self.cache[key] = key.upper()
+        del self.cache['a']
+        self.assertEqual(self.cache.pop('b'), 'B')
+        self.assertIsNone(self.cache.pop('b', None))
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.evicted, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import sys
+import unittest
+
+import numpy
+
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.core.memory import deep_getsizeof
+
+
+class _Slotted(object):
+    __slots__ = ('value', 'other')
+
+    def __init__(self, value):
+        self.value = value
+
+
+class TestDeepGetsizeof(unittest.TestCase):
+
+    def test_shared_items_are_counted_once(self):
+        value = float(sys.maxint)
+        item = (value, value)
+        items = [item, item]
+        self.assertEqual(
+            deep_getsizeof(items),
+            sys.getsizeof(items) + sys.getsizeof(item) +
+            sys.getsizeof(value))
+
+    def test_cuba_keys_are_not_counted(self):
+        value = float(sys.maxint)
+        data = DataContainer({CUBA.MASS: value})
+        self.assertEqual(
+            deep_getsizeof(data), sys.getsizeof(data) + sys.getsizeof(value))
+
+    def test_slots(self):
+        items = [float(sys.maxint)]
+        slotted = _Slotted(items)
+        self.assertEqual(
+            deep_getsizeof(slotted),
+            sys.getsizeof(slotted) + sys.getsizeof(items) +
+            sys.getsizeof(items[0]))
+
+    def test_object_arrays(self):
+        items = [float(i) for i in xrange(2)]
+        array = numpy.empty(3, dtype=object)
+        array[:2] = items
+        self.assertEqual(
+            deep_getsizeof(array),
+            sys.getsizeof(array) + sum(sys.getsizeof(x) for x in items))
+
+    def test_several_objects(self):
+        items = [float(sys.maxint)]
+        self.assertEqual(
+            deep_getsizeof(items, items), deep_getsizeof(items))
+
+
+if __name__ == '__main__':
+    unittest.main()
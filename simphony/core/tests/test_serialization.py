@@ -0,0 +1,92 @@
+import unittest
+import uuid
+
+import numpy
+
+from simphony.core import serialization
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
+
+
+class TestSerialization(unittest.TestCase):
+
+    def test_id_round_trip(self):
+        for id in (None, uuid.uuid4(), uuid.UUID(int=0), 0, 42, -7):
+            buffer = serialization.pack_id(id)
+            result, offset = serialization.unpack_id(buffer)
+            self.assertEqual(result, id)
+            self.assertEqual(offset, len(buffer))
+
+    def test_uuid_is_packed_in_16_bytes(self):
+        id = uuid.uuid4()
+        buffer = serialization.pack_id(id)
+        self.assertEqual(len(buffer), 17)
+        self.assertEqual(buffer[1:], id.bytes)
+        result, _ = serialization.unpack_id(buffer)
+        self.assertEqual(hash(result), hash(id))
+        self.assertEqual(str(result), str(id))
+
+    def test_pack_unsupported_id(self):
+        with self.assertRaises(TypeError):
+            serialization.pack_id('foo')
+
+    def test_ids_round_trip(self):
+        ids = [uuid.uuid4(), 3, uuid.uuid4()]
+        buffer = serialization.pack_ids(ids)
+        result, offset = serialization.unpack_ids(buffer)
+        self.assertEqual(result, ids)
+        self.assertEqual(offset, len(buffer))
+
+    def test_floats_round_trip(self):
+        buffer = serialization.pack_floats((0.1, 2, -3.5))
+        result, offset = serialization.unpack_floats(buffer)
+        self.assertEqual(result, (0.1, 2.0, -3.5))
+        self.assertEqual(offset, len(buffer))
+
+    def test_items_round_trip(self):
+        data = {
+            CUBA.NAME: 'foo',
+            CUBA.LABEL: u'b\xe4r',
+            CUBA.MASS: 2.5,
+            CUBA.MATERIAL_ID: 3,
+            CUBA.STATUS: True,
+            CUBA.DIRECTION: None,
+            CUBA.VELOCITY: (0.1, 0.2, 0.3),
+            CUBA.SIZE: (1, 2, 3),
+            CUBA.OCCUPANCY: (1, 2.0),
+            CUBA.DISTRIBUTION: [1, 2, 3],
+            CUBA.NUMBER_OF_POINTS: 2 ** 70}
+        buffer = serialization.pack_items(data)
+        items, offset = serialization.unpack_items(buffer)
+        self.assertEqual(offset, len(buffer))
+        self.assertEqual(dict(items), data)
+        for key, value in items:
+            self.assertIsInstance(key, CUBA)
+            self.assertEqual(type(value), type(data[key]))
+
+    def test_items_with_numpy_array(self):
+        data = {CUBA.LATTICE_VECTORS: numpy.eye(3)}
+        items, _ = serialization.unpack_items(
+            serialization.pack_items(data))
+        numpy.testing.assert_array_equal(dict(items)[CUBA.LATTICE_VECTORS],
+                                         numpy.eye(3))
+
+    def test_records_round_trip(self):
+        containers = [
+            DataContainer(MASS=float(i), MATERIAL_ID=i) for i in range(5)]
+        buffer = serialization.pack_records(containers)
+        result = serialization.unpack_records(
+            buffer, DataContainer.from_bytes)
+        self.assertEqual(result, containers)
+        for container in result:
+            self.assertIsInstance(container, DataContainer)
+
+    def test_empty_records(self):
+        buffer = serialization.pack_records([])
+        self.assertEqual(
+            serialization.unpack_records(buffer, DataContainer.from_bytes),
+            [])
+
+
+if __name__ == '__main__':
+    unittest.main()
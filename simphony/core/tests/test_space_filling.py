@@ -0,0 +1,60 @@
+import unittest
+
+import numpy
+
+from simphony.core.space_filling import (
+    curve_keys, curve_order, hilbert_keys, morton_keys, quantize)
+
+
+def _grid(dimension, bits):
+    return numpy.array(
+        list(numpy.ndindex(*(2 ** bits,) * dimension)), dtype=numpy.uint64)
+
+
+class TestSpaceFilling(unittest.TestCase):
+
+    def test_hilbert_curve_is_continuous(self):
+        for dimension, bits in ((2, 1), (2, 3), (3, 3)):
+            cells = _grid(dimension, bits)
+            keys = hilbert_keys(cells, bits)
+            self.assertEqual(sorted(keys.tolist()), range(len(cells)))
+            path = cells[numpy.argsort(keys)].astype(int)
+            steps = numpy.abs(numpy.diff(path, axis=0)).sum(axis=1)
+            self.assertTrue(numpy.all(steps == 1))
+
+    def test_morton_keys_interleave_bits(self):
+        cells = numpy.array(
+            [[0, 0], [0, 1], [1, 0], [1, 1], [2, 0]], dtype=numpy.uint64)
+        self.assertEqual(morton_keys(cells, 2).tolist(), [0, 1, 2, 3, 8])
+        cells = _grid(3, 2)
+        self.assertEqual(
+            sorted(morton_keys(cells, 2).tolist()), range(len(cells)))
+
+    def test_quantize(self):
+        cells = quantize([[0.0, 1.0, 5.0], [1.0, 3.0, 5.0]], bits=4)
+        self.assertEqual(cells.tolist(), [[0, 0, 0], [15, 15, 0]])
+        self.assertEqual(quantize(numpy.zeros((0, 3))).shape, (0, 3))
+        with self.assertRaises(ValueError):
+            quantize([1.0, 2.0])
+        with self.assertRaises(ValueError):
+            quantize(numpy.zeros((2, 3)), bits=22)
+
+    def test_curve_order_groups_close_points(self):
+        # two clusters, interleaved in the input
+        points = numpy.array(
+            [[0.0, 0.0, 0.0], [10.0, 10.0, 10.0]] * 5) + numpy.linspace(
+                0, 0.1, 10)[:, numpy.newaxis]
+        for method in ('hilbert', 'morton'):
+            order = curve_order(points, method)
+            self.assertEqual(sorted(order.tolist()), range(10))
+            clusters = (points[order, 0] > 5).tolist()
+            self.assertEqual(
+                sum(a != b for a, b in zip(clusters, clusters[1:])), 1)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            curve_keys(numpy.zeros((2, 3)), 'peano')
+
+
+if __name__ == '__main__':
+    unittest.main()
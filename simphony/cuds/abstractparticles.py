@@ -53,6 +53,17 @@ class ABCParticleContainer(object):
     def iter_bonds(self, bond_ids=None):
         pass
 
+    def iter_bonds_of_particle(self, particle_id):
+        """Iterate over the bonds that hold the particle 'particle_id'.
+
+        The default implementation scans all the bonds, the containers
+        override it with a lookup in an index of the bonds of each
+        particle.
+        """
+        for bond in self.iter_bonds():
+            if particle_id in bond.particles:
+                yield bond
+
     @abstractmethod
     def has_particle(self, id):
         pass
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+    Module for the change tracking of the cuds containers:
+
+        ChangeSet ---------------> Records the ids of the elements of one kind
+           (e.g. particles) that were added, updated and removed since the
+           last time the changes were cleared.
+"""
+
+
+class ChangeSet(object):
+    """Dirty id sets of a kind of element.
+
+       The sets are kept disjoint and describe the net change: an element
+       added and then updated is only 'added', an element added and then
+       removed is forgotten and an element removed and then added again is
+       'updated'.
+
+       Attributes
+       ----------
+
+        added : set
+            ids of the new elements
+        updated : set
+            ids of the modified elements
+        removed : set
+            ids of the deleted elements
+    """
+    def __init__(self):
+        self.added = set()
+        self.updated = set()
+        self.removed = set()
+
+    def mark_added(self, id):
+        """Records that the element with the given id was added."""
+        if id in self.removed:
+            self.removed.discard(id)
+            self.updated.add(id)
+        else:
+            self.added.add(id)
+
+    def mark_updated(self, id):
+        """Records that the element with the given id was updated."""
+        if id not in self.added:
+            self.updated.add(id)
+
+    def mark_removed(self, id):
+        """Records that the element with the given id was removed."""
+        if id in self.added:
+            self.added.discard(id)
+        else:
+            self.updated.discard(id)
+            self.removed.add(id)
+
+    def clear(self):
+        """Forgets all the recorded changes."""
+        self.added.clear()
+        self.updated.clear()
+        self.removed.clear()
+
+    def __len__(self):
+        return len(self.added) + len(self.updated) + len(self.removed)
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+    Module for a thread-safe particle container:
+
+        ConcurrentParticleContainer ---> ParticleContainer variant that can be
+           shared between threads. Particles and bonds are stored in sharded
+           dictionaries, each shard protected by its own lock, and the
+           iteration works on per-shard snapshots so that readers never hold
+           a lock while the particles are yielded.
+"""
+import threading
+import uuid
+import weakref
+
+from simphony.core import instrumentation
+from simphony.core.layered_dict import LayeredDict
+from simphony.cuds.particles import (
+    Bond, ParticleContainer, ParticleContainerSnapshot, _curve_ordered)
+
+DEFAULT_NUMBER_OF_SHARDS = 16
+
+
+class ConcurrentParticleContainer(ParticleContainer):
+    """Thread-safe container of particles and bonds.
+
+       Provides the same interface as the ParticleContainer. Adding,
+       updating and removing elements only locks the shard that holds
+       the element id. Iterating over all the elements copies the
+       references of one shard at a time (under its lock), hence a
+       mutation during iteration never raises, and the yielded elements
+       are a consistent state of each shard at the time it was visited.
+
+       Attributes
+       ----------
+
+        _particles : _ShardedDict
+            data structure for particles storage
+        _bonds : _ShardedDict
+            data structure for bonds storage
+        data : DataContainer
+            data attributes of the element
+    """
+    def __init__(self, number_of_shards=DEFAULT_NUMBER_OF_SHARDS):
+        super(ConcurrentParticleContainer, self).__init__()
+        self._particles = _ShardedDict(number_of_shards)
+        self._bonds = _ShardedDict(number_of_shards)
+        self._index_lock = threading.Lock()
+
+    def add_bond(self, new_bond):
+        # the bond lock is held until the bond index is updated
+        if new_bond.id is None:
+            new_bond.id = uuid.uuid4()
+        with self._bonds.lock(new_bond.id):
+            return super(ConcurrentParticleContainer, self).add_bond(new_bond)
+
+    def update_bond(self, bond):
+        with self._bonds.lock(bond.id):
+            super(ConcurrentParticleContainer, self).update_bond(bond)
+
+    def remove_bond(self, bond_id):
+        with self._bonds.lock(bond_id):
+            super(ConcurrentParticleContainer, self).remove_bond(bond_id)
+
+    def iter_bonds_of_particle(self, particle_id):
+        for bond_id in self._bond_ids_of(particle_id):
+            try:
+                bond = self._bonds[bond_id]
+            except KeyError:
+                # removed by another thread in the meantime
+                continue
+            yield Bond.from_bond(bond)
+
+    def snapshot(self):
+        """Returns a read-only view of the current state of the container.
+
+        The shards are not copied: each one is frozen (see
+        _ShardedDict.freeze) under its own lock, one after the other, so
+        a writer only waits for the freezing of one shard. The snapshot
+        holds the state of each shard at the time it was frozen.
+        """
+        return ParticleContainerSnapshot(
+            self._particles.freeze(), self._bonds.freeze(), self.data)
+
+    def reorder(self, method='hilbert'):
+        """Sorts the storage of the particles along a space-filling curve.
+
+        Each shard is reordered separately, under its lock (see
+        ParticleContainer.reorder).
+        """
+        self._particles.reorder(method)
+
+    def _writable(self, name):
+        # the sharded storage is never shared with a snapshot
+        return getattr(self, name)
+
+    def _bond_ids_of(self, particle_id):
+        with self._index_lock:
+            return super(ConcurrentParticleContainer, self)._bond_ids_of(
+                particle_id)
+
+    def _index_bond(self, bond_id, particles):
+        with self._index_lock:
+            super(ConcurrentParticleContainer, self)._index_bond(
+                bond_id, particles)
+
+    def _unindex_bond(self, bond_id, particles):
+        with self._index_lock:
+            super(ConcurrentParticleContainer, self)._unindex_bond(
+                bond_id, particles)
+
+# ================================================================
+
+    # overriden private methods of the ParticleContainer
+
+# ================================================================
+
+    def _add_element(self, cur_dict, element, clone):
+        if element.id is None:
+            element.id = uuid.uuid4()
+        with cur_dict.lock(element.id):
+            return super(ConcurrentParticleContainer, self)._add_element(
+                cur_dict, element, clone)
+
+    def _update_element(self, cur_dict, element, clone):
+        with cur_dict.lock(element.id):
+            return super(ConcurrentParticleContainer, self)._update_element(
+                cur_dict, element, clone)
+
+    def _remove_element(self, cur_dict, cur_id):
+        with cur_dict.lock(cur_id):
+            return super(ConcurrentParticleContainer, self)._remove_element(
+                cur_dict, cur_id)
+
+
+class _ShardedDict(object):
+    """Dictionary split in shards, each one protected by a lock.
+
+       Only the subset of the dict interface that is used by the
+       ParticleContainer is provided. The shards are dictionaries, or
+       LayeredDicts while frozen views (see freeze) share them.
+    """
+    def __init__(self, number_of_shards):
+        if number_of_shards < 1:
+            raise ValueError('The number of shards should be positive')
+        self._shards = [{} for _ in xrange(number_of_shards)]
+        self._locks = [threading.RLock() for _ in xrange(number_of_shards)]
+        self._views = weakref.WeakSet()
+
+    def lock(self, key):
+        """Returns the lock of the shard holding the key."""
+        return self._locks[hash(key) % len(self._shards)]
+
+    def __contains__(self, key):
+        index = hash(key) % len(self._shards)
+        with self._locks[index]:
+            return key in self._shards[index]
+
+    def __getitem__(self, key):
+        index = hash(key) % len(self._shards)
+        with self._locks[index]:
+            return self._shards[index][key]
+
+    def __setitem__(self, key, value):
+        index = hash(key) % len(self._shards)
+        with self._locks[index]:
+            self._writable(index)[key] = value
+
+    def __delitem__(self, key):
+        index = hash(key) % len(self._shards)
+        with self._locks[index]:
+            del self._writable(index)[key]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def itervalues(self):
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                values = shard.values()
+            for value in values:
+                yield value
+
+    def reorder(self, method):
+        """Recreates the particles of each shard in curve order."""
+        for index, lock in enumerate(self._locks):
+            with lock:
+                # the frozen views keep the previous shard
+                self._shards[index] = _curve_ordered(
+                    self._shards[index], method)
+
+    def freeze(self):
+        """Returns a read-only _ShardedDict sharing the current shards.
+
+        Each shard is turned into a LayeredDict and frozen in O(1) (see
+        LayeredDict.freeze) while only its own lock is held; the merging
+        of its layers, amortized over the writes, is done under the same
+        lock. The shards are frozen one after the other.
+        """
+        view = _ShardedDict(len(self._shards))
+        self._views.add(view)
+        for index, lock in enumerate(self._locks):
+            with lock:
+                shard = self._shards[index]
+                if not isinstance(shard, LayeredDict):
+                    shard = self._shards[index] = LayeredDict(shard)
+                view._shards[index] = shard.freeze()
+                shard.compact()
+        return view
+
+    def _writable(self, index):
+        # the shard ready to be modified (with its lock held), its layers
+        # are merged back once no view shares them
+        shard = self._shards[index]
+        if isinstance(shard, LayeredDict) and len(self._views) == 0:
+            shard = self._shards[index] = shard.collapse()
+        return shard
+
+
+instrumentation.instrument(
+    ConcurrentParticleContainer,
+    ('add_bond', 'update_bond', 'remove_bond', 'iter_bonds_of_particle',
+     'snapshot', 'reorder'))
@@ -0,0 +1,563 @@
+"""Domain decomposition of a lattice in rectangular blocks with halos.
+
+The nodes of a lattice are split in a grid of rectangular blocks. Each
+block owns the nodes of its interior and is surrounded by ghost (halo)
+layers that hold copies of the nodes of the neighbouring blocks (wrapped
+around the periodic axes), so that a stencil of the width of the halo can
+be applied to the interior of a block without looking at the other blocks.
+
+Classes:
+--------
+LatticeBlock:
+    the geometry of a block (global index range, halo and coordinates).
+
+LatticeDecomposition:
+    the blocks of a lattice; splits a lattice into self-contained block
+    lattices and assembles them back.
+
+BlockField:
+    a node field stored block by block (with the halos) in a single
+    shared memory buffer; scatter, halo exchange and gather.
+
+Routines:
+---------
+decompose_lattice:
+    decompose a lattice in blocks.
+
+map_blocks:
+    apply a function to every block of a field in a pool of worker
+    processes that share the memory of the field.
+
+Example
+-------
+>>> decomposition = decompose_lattice(lattice, blocks=4, halo=1)
+>>> field = decomposition.allocate_field()
+>>> field.scatter(densities)
+>>> for step in range(steps):
+...     field.exchange()
+...     map_blocks(diffuse, field)
+>>> densities = field.gather()
+
+.. note::
+
+    The function of map_blocks should be picklable (i.e. defined at the
+    top level of a module) so that it can be sent to the worker processes.
+
+"""
+import ctypes
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+
+import numpy as np
+
+from simphony.core.data_container import DataContainer
+from simphony.cuds.lattice import Lattice
+
+# state of a worker process of map_blocks (see _init_worker)
+_worker = {}
+
+
+class LatticeBlock(object):
+    """The geometry of a block of a decomposed lattice.
+
+    The local node index coordinates of the block start at the first halo
+    node, so the interior of the block is at ``array[block.interior]`` in
+    a local array of shape ``block.shape``.
+
+    Attributes
+    ----------
+    number : int
+        position of the block in the list of blocks.
+    index : tuple of D x int
+        position of the block in the grid of blocks.
+    start, stop : D x int arrays
+        global index range of the interior of the block.
+    halo : int
+        width of the ghost layers.
+    base_vect : D x float array
+    origin : D x float array
+        coordinate of the local node (0, ..., 0) (a halo node).
+
+    """
+    def __init__(self, number, index, start, stop, halo, base_vect, origin):
+        self.number = number
+        self.index = tuple(index)
+        self.start = np.array(start, dtype=np.int64)
+        self.stop = np.array(stop, dtype=np.int64)
+        self.halo = halo
+        self.base_vect = np.array(base_vect, dtype=np.float64)
+        self.origin = np.array(origin, dtype=np.float64)
+
+    @property
+    def size(self):
+        """ Number of interior nodes along each axis """
+        return tuple((self.stop - self.start).tolist())
+
+    @property
+    def shape(self):
+        """ Number of nodes (with the halos) along each axis """
+        return tuple((self.stop - self.start + 2 * self.halo).tolist())
+
+    @property
+    def interior(self):
+        """ Local slices of the interior of the block """
+        return tuple(slice(self.halo, self.halo + n) for n in self.size)
+
+    @property
+    def global_slices(self):
+        """ Global slices of the interior of the block """
+        return tuple(slice(start, stop) for start, stop
+                     in zip(self.start.tolist(), self.stop.tolist()))
+
+    def to_global(self, id):
+        """ The global index coordinate of a local index coordinate
+
+        (not wrapped around the periodic axes)
+
+        """
+        return tuple((np.asarray(id) + self.start - self.halo).tolist())
+
+    def to_local(self, id):
+        """ The local index coordinate of a global index coordinate """
+        return tuple((np.asarray(id) - self.start + self.halo).tolist())
+
+    def get_coordinate(self, id):
+        """ The coordinate of a local index coordinate """
+        return self.origin + self.base_vect * np.array(id)
+
+    def __repr__(self):
+        return '<LatticeBlock {} {}:{}>'.format(
+            self.index, tuple(self.start.tolist()),
+            tuple(self.stop.tolist()))
+
+
+class LatticeDecomposition(object):
+    """The decomposition of a lattice in a grid of blocks.
+
+    Attributes
+    ----------
+    size : tuple of D x int
+        number of nodes of the lattice along each axis.
+    grid : tuple of D x int
+        number of blocks along each axis.
+    halo : int
+        width of the ghost layers.
+    periodic : tuple of D x bool
+        periodic boundaries along each axis.
+    blocks : list of LatticeBlock
+        the blocks (in C order of their grid index).
+
+    """
+    def __init__(self, lattice, grid, halo, periodic):
+        self.name = lattice.name
+        self.type = lattice.type
+        self.base_vect = np.array(lattice.base_vect)
+        self.origin = np.array(lattice.origin)
+        self.size = tuple(int(n) for n in lattice.size)
+        self.grid = tuple(grid)
+        self.halo = halo
+        self.periodic = periodic
+
+        bounds = [[n * i // k for i in xrange(k + 1)]
+                  for n, k in zip(self.size, self.grid)]
+        self.blocks = []
+        for number, index in enumerate(np.ndindex(*self.grid)):
+            start = [bounds[axis][i] for axis, i in enumerate(index)]
+            stop = [bounds[axis][i + 1] for axis, i in enumerate(index)]
+            origin = self.origin + self.base_vect * (np.array(start) - halo)
+            self.blocks.append(LatticeBlock(
+                number, index, start, stop, halo, self.base_vect, origin))
+        self._numbers = {block.index: block.number for block in self.blocks}
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def neighbor(self, block, axis, direction):
+        """ The neighbouring block along an axis (+1 or -1)
+
+        Returns None at a non-periodic boundary.
+
+        """
+        index = list(block.index)
+        index[axis] += direction
+        if not 0 <= index[axis] < self.grid[axis]:
+            if not self.periodic[axis]:
+                return None
+            index[axis] %= self.grid[axis]
+        return self.blocks[self._numbers[tuple(index)]]
+
+    def split(self, lattice):
+        """Split a lattice into self-contained block lattices.
+
+        Parameters
+        ----------
+        lattice : Lattice
+            the decomposed lattice.
+
+        Returns
+        -------
+        list of Lattice
+            a lattice for each block, with the same type and base vectors,
+            the size of the block (with the halos) and the coordinate of
+            its first halo node as origin. The nodes hold copies of the
+            data of the nodes of the lattice (wrapped around the periodic
+            axes); the halo nodes outside of a non-periodic lattice are
+            empty.
+
+        """
+        self._check_lattice(lattice)
+        lattices = []
+        for block in self.blocks:
+            block_lattice = Lattice(
+                '{}_{}'.format(self.name, block.number), self.type,
+                self.base_vect, block.shape, block.origin)
+            nodes = _halo_take(
+                lattice._dcs, block, self.size, self.periodic, None)
+            for id, data in np.ndenumerate(nodes):
+                if data is not None:
+                    block_lattice._dcs[id] = DataContainer(data)
+            lattices.append(block_lattice)
+        return lattices
+
+    def assemble(self, lattices, lattice):
+        """Update the nodes of a lattice from the interiors of its blocks.
+
+        Parameters
+        ----------
+        lattices : list of Lattice
+            the block lattices (as returned by split).
+        lattice : Lattice
+            the decomposed lattice, which is updated.
+
+        """
+        self._check_lattice(lattice)
+        if len(lattices) != len(self.blocks):
+            raise ValueError(
+                'Expected {} block lattices, got {}'.format(
+                    len(self.blocks), len(lattices)))
+        for block, block_lattice in zip(self.blocks, lattices):
+            nodes = block_lattice._dcs[block.interior]
+            target = lattice._dcs[block.global_slices]
+            for id, data in np.ndenumerate(nodes):
+                target[id] = None if data is None else DataContainer(data)
+
+    def allocate_field(self, components=(), dtype=np.float64):
+        """Allocate a zeroed block field in shared memory.
+
+        Parameters
+        ----------
+        components : tuple of int
+            shape of the value at each node (a scalar by default).
+        dtype : numpy dtype
+
+        Returns
+        -------
+        BlockField
+
+        """
+        return BlockField(self, components, dtype)
+
+    def _check_lattice(self, lattice):
+        if tuple(int(n) for n in lattice.size) != self.size:
+            raise ValueError(
+                'The lattice size {} does not match the decomposition {}'
+                .format(tuple(lattice.size), self.size))
+
+
+class BlockField(object):
+    """A node field stored block by block with the halos.
+
+    The local arrays of all the blocks are views of the same shared
+    memory buffer, so that they can be updated in place by worker
+    processes (see map_blocks).
+
+    Attributes
+    ----------
+    decomposition : LatticeDecomposition
+    components : tuple of int
+        shape of the value at each node.
+    dtype : numpy dtype
+    arrays : list of arrays
+        the local array (block.shape + components) of each block.
+
+    """
+    def __init__(self, decomposition, components=(), dtype=np.float64,
+                 buffer=None):
+        self.decomposition = decomposition
+        self.components = tuple(components)
+        self.dtype = np.dtype(dtype)
+        shapes = [block.shape + self.components
+                  for block in decomposition.blocks]
+        counts = [int(np.prod(shape)) for shape in shapes]
+        if buffer is None:
+            buffer = RawArray(
+                ctypes.c_char, max(sum(counts), 1) * self.dtype.itemsize)
+        self.buffer = buffer
+        data = np.frombuffer(buffer, dtype=self.dtype)
+        offsets = np.cumsum([0] + counts)
+        self.arrays = [
+            data[offsets[i]:offsets[i + 1]].reshape(shape)
+            for i, shape in enumerate(shapes)]
+
+    def __getitem__(self, number):
+        return self.arrays[number]
+
+    def interior(self, number):
+        """ The interior of the local array of a block """
+        return self.arrays[number][self.decomposition.blocks[number].interior]
+
+    def scatter(self, field, fill_value=0):
+        """Copy a global field into the blocks (interiors and halos).
+
+        Parameters
+        ----------
+        field : array (lattice size + components)
+        fill_value : scalar
+            value of the halo nodes outside of a non-periodic lattice.
+
+        """
+        decomposition = self.decomposition
+        field = np.asarray(field)
+        if field.shape != decomposition.size + self.components:
+            raise ValueError(
+                'The field shape {} does not match {}'.format(
+                    field.shape, decomposition.size + self.components))
+        for block, array in zip(decomposition.blocks, self.arrays):
+            array[...] = _halo_take(
+                field, block, decomposition.size, decomposition.periodic,
+                fill_value)
+
+    def gather(self):
+        """Reassemble the global field from the interiors of the blocks.
+
+        Returns
+        -------
+        array (lattice size + components)
+
+        """
+        decomposition = self.decomposition
+        field = np.empty(decomposition.size + self.components, self.dtype)
+        for block, array in zip(decomposition.blocks, self.arrays):
+            field[block.global_slices] = array[block.interior]
+        return field
+
+    def exchange(self, fill_value=0):
+        """Update the halos of the blocks from the interiors of their
+        neighbours.
+
+        The axes are exchanged one after the other, and each exchange
+        includes the halos of the previous axes, so that the edge and
+        corner halo nodes are filled too.
+
+        Parameters
+        ----------
+        fill_value : scalar
+            value of the halo nodes outside of a non-periodic lattice.
+
+        """
+        decomposition = self.decomposition
+        halo = decomposition.halo
+        if halo == 0:
+            return
+        for axis in xrange(len(decomposition.size)):
+            for block, array in zip(decomposition.blocks, self.arrays):
+                for direction in (-1, 1):
+                    target = _slab(block, axis, direction, halo, ghost=True)
+                    neighbor = decomposition.neighbor(block, axis, direction)
+                    if neighbor is None:
+                        array[target] = fill_value
+                        continue
+                    source = _slab(
+                        neighbor, axis, -direction, halo, ghost=False)
+                    array[target] = self.arrays[neighbor.number][source]
+
+    def _layout(self):
+        # the picklable description of the field (without the buffer)
+        return self.decomposition, self.components, self.dtype
+
+
+def decompose_lattice(lattice, blocks=None, halo=1, periodic=True):
+    """Decompose a lattice in a grid of rectangular blocks.
+
+    Parameters
+    ----------
+    lattice : Lattice
+    blocks : int or tuple of D x int
+        number of blocks, or number of blocks along each axis. A number of
+        blocks is factored in the grid with the smallest halo surface
+        (default is the number of cpus).
+    halo : int
+        width of the ghost layers (at most the size of the smallest
+        block).
+    periodic : bool or tuple of D x bool
+        periodic boundaries (for all the axes, or for each axis).
+
+    Returns
+    -------
+    LatticeDecomposition
+
+    Raises
+    ------
+    ValueError
+        if the lattice cannot be split in the blocks.
+
+    """
+    size = tuple(int(n) for n in lattice.size)
+    dimension = len(size)
+    if np.ndim(periodic) == 0:
+        periodic = (bool(periodic),) * dimension
+    elif len(periodic) != dimension:
+        raise ValueError('periodic should have {} values'.format(dimension))
+    periodic = tuple(bool(value) for value in periodic)
+    if halo < 0:
+        raise ValueError('halo should not be negative')
+
+    if blocks is None:
+        blocks = multiprocessing.cpu_count()
+    if np.ndim(blocks) == 0:
+        grid = _block_grid(size, int(blocks))
+    else:
+        grid = tuple(int(k) for k in blocks)
+        if len(grid) != dimension:
+            raise ValueError('blocks should have {} values'.format(dimension))
+    if any(k < 1 or k > n for n, k in zip(size, grid)):
+        raise ValueError(
+            'Cannot split a lattice of size {} in {} blocks'.format(
+                size, grid))
+    if any(halo > n // k for n, k in zip(size, grid)):
+        raise ValueError(
+            'The halo ({}) is wider than the smallest block'.format(halo))
+    return LatticeDecomposition(lattice, grid, halo, periodic)
+
+
+def map_blocks(func, field, workers=None):
+    """Apply 'func' to every block of a field in parallel.
+
+    The workers share the memory of the field, so the blocks are not
+    copied on their way to the workers and back.
+
+    Parameters
+    ----------
+    func : callable
+        called as func(block, array) with the LatticeBlock and its local
+        array (with the halos). It either updates the interior of the
+        array in place and returns None, or returns the new interior
+        values. The halos of the other blocks are separate copies, so
+        the interior can be updated in place.
+    field : BlockField
+    workers : int
+        number of worker processes (default is the number of cpus).
+
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    tasks = [(func, number) for number in xrange(len(field.arrays))]
+    initargs = (field.buffer, field._layout())
+
+    if workers == 1 or len(tasks) < 2:
+        _worker['field'] = field
+        try:
+            for task in tasks:
+                _apply(task)
+        finally:
+            _worker.clear()
+        return
+
+    pool = multiprocessing.Pool(
+        min(workers, len(tasks)), _init_worker, initargs)
+    try:
+        pool.map(_apply, tasks, chunksize=1)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _init_worker(buffer, layout):
+    decomposition, components, dtype = layout
+    _worker['field'] = BlockField(decomposition, components, dtype, buffer)
+
+
+def _apply(task):
+    func, number = task
+    field = _worker['field']
+    block = field.decomposition.blocks[number]
+    array = field.arrays[number]
+    result = func(block, array)
+    if result is not None:
+        array[block.interior] = result
+
+
+def _block_grid(size, count):
+    # the factorization of 'count' in len(size) factors (each at most the
+    # size of its axis) with the smallest total halo surface
+    best, best_surface = None, None
+    for grid in _factorizations(count, len(size)):
+        if any(k > n for n, k in zip(size, grid)):
+            continue
+        block = [float(n) / k for n, k in zip(size, grid)]
+        surface = sum(
+            np.prod(block[:axis] + block[axis + 1:])
+            for axis in xrange(len(size)))
+        if best_surface is None or surface < best_surface:
+            best, best_surface = grid, surface
+    if best is None:
+        raise ValueError(
+            'Cannot split a lattice of size {} in {} blocks'.format(
+                size, count))
+    return best
+
+
+def _factorizations(count, dimension):
+    if dimension == 1:
+        yield (count,)
+        return
+    for k in xrange(1, count + 1):
+        if count % k == 0:
+            for rest in _factorizations(count // k, dimension - 1):
+                yield (k,) + rest
+
+
+def _halo_take(array, block, size, periodic, fill_value):
+    # the nodes of 'array' in the global index range of the block with its
+    # halos, wrapped around the periodic axes and filled elsewhere
+    indices, inside = [], []
+    for axis, n in enumerate(size):
+        index = np.arange(
+            block.start[axis] - block.halo, block.stop[axis] + block.halo)
+        if periodic[axis]:
+            index %= n
+            inside.append(np.ones(len(index), dtype=bool))
+        else:
+            inside.append((index >= 0) & (index < n))
+            index = np.clip(index, 0, n - 1)
+        indices.append(index)
+    result = array[np.ix_(*indices)]
+    mask = np.ones(block.shape, dtype=bool)
+    for axis, axis_inside in enumerate(inside):
+        shape = [1] * len(size)
+        shape[axis] = -1
+        mask &= axis_inside.reshape(shape)
+    if not mask.all():
+        result[~mask] = fill_value
+    return result
+
+
+def _slab(block, axis, direction, halo, ghost):
+    # the local slices of the halo layers ('ghost') or of the interior
+    # layers next to them, on one side of an axis; the previous axes span
+    # their halos and the next axes their interior
+    slices = []
+    for other, n in enumerate(block.size):
+        if other < axis:
+            slices.append(slice(None))
+        elif other > axis:
+            slices.append(slice(halo, halo + n))
+        elif direction < 0:
+            slices.append(slice(0, halo) if ghost else slice(halo, 2 * halo))
+        else:
+            slices.append(
+                slice(n + halo, n + 2 * halo) if ghost else slice(n, n + halo))
+    return tuple(slices)
@@ -26,10 +26,16 @@ make_cubic_lattice:
 
 make_orthorombicp_lattice:
     create and return a 3D orthorhombic (primitive) lattice.
+
+The neighbour stencils of the lattice types are defined in
+simphony.cuds.stencil.
 """
 import numpy as np
 from math import sqrt
+from simphony.core import instrumentation, serialization
 from simphony.core.data_container import DataContainer
+from simphony.core.memory import deep_getsizeof
+from simphony.cuds import stencil as stencils
 
 
 class LatticeNode:
@@ -51,6 +57,21 @@ class LatticeNode:
         else:
             self.data = DataContainer(data)
 
+    def to_bytes(self):
+        """Return a compact binary representation of the node."""
+        return (
+            serialization.pack_ints(self.id) +
+            serialization.pack_items(self.data))
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """Create a LatticeNode from the output of to_bytes."""
+        id, offset = serialization.unpack_ints(buffer)
+        items, _ = serialization.unpack_items(buffer, offset)
+        node = cls(id)
+        node.data = DataContainer._from_items(items)
+        return node
+
 
 class Lattice(object):
     """
@@ -117,6 +138,18 @@ class Lattice(object):
         id = lat_node.id
         self._dcs[id] = DataContainer(lat_node.data)
 
+    def update_nodes(self, lat_nodes):
+        """Update several lattice nodes (data copied).
+
+        Parameters:
+        -----------
+        lat_nodes: iterable of LatticeNode objects
+            data copied from the given nodes
+        """
+        dcs = self._dcs
+        for lat_node in lat_nodes:
+            dcs[lat_node.id] = DataContainer(lat_node.data)
+
     def iter_nodes(self, ids=None):
         """Get an iterator over the LatticeNodes described by the ids.
 
@@ -148,6 +181,78 @@ class Lattice(object):
         """
         return self.origin + self.base_vect*np.array(id)
 
+    def get_stencil(self, name=None):
+        """Get a neighbour stencil that fits the lattice type.
+
+        Parameters:
+        -----------
+        name: string (default value = None)
+            name of the stencil (e.g. 'D2Q9'), the default stencil of
+            the lattice type if None.
+
+        Returns:
+        -----------
+        A reference to a Stencil object
+        """
+        return stencils.get_stencil(name, self.type)
+
+    def get_neighbor_ids(self, id, stencil=None, periodic=True):
+        """Get the index coordinates of the neighbours of a node.
+
+        Parameters:
+        -----------
+        id: D x int (node index coordinate)
+        stencil: Stencil or string (default value = None)
+            the default stencil of the lattice type if None.
+        periodic: bool or D x bool (default value = True)
+            periodic boundaries (for all the axes, or for each axis).
+
+        Returns:
+        -----------
+        A list of (direction index, node index coordinate) pairs
+        """
+        if not isinstance(stencil, stencils.Stencil):
+            stencil = self.get_stencil(stencil)
+        return stencils.neighbor_ids(id, self.size, stencil, periodic)
+
+    def gather_neighbors(self, field, stencil=None, periodic=True,
+                         fill_value=0):
+        """Gather the values of a node field at the neighbours of the nodes.
+
+        Parameters:
+        -----------
+        field: array (self.size + component shape)
+            the values at the nodes.
+        stencil: Stencil or string (default value = None)
+            the default stencil of the lattice type if None.
+        periodic: bool or D x bool (default value = True)
+            periodic boundaries (for all the axes, or for each axis).
+        fill_value: scalar (default value = 0)
+            the value of the neighbours outside of a non-periodic lattice.
+
+        Returns:
+        -----------
+        Q x field.shape array, where result[q][id] is the value of the
+        field at the node id + stencil.offsets[q]
+        """
+        if not isinstance(stencil, stencils.Stencil):
+            stencil = self.get_stencil(stencil)
+        field = np.asarray(field)
+        if field.shape[:len(self.size)] != tuple(self.size):
+            raise ValueError(
+                'The field shape {} does not match the lattice size {}'
+                .format(field.shape, tuple(self.size)))
+        return stencils.gather_neighbors(field, stencil, periodic, fill_value)
+
+    def memory_usage(self):
+        """Get the approximate number of bytes used by the lattice.
+
+        Returns:
+        -----------
+        int (the node array and the DataContainers of the nodes)
+        """
+        return deep_getsizeof(self)
+
 
 def make_hexagonal_lattice(name, h, size, origin=(0, 0)):
     """Create and return a 2D hexagonal lattice.
@@ -247,3 +352,7 @@ def make_orthorombicp_lattice(name, hs, size, origin=(0, 0, 0)):
     A reference to a Lattice object.
     """
     return Lattice(name, 'OrthorombicP', hs, size, origin)
+
+
+instrumentation.instrument(
+    Lattice, ('get_node', 'update_node', 'update_nodes', 'iter_nodes'))
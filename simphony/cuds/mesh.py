@@ -5,8 +5,13 @@ and modify a mesh
 
 """
 import uuid
+import numpy
 from abstractmesh import ABCMesh
 import simphony.core.data_container as dc
+from simphony.core import instrumentation, serialization
+from simphony.core.memory import deep_getsizeof
+from simphony.core.space_filling import curve_order
+from simphony.cuds.change_tracking import ChangeSet
 
 
 class Point(object):
@@ -52,6 +57,27 @@ class Point(object):
             point.data
         )
 
+    def to_bytes(self):
+        """ Returns a compact binary representation of the point.
+
+        """
+        return (
+            serialization.pack_id(self.uuid) +
+            serialization.pack_floats(self.coordinates) +
+            serialization.pack_items(self.data))
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """ Creates a point from the output of ``to_bytes``.
+
+        """
+        uuid, offset = serialization.unpack_id(buffer)
+        coordinates, offset = serialization.unpack_floats(buffer, offset)
+        items, _ = serialization.unpack_items(buffer, offset)
+        point = cls(coordinates, uuid)
+        point.data = dc.DataContainer._from_items(items)
+        return point
+
 
 class Element(object):
     """ Element base class
@@ -95,6 +121,30 @@ class Element(object):
             element.data
         )
 
+    def to_bytes(self):
+        """ Returns a compact binary representation of the element.
+
+        """
+        return (
+            serialization.pack_id(self.uuid) +
+            serialization.pack_ids(self.points) +
+            serialization.pack_items(self.data))
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """ Creates an element from the output of ``to_bytes``.
+
+        The type of the returned element is the class on which
+        the method is called (e.g. ``Cell.from_bytes``).
+
+        """
+        uuid, offset = serialization.unpack_id(buffer)
+        points, offset = serialization.unpack_ids(buffer, offset)
+        items, _ = serialization.unpack_items(buffer, offset)
+        element = cls(points, uuid)
+        element.data = dc.DataContainer._from_items(items)
+        return element
+
 
 class Edge(Element):
     """ Edge element
@@ -217,6 +267,8 @@ class Mesh(ABCMesh):
         self._faces = {}
         self._cells = {}
 
+        self._changes = None
+
     def get_point(self, uuid):
         """ Returns a point with a given uuid.
 
@@ -365,6 +417,7 @@ class Mesh(ABCMesh):
             raise KeyError(error_str)
 
         self._points[point.uuid] = Point.from_point(point)
+        self._track('points', 'added', point.uuid)
 
         return point.uuid
 
@@ -396,6 +449,7 @@ class Mesh(ABCMesh):
             raise KeyError(error_str)
 
         self._edges[edge.uuid] = Edge.from_edge(edge)
+        self._track('edges', 'added', edge.uuid)
 
         return edge.uuid
 
@@ -427,6 +481,7 @@ class Mesh(ABCMesh):
             raise KeyError(error_str)
 
         self._faces[face.uuid] = Face.from_face(face)
+        self._track('faces', 'added', face.uuid)
 
         return face.uuid
 
@@ -458,6 +513,7 @@ class Mesh(ABCMesh):
             raise KeyError(error_str)
 
         self._cells[cell.uuid] = Cell.from_cell(cell)
+        self._track('cells', 'added', cell.uuid)
 
         return cell.uuid
 
@@ -497,6 +553,7 @@ class Mesh(ABCMesh):
 
         point_to_update.data = point.data
         point_to_update.coordinates = point.coordinates
+        self._track('points', 'updated', point.uuid)
 
     def update_edge(self, edge):
         """ Updates the information of an edge.
@@ -534,6 +591,7 @@ class Mesh(ABCMesh):
 
         edge_to_update.data = edge.data
         edge_to_update.points = edge.points
+        self._track('edges', 'updated', edge.uuid)
 
     def update_face(self, face):
         """ Updates the information of a face.
@@ -571,6 +629,7 @@ class Mesh(ABCMesh):
 
         face_to_update.data = face.data
         face_to_update.points = face.points
+        self._track('faces', 'updated', face.uuid)
 
     def update_cell(self, cell):
         """ Updates the information of a cell.
@@ -608,6 +667,31 @@ class Mesh(ABCMesh):
 
         cell_to_update.data = cell.data
         cell_to_update.points = cell.points
+        self._track('cells', 'updated', cell.uuid)
+
+    def update_cells(self, cells):
+        """ Updates the information of several cells.
+
+        See update_cell.
+
+        Parameters
+        ----------
+        cells : iterable of Cell
+            Cells to be updated
+
+        Raises
+        ------
+        KeyError
+            If a cell was not found in the mesh (the cells before it
+            are updated)
+
+        TypeError
+            If an object provided is not a cell
+
+        """
+
+        for cell in cells:
+            self.update_cell(cell)
 
     def iter_points(self, point_uuids=None):
         """ Returns an iterator over the selected points.
@@ -758,6 +842,107 @@ class Mesh(ABCMesh):
         """
         return len(self._cells) > 0
 
+    def track_changes(self, enabled=True):
+        """ Enables (or disables) the tracking of the modified items.
+
+        When enabled, the uuids of the points, edges, faces and cells
+        that are added and updated are recorded in a ChangeSet for each
+        kind of item (see get_changes).
+
+        Parameters
+        ----------
+        enabled : bool
+            True to record the changes, False to stop recording them.
+
+        """
+
+        if enabled:
+            self._changes = {
+                kind: ChangeSet()
+                for kind in ('points', 'edges', 'faces', 'cells')}
+        else:
+            self._changes = None
+
+    def get_changes(self, kind):
+        """ Returns the recorded changes of a kind of item
+
+        Parameters
+        ----------
+        kind : str
+            'points', 'edges', 'faces' or 'cells'
+
+        Returns
+        -------
+        ChangeSet
+            The changes since the tracking was enabled or the last call
+            to clear_changes. None if the tracking is disabled.
+
+        """
+
+        if self._changes is None:
+            return None
+        return self._changes[kind]
+
+    def clear_changes(self):
+        """ Forgets the recorded changes (e.g. after a checkpoint)
+
+        """
+
+        if self._changes is not None:
+            for changes in self._changes.itervalues():
+                changes.clear()
+
+    def reorder_points(self, method='hilbert'):
+        """ Sorts the storage of the points along a space-filling curve
+
+        The points are copied one after the other in the order of the
+        curve (see simphony.core.space_filling), so the points that are
+        close in space are also close in memory. The uuids and the
+        contents of the points do not change.
+
+        Parameters
+        ----------
+        method : str
+            'hilbert' (the default) or 'morton'
+
+        Raises
+        ------
+        ValueError
+            If the method is unknown
+
+        """
+
+        uuids = self._points.keys()
+        points = self._points.values()
+        order = curve_order(
+            numpy.array([point.coordinates for point in points],
+                        dtype=numpy.float64).reshape(-1, 3), method)
+        reordered = {}
+        for index in order.tolist():
+            reordered[uuids[index]] = Point.from_point(points[index])
+        self._points = reordered
+
+    def memory_usage(self):
+        """ Returns the approximate number of bytes used by the mesh
+
+        The points and the elements, with their DataContainers, are
+        counted.
+
+        """
+
+        return deep_getsizeof(self)
+
+    def _track(self, kind, change, uuid):
+        """ Records the change of an item if the tracking is enabled
+
+        """
+
+        if self._changes is not None:
+            if change == 'added':
+                self._changes[kind].mark_added(uuid)
+            else:
+                self._changes[kind].mark_updated(uuid)
+
     def _generate_uuid(self):
         """ Provides and uuid for the object
 
@@ -765,3 +950,11 @@ class Mesh(ABCMesh):
         """
 
         return uuid.uuid4()
+
+
+instrumentation.instrument(
+    Mesh,
+    ['{}_{}'.format(operation, kind)
+     for operation in ('get', 'add', 'update')
+     for kind in ('point', 'edge', 'face', 'cell')] + ['update_cells'] +
+    ['iter_{}s'.format(kind) for kind in ('point', 'edge', 'face', 'cell')])
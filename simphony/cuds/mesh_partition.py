@@ -0,0 +1,257 @@
+""" Mesh partitioning module
+
+This module splits the cells of a mesh in balanced parts with recursive
+coordinate bisection (RCB): the cell centroids are split at the median
+along the longest extent of their bounding box, and each half is split
+again until there are as many parts as requested. The parts are compact
+boxes, so the number of points shared between the parts (the interface)
+stays small.
+
+Each part can be extracted as its own Mesh, and the points that are
+shared by cells of several parts are identified so that the parts can be
+processed separately and their boundary values exchanged.
+
+Example
+-------
+>>> partition = partition_mesh(mesh, 4)
+>>> meshes = partition.meshes(mesh)
+>>> partition.shared_points(0)  # the uuids on the interface of part 0
+
+"""
+from collections import defaultdict
+from itertools import chain, count, imap, izip
+from operator import attrgetter
+from uuid import UUID
+
+import numpy as np
+
+from simphony.cuds.mesh import Mesh
+
+
+class MeshPartition(object):
+    """ The partition of the cells of a mesh in parts
+
+    Attributes
+    ----------
+    parts : int
+        number of parts.
+    cell_uuids : list of uuids
+        the uuids of the cells of the mesh.
+    labels : array of int
+        the part of each cell (in the order of cell_uuids).
+    boundary_points : dict
+        point uuid -> sorted tuple of the parts whose cells share the
+        point, for the points shared by cells of more than one part.
+
+    """
+
+    def __init__(self, parts, cell_uuids, labels, boundary_points):
+        self.parts = parts
+        self.cell_uuids = cell_uuids
+        self.labels = labels
+        self.boundary_points = boundary_points
+        self._parts_of_cells = None
+
+    def cells(self, part):
+        """ Returns the uuids of the cells of a part
+
+        """
+
+        return [self.cell_uuids[i]
+                for i in np.flatnonzero(self.labels == part).tolist()]
+
+    def part_of(self, cell_uuid):
+        """ Returns the part of a cell
+
+        """
+
+        if self._parts_of_cells is None:
+            self._parts_of_cells = dict(
+                zip(self.cell_uuids, self.labels.tolist()))
+        return self._parts_of_cells[cell_uuid]
+
+    def shared_points(self, part):
+        """ Returns the uuids of the points of a part shared with others
+
+        """
+
+        return set(uuid for uuid, parts in self.boundary_points.iteritems()
+                   if part in parts)
+
+    def extract(self, mesh, part):
+        """ Returns the cells of a part with their points as a new Mesh
+
+        The points and cells keep their uuids. The edges and faces of the
+        mesh whose points all belong to the part are included too (so an
+        edge or face on the interface belongs to both parts).
+
+        Parameters
+        ----------
+        mesh : ABCMesh
+            the partitioned mesh.
+        part : int
+            the part.
+
+        Returns
+        -------
+        Mesh
+
+        """
+
+        if not 0 <= part < self.parts:
+            raise ValueError(
+                'part should be in [0, {}), got {}'.format(self.parts, part))
+        return self._extract(mesh, [part])[0]
+
+    def meshes(self, mesh):
+        """ Returns every part as a new Mesh (see extract)
+
+        """
+
+        return self._extract(mesh, range(self.parts))
+
+    def _extract(self, mesh, parts):
+        # The elements are read once and grouped by part: the parts of
+        # each point are the parts of its cells, and an edge or face
+        # belongs to the parts that all its points belong to.
+        results = {part: Mesh() for part in parts}
+        point_parts = defaultdict(set)
+        for part in parts:
+            result = results[part]
+            for cell in mesh.iter_cells(self.cells(part)):
+                for uuid in cell.points:
+                    point_parts[uuid].add(part)
+                result.add_cell(cell)
+        for point in mesh.iter_points(point_parts.keys()):
+            for part in point_parts[point.uuid]:
+                results[part].add_point(point)
+        for element in mesh.iter_edges():
+            for part in _common_parts(point_parts, element.points):
+                results[part].add_edge(element)
+        for element in mesh.iter_faces():
+            for part in _common_parts(point_parts, element.points):
+                results[part].add_face(element)
+        return [results[part] for part in parts]
+
+
+def partition_mesh(mesh, parts):
+    """ Partitions the cells of a mesh in balanced parts
+
+    The cells are split with recursive coordinate bisection of their
+    centroids, so the parts have the same number of cells (up to the
+    rounding of the splits).
+
+    Parameters
+    ----------
+    mesh : ABCMesh
+        the mesh.
+    parts : int
+        number of parts.
+
+    Returns
+    -------
+    MeshPartition
+
+    Raises
+    ------
+    ValueError
+        If the number of parts is not positive
+
+    """
+
+    if parts < 1:
+        raise ValueError('parts should be a positive number')
+
+    cell_uuids, indices, counts, point_uuids, coordinates = \
+        _cell_arrays(mesh)
+    labels = np.zeros(len(cell_uuids), dtype=np.int32)
+    if len(cell_uuids) > 0:
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        centroids = (np.add.reduceat(coordinates[indices], starts) /
+                     counts[:, np.newaxis])
+        _bisect(centroids, np.arange(len(cell_uuids)), 0, parts, labels)
+
+    return MeshPartition(
+        parts, cell_uuids, labels,
+        _boundary_points(indices, counts, labels, point_uuids))
+
+
+def _common_parts(point_parts, points):
+    # the parts that all the points belong to
+    parts = point_parts.get(points[0], ()) if len(points) > 0 else ()
+    for uuid in points[1:]:
+        if not parts:
+            break
+        parts = parts.intersection(point_parts.get(uuid, ()))
+    return parts
+
+
+def _cell_arrays(mesh):
+    # The uuids of the cells, the flattened point indices of the cells,
+    # the number of points of each cell, the uuids of the points and their
+    # coordinates. Each point and cell is read once from the iterators of
+    # the mesh.
+    point_uuids = []
+    coordinates = []
+    for point in mesh.iter_points():
+        point_uuids.append(point.uuid)
+        coordinates.append(point.coordinates)
+    coordinates = np.array(coordinates, dtype=np.float64).reshape(-1, 3)
+    cell_uuids = []
+    cell_points = []
+    for cell in mesh.iter_cells():
+        cell_uuids.append(cell.uuid)
+        cell_points.append(cell.points)
+    counts = np.fromiter(
+        imap(len, cell_points), dtype=np.int64, count=len(cell_uuids))
+    if np.any(counts == 0):
+        raise ValueError('The cells should have at least one point')
+
+    # the uuids are looked up by their integer value, since hashing a
+    # UUID object calls python code
+    key = _uuid_key(point_uuids)
+    rows = dict(izip(imap(key, point_uuids), count()))
+    indices = np.fromiter(
+        imap(rows.__getitem__, imap(key, chain.from_iterable(cell_points))),
+        dtype=np.int64, count=int(counts.sum()))
+    return cell_uuids, indices, counts, point_uuids, coordinates
+
+
+def _uuid_key(uuids):
+    if all(isinstance(uuid, UUID) for uuid in uuids):
+        return attrgetter('int')
+    return lambda uuid: uuid
+
+
+def _bisect(centroids, cells, first, parts, labels):
+    # assign the parts first ... first + parts - 1 to the cells
+    if parts == 1 or len(cells) == 0:
+        labels[cells] = first
+        return
+    left_parts = parts // 2
+    left_size = len(cells) * left_parts // parts
+    points = centroids[cells]
+    axis = np.argmax(points.max(axis=0) - points.min(axis=0))
+    if 0 < left_size < len(cells):
+        order = np.argpartition(points[:, axis], left_size)
+    else:
+        order = np.arange(len(cells))
+    _bisect(centroids, cells[order[:left_size]], first, left_parts, labels)
+    _bisect(centroids, cells[order[left_size:]], first + left_parts,
+            parts - left_parts, labels)
+
+
+def _boundary_points(indices, counts, labels, point_uuids):
+    # the points used by the cells of more than one part
+    if len(indices) == 0:
+        return {}
+    # the sorted unique (point index, part) pairs, encoded as integers
+    parts = int(labels.max()) + 1
+    pairs = np.unique(indices * parts + np.repeat(labels, counts))
+    _, part_counts = np.unique(pairs // parts, return_counts=True)
+    pairs = pairs[np.repeat(part_counts > 1, part_counts)]
+    boundary_points = defaultdict(list)
+    for index, part in zip((pairs // parts).tolist(),
+                           (pairs % parts).tolist()):
+        boundary_points[point_uuids[index]].append(part)
+    return {uuid: tuple(parts) for uuid, parts in boundary_points.iteritems()}
@@ -0,0 +1,199 @@
+"""Process-pool parallel map over the elements of the cuds containers.
+
+The ids of the elements of a container are partitioned in chunks. The
+elements of each chunk are read and encoded with the compact binary
+encoding of the elements (see simphony.core.serialization) only when a
+worker of the pool is free to process them, so only a few chunks are
+held in memory at once. The workers apply the user function to each
+element and send back the modified elements, which are merged into the
+container with one bulk update for each chunk (e.g. update_particles).
+
+Routines:
+---------
+map_particles:
+    apply a function to the particles of a particle container.
+
+map_cells:
+    apply a function to the cells of a mesh.
+
+map_nodes:
+    apply a function to the nodes of a lattice.
+
+.. note::
+
+    The function should be picklable (i.e. defined at the top level of a
+    module) so that it can be sent to the worker processes.
+
+"""
+import multiprocessing
+from collections import deque
+
+import numpy
+
+from simphony.core.serialization import pack_records, unpack_records
+from simphony.cuds.lattice import LatticeNode
+from simphony.cuds.mesh import Cell
+from simphony.cuds.particles import Particle
+
+DEFAULT_CHUNK = 1000
+
+
+def map_particles(func, container, workers=None, chunk=DEFAULT_CHUNK):
+    """Apply 'func' to every particle of the container in parallel.
+
+    Parameters
+    ----------
+    func : callable
+        function called with a copy of each particle. It should return
+        the modified particle (which is then updated in the container)
+        or None if the particle does not need to be updated.
+    container : ABCParticleContainer
+        the particle container.
+    workers : int
+        number of worker processes (default is the number of cpus).
+    chunk : int
+        number of particles sent to a worker at once.
+
+    Returns
+    -------
+    int
+        the number of updated particles.
+
+    """
+    return _map_elements(
+        func, [particle.id for particle in container.iter_particles()],
+        container.iter_particles, Particle,
+        _bulk_update(container, 'update_particles', 'update_particle'),
+        workers, chunk)
+
+
+def map_cells(func, mesh, workers=None, chunk=DEFAULT_CHUNK):
+    """Apply 'func' to every cell of the mesh in parallel.
+
+    Parameters
+    ----------
+    func : callable
+        function called with a copy of each cell. It should return
+        the modified cell (which is then updated in the mesh) or None
+        if the cell does not need to be updated.
+    mesh : ABCMesh
+        the mesh.
+    workers : int
+        number of worker processes (default is the number of cpus).
+    chunk : int
+        number of cells sent to a worker at once.
+
+    Returns
+    -------
+    int
+        the number of updated cells.
+
+    """
+    return _map_elements(
+        func, [cell.uuid for cell in mesh.iter_cells()], mesh.iter_cells,
+        Cell, _bulk_update(mesh, 'update_cells', 'update_cell'), workers,
+        chunk)
+
+
+def map_nodes(func, lattice, workers=None, chunk=DEFAULT_CHUNK):
+    """Apply 'func' to every node of the lattice in parallel.
+
+    Parameters
+    ----------
+    func : callable
+        function called with a copy of each node. It should return
+        the modified node (which is then updated in the lattice) or None
+        if the node does not need to be updated.
+    lattice : Lattice
+        the lattice.
+    workers : int
+        number of worker processes (default is the number of cpus).
+    chunk : int
+        number of nodes sent to a worker at once.
+
+    Returns
+    -------
+    int
+        the number of updated nodes.
+
+    """
+    return _map_elements(
+        func, list(numpy.ndindex(*lattice.size)), lattice.iter_nodes,
+        LatticeNode, _bulk_update(lattice, 'update_nodes', 'update_node'),
+        workers, chunk)
+
+
+def _map_elements(func, ids, iter_elements, cls, update, workers, chunk):
+    if chunk < 1:
+        raise ValueError('chunk should be a positive number')
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    # the chunks are read by id, so merging the updated elements back
+    # does not disturb the reading of the next chunks.
+    tasks = (
+        (func, cls,
+         pack_records(list(iter_elements(ids[start:start + chunk]))))
+        for start in xrange(0, len(ids), chunk))
+    number_of_tasks = -(-len(ids) // chunk)
+
+    if workers == 1 or number_of_tasks < 2:
+        results = (_apply(task) for task in tasks)
+        return _merge(results, cls, update)
+
+    workers = min(workers, number_of_tasks)
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = _imap_bounded(pool, tasks, 2 * workers)
+        return _merge(results, cls, update)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _imap_bounded(pool, tasks, window):
+    # The results of the tasks, in order. A task is taken from the
+    # iterator (i.e. its chunk is read and encoded, in this thread) only
+    # when fewer than 'window' tasks are pending, while Pool.imap would
+    # consume all the tasks at once in a background thread.
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(_apply, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _merge(results, cls, update):
+    count = 0
+    for buffer in results:
+        elements = unpack_records(buffer, cls.from_bytes)
+        if elements:
+            update(elements)
+        count += len(elements)
+    return count
+
+
+def _bulk_update(container, bulk_name, name):
+    # the bulk update method of the container, or a loop over its single
+    # element update method
+    update = getattr(container, bulk_name, None)
+    if update is not None:
+        return update
+    update_element = getattr(container, name)
+
+    def update(elements):
+        for element in elements:
+            update_element(element)
+    return update
+
+
+def _apply(task):
+    func, cls, buffer = task
+    results = []
+    for element in unpack_records(buffer, cls.from_bytes):
+        result = func(element)
+        if result is not None:
+            results.append(result)
+    return pack_records(results)
@@ -9,13 +9,23 @@
         Bond --------------------> Concrete implementation of the class repre-
            senting the bonds between Particles or Atoms. This class should re-
            present any kind of interaction (between atoms, molecules, etc.)
+        ParticleContainerSnapshot -> Read-only view of the state of a
+           ParticleContainer at a given time.
 """
 from __future__ import print_function
 import uuid
+import weakref
+
+import numpy
 
 from simphony.cuds.abstractparticles import ABCParticleContainer
+from simphony.cuds.change_tracking import ChangeSet
 import simphony.cuds.pcexceptions as pce
+from simphony.core import instrumentation, serialization
 from simphony.core.data_container import DataContainer
+from simphony.core.layered_dict import LayeredDict
+from simphony.core.memory import deep_getsizeof
+from simphony.core.space_filling import curve_order
 
 
 class ParticleContainer(ABCParticleContainer):
@@ -26,16 +36,58 @@ class ParticleContainer(ABCParticleContainer):
        ----------
 
         _particles : dictionary
-            data structure for particles storage
+            data structure for particles storage (a LayeredDict while
+            snapshots share it)
         _bonds : dictionary
-            data structure for bonds storage
+            data structure for bonds storage (a LayeredDict while
+            snapshots share it)
         data : DataContainer
             data attributes of the element
+        _snapshots : dictionary
+            the live views (held by the snapshots and their iterators) of
+            each of the storage dictionaries
+        _changes : dictionary
+            the ChangeSet of the particles and the bonds (None when the
+            change tracking is disabled)
+        _particle_bonds : dictionary
+            the set of the ids of the bonds of each particle id (index
+            maintained by the bond methods)
     """
     def __init__(self):
         self._particles = {}
         self._bonds = {}
         self.data = DataContainer()
+        self._snapshots = {
+            '_particles': weakref.WeakSet(), '_bonds': weakref.WeakSet()}
+        self._changes = None
+        self._particle_bonds = {}
+
+    def __getstate__(self):
+        """Returns the state to pickle.
+
+        The registries of the live snapshots and the recorded changes are
+        left out, and the storage shared with snapshots is merged into
+        plain dictionaries.
+        """
+        state = self.__dict__.copy()
+        state.pop('_snapshots', None)
+        state['_changes'] = self._changes is not None
+        for name in ('_particles', '_bonds'):
+            if isinstance(state[name], LayeredDict):
+                state[name] = state[name].copy()
+        return state
+
+    def __setstate__(self, state):
+        """Restores a pickled state, with empty snapshot registries (and
+        empty change sets if the change tracking was enabled).
+        """
+        tracking = state.pop('_changes')
+        self.__dict__.update(state)
+        self._snapshots = {
+            '_particles': weakref.WeakSet(), '_bonds': weakref.WeakSet()}
+        self._changes = None
+        if tracking:
+            self.track_changes()
 
 # ================================================================
 
@@ -80,8 +132,11 @@ class ParticleContainer(ABCParticleContainer):
         >>> part_container = ParticleContainer()
         >>> part_container.add_particle(part)
         """
-        return self._add_element(
-            self._particles, new_particle, clone=Particle.from_particle)
+        cur_id = self._add_element(
+            self._writable('_particles'), new_particle,
+            clone=Particle.from_particle)
+        self._track('particles', 'added', cur_id)
+        return cur_id
 
     def add_bond(self, new_bond):
         """Adds the 'new_bond' bond to the container.
@@ -120,7 +175,11 @@ class ParticleContainer(ABCParticleContainer):
         >>> part_container = ParticleContainer()
         >>> part_container.add_bond(bond)
         """
-        return self._add_element(self._bonds, new_bond, Bond.from_bond)
+        cur_id = self._add_element(
+            self._writable('_bonds'), new_bond, Bond.from_bond)
+        self._index_bond(cur_id, new_bond.particles)
+        self._track('bonds', 'added', cur_id)
+        return cur_id
 
     def update_particle(self, particle):
         """Replaces an existing particle with the 'particle' new particle.
@@ -157,7 +216,29 @@ class ParticleContainer(ABCParticleContainer):
         >>> part_container.update_particle(part)
         """
         self._update_element(
-            self._particles, particle, clone=Particle.from_particle)
+            self._writable('_particles'), particle,
+            clone=Particle.from_particle)
+        self._track('particles', 'updated', particle.id)
+
+    def update_particles(self, particles):
+        """Replaces several existing particles (see update_particle).
+
+        Parameters
+        ----------
+
+        particles : iterable of Particle
+            the particles that will be replaced.
+
+        Raises
+        ------
+        KeyError exception if a particle doesn't exists (the particles
+        before it are replaced).
+        """
+        cur_dict = self._writable('_particles')
+        for particle in particles:
+            self._update_element(
+                cur_dict, particle, clone=Particle.from_particle)
+            self._track('particles', 'updated', particle.id)
 
     def update_bond(self, bond):
         """Replaces an existing bond with the 'bond' new bond.
@@ -193,7 +274,11 @@ class ParticleContainer(ABCParticleContainer):
         >>> ... #do whatever you want with the bond
         >>> part_container.update_bond(bond)
         """
-        self._update_element(self._bonds, bond, clone=Bond.from_bond)
+        old_bond = self._update_element(
+            self._writable('_bonds'), bond, clone=Bond.from_bond)
+        self._unindex_bond(bond.id, old_bond.particles)
+        self._index_bond(bond.id, bond.particles)
+        self._track('bonds', 'updated', bond.id)
 
     def get_particle(self, particle_id):
         """Returns a copy of the particle with the 'particle_id' id.
@@ -243,7 +328,7 @@ class ParticleContainer(ABCParticleContainer):
                 'Bond with id {} not found!'.format(bond_id))
         return Bond.from_bond(bond)
 
-    def remove_particle(self, particle_id):
+    def remove_particle(self, particle_id, remove_bonds=False):
         """Removes the particle with the 'particle_id' id from the container.
 
         The id passed as parameter should exists in the container. Otherwise
@@ -254,6 +339,9 @@ class ParticleContainer(ABCParticleContainer):
 
         particle_id : Particle
             the id of the particle to be removed.
+        remove_bonds : bool
+            if True, the bonds of the particle are removed too (found
+            with the particle to bond index, without scanning the bonds).
 
         Raises
         ------
@@ -277,10 +365,15 @@ class ParticleContainer(ABCParticleContainer):
         """
 
         try:
-            self._remove_element(self._particles, particle_id)
+            self._remove_element(
+                self._writable('_particles'), particle_id)
         except KeyError:
             raise KeyError(
                 'Particle with id { } not found!'.format(particle_id))
+        self._track('particles', 'removed', particle_id)
+        if remove_bonds:
+            for bond_id in self._bond_ids_of(particle_id):
+                self.remove_bond(bond_id)
 
     def remove_bond(self, bond_id):
         """Removes the bond with the 'bond_id' id from the container.
@@ -312,10 +405,12 @@ class ParticleContainer(ABCParticleContainer):
         """
 
         try:
-            self._remove_element(self._bonds, bond_id)
+            old_bond = self._remove_element(self._writable('_bonds'), bond_id)
         except KeyError:
             raise KeyError(
                 'Bond with id { } not found!'.format(bond_id))
+        self._unindex_bond(bond_id, old_bond.particles)
+        self._track('bonds', 'removed', bond_id)
 
     def iter_particles(self, particle_ids=None):
         """Generator method for iterating over the particles of the container.
@@ -420,6 +515,34 @@ class ParticleContainer(ABCParticleContainer):
         else:
             return self._iter_all(self._bonds, clone=Bond.from_bond)
 
+    def iter_bonds_of_particle(self, particle_id):
+        """Generator method for iterating over the bonds of a particle.
+
+        The bonds are found with an index of the bonds of each particle
+        (maintained when the bonds are added, updated and removed), so the
+        cost does not depend on the total number of bonds.
+
+        Parameters
+        ----------
+
+        particle_id : uint32
+            the id of the particle (it does not need to be in the
+            container, no bonds are yielded for an unknown id).
+
+        Yields
+        -------
+        Yields each bond that includes the particle.
+
+        Examples
+        --------
+        >>> part_container = ParticleContainer()
+        >>> ...
+        >>> for bond in part_container.iter_bonds_of_particle(id):
+                ...  #do stuff
+        """
+        return self._iter_elements(
+            self._bonds, self._bond_ids_of(particle_id), clone=Bond.from_bond)
+
     def has_particle(self, id):
         """Checks if a particle with the given id already exists
         in the container."""
@@ -430,12 +553,165 @@ class ParticleContainer(ABCParticleContainer):
         in the container."""
         return id in self._bonds
 
+    def track_changes(self, enabled=True):
+        """Enables (or disables) the tracking of the modified elements.
+
+        When enabled, the ids of the particles and bonds that are added,
+        updated and removed are recorded in a ChangeSet for each kind of
+        element (see get_changes). Enabling the tracking again starts with
+        empty change sets.
+
+        Parameters
+        ----------
+
+        enabled : bool
+            True to record the changes, False to stop recording them.
+        """
+        if enabled:
+            self._changes = {'particles': ChangeSet(), 'bonds': ChangeSet()}
+        else:
+            self._changes = None
+
+    def get_changes(self, kind):
+        """Returns the recorded changes of the 'kind' elements.
+
+        Parameters
+        ----------
+
+        kind : str
+            'particles' or 'bonds'
+
+        Returns
+        -------
+        ChangeSet
+            The changes since the tracking was enabled or the last
+            call to clear_changes. None if the tracking is disabled.
+        """
+        if self._changes is None:
+            return None
+        return self._changes[kind]
+
+    def clear_changes(self):
+        """Forgets the recorded changes (e.g. after a checkpoint)."""
+        if self._changes is not None:
+            for changes in self._changes.itervalues():
+                changes.clear()
+
+    def memory_usage(self):
+        """Returns the approximate number of bytes used by the container.
+
+        The particles, the bonds (with their DataContainers) and the
+        bookkeeping structures of the container are counted. The storage
+        that is shared with snapshots is counted as well.
+        """
+        return deep_getsizeof(self)
+
+    def reorder(self, method='hilbert'):
+        """Sorts the storage of the particles along a space-filling curve.
+
+        The particles are copied one after the other in the order of the
+        curve (see simphony.core.space_filling), so the particles that are
+        close in space are also close in memory, which improves the cache
+        locality of the loops over neighbouring particles. The ids, the
+        contents of the particles and the bonds do not change. The live
+        snapshots keep the previous storage.
+
+        Parameters
+        ----------
+        method : str
+            'hilbert' (the default) or 'morton'
+
+        Raises
+        ------
+        ValueError
+            If the method is unknown
+        """
+        self._writable('_particles')
+        self._particles = _curve_ordered(self._particles, method)
+
+    def snapshot(self):
+        """Returns a read-only view of the current state of the container.
+
+        Taking a snapshot does not copy the particles and the bonds. The
+        storage is turned into a LayeredDict whose frozen layers are
+        shared with the snapshot, and the modifications that follow go to
+        a new top layer, so taking a snapshot and the next modifications
+        cost O(1) whatever the number of particles. The snapshot keeps a
+        consistent state while the container is updated. Once no snapshot
+        is alive, the layers are merged back into a single dictionary.
+
+        Returns
+        -------
+        ParticleContainerSnapshot
+            A read-only particle container.
+
+        Examples
+        --------
+        >>> part_container = ParticleContainer()
+        >>> ...
+        >>> snapshot = part_container.snapshot()
+        >>> for particle in snapshot.iter_particles():
+                ...  # the container can be updated while iterating
+                part_container.update_particle(particle)
+        """
+        return ParticleContainerSnapshot(
+            self._freeze('_particles'), self._freeze('_bonds'), self.data)
+
 # ================================================================
 
     # private methods to make the code more readable and compact
 
 # ================================================================
 
+    def _track(self, kind, change, cur_id):
+        if self._changes is not None:
+            changes = self._changes[kind]
+            if change == 'added':
+                changes.mark_added(cur_id)
+            elif change == 'updated':
+                changes.mark_updated(cur_id)
+            else:
+                changes.mark_removed(cur_id)
+
+    def _bond_ids_of(self, particle_id):
+        return list(self._particle_bonds.get(particle_id, ()))
+
+    def _index_bond(self, bond_id, particles):
+        for particle_id in particles:
+            self._particle_bonds.setdefault(particle_id, set()).add(bond_id)
+
+    def _unindex_bond(self, bond_id, particles):
+        for particle_id in particles:
+            bond_ids = self._particle_bonds.get(particle_id)
+            if bond_ids is not None:
+                bond_ids.discard(bond_id)
+                if len(bond_ids) == 0:
+                    del self._particle_bonds[particle_id]
+
+    def _writable(self, name):
+        """Returns the storage dictionary 'name' ready to be modified.
+
+        The layers of the storage are merged back into a single dictionary
+        first if no live snapshot shares them any more.
+        """
+        cur_dict = getattr(self, name)
+        if isinstance(cur_dict, LayeredDict) and \
+                len(self._snapshots[name]) == 0:
+            cur_dict = cur_dict.collapse()
+            setattr(self, name, cur_dict)
+        return cur_dict
+
+    def _freeze(self, name):
+        """Returns a read-only view of the storage dictionary 'name'."""
+        cur_dict = self._writable(name)
+        if not isinstance(cur_dict, LayeredDict):
+            cur_dict = LayeredDict(cur_dict)
+            setattr(self, name, cur_dict)
+        view = cur_dict.freeze()
+        cur_dict.compact()
+        self._snapshots[name].add(view)
+        return view
+
     def _iter_elements(self, cur_dict, cur_ids, clone):
         for cur_id in cur_ids:
             try:
@@ -469,7 +745,9 @@ class ParticleContainer(ABCParticleContainer):
         if cur_id in cur_dict:
             # This means the element IS in the current dictionary
             # (this should be the standard case...), so we proceed
+            old_element = cur_dict[cur_id]
             cur_dict[cur_id] = clone(element)
+            return old_element
         else:
             raise KeyError(pce._PC_errors['ParticleContainer_UnknownValue']
                            + " id: " + str(cur_id))
@@ -477,12 +755,73 @@ class ParticleContainer(ABCParticleContainer):
     def _remove_element(self, cur_dict, cur_id):
         if cur_id in cur_dict:
             # Element IS in dict, we proceed
+            old_element = cur_dict[cur_id]
             del cur_dict[cur_id]
+            return old_element
         else:
             raise KeyError(pce._PC_errors['ParticleContainer_UnknownValue']
                            + " id: " + str(cur_id))
 
 
+def _curve_ordered(particles, method):
+    """Returns copies of the particles of a dictionary in a new one,
+       created in the order of a space-filling curve.
+    """
+    ids = particles.keys()
+    values = particles.values()
+    order = curve_order(
+        numpy.array([particle.coordinates for particle in values],
+                    dtype=numpy.float64).reshape(-1, 3), method)
+    reordered = {}
+    for index in order.tolist():
+        reordered[ids[index]] = Particle.from_particle(values[index])
+    return reordered
+
+
+class ParticleContainerSnapshot(ParticleContainer):
+    """Read-only view of the state of a ParticleContainer.
+
+       Snapshots are created by ParticleContainer.snapshot(). All the
+       query methods of the particle container are available, the methods
+       that modify the particles or the bonds raise a TypeError.
+
+       Attributes
+       ----------
+
+        _particles : LayeredDict
+            the particles at the time of the snapshot (a view sharing the
+            storage of the container)
+        _bonds : LayeredDict
+            the bonds at the time of the snapshot (a view sharing the
+            storage of the container)
+        data : DataContainer
+            a copy of the data attributes of the container
+        _particle_bonds : dictionary
+            the bond index, built on first use (None until then)
+    """
+    def __init__(self, particles, bonds, data):
+        self._particles = particles
+        self._bonds = bonds
+        self.data = DataContainer(data)
+        self._changes = None
+        self._particle_bonds = None
+
+    def snapshot(self):
+        """Returns the snapshot itself (it can not change)."""
+        return self
+
+    def _bond_ids_of(self, particle_id):
+        if self._particle_bonds is None:
+            self._particle_bonds = {}
+            for bond in self._bonds.itervalues():
+                self._index_bond(bond.id, bond.particles)
+        return super(ParticleContainerSnapshot, self)._bond_ids_of(
+            particle_id)
+
+    def _writable(self, name):
+        raise TypeError('A snapshot of a particle container is read-only')
+
+
 class Particle(object):
     """Class representing a particle.
 
@@ -519,11 +858,34 @@ class Particle(object):
 
     @classmethod
     def from_particle(cls, particle):
+        # the id (uuid.UUID or int) is immutable and can be shared
         return cls(
-            id=uuid.UUID(bytes=particle.id.bytes),
+            id=particle.id,
             coordinates=particle.coordinates,
             data=DataContainer(particle.data))
 
+    def to_bytes(self):
+        """Returns a compact binary representation of the particle.
+
+        See Also
+        --------
+        from_bytes, simphony.core.serialization.pack_records
+        """
+        return (
+            serialization.pack_id(self.id) +
+            serialization.pack_floats(self.coordinates) +
+            serialization.pack_items(self.data))
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """Creates a particle from the output of 'to_bytes'."""
+        id, offset = serialization.unpack_id(buffer)
+        coordinates, offset = serialization.unpack_floats(buffer, offset)
+        items, _ = serialization.unpack_items(buffer, offset)
+        particle = cls(coordinates, id)
+        particle.data = DataContainer._from_items(items)
+        return particle
+
     def __str__(self):
         total_str = "{0}_{1}".format(self.id, self.coordinates)
         return total_str
@@ -571,14 +933,46 @@ class Bond(object):
     def from_bond(cls, bond):
         return cls(
             particles=bond.particles,
-            id=uuid.UUID(bytes=bond.id.bytes),
+            id=bond.id,
             data=DataContainer(bond.data))
 
+    def to_bytes(self):
+        """Returns a compact binary representation of the bond.
+
+        See Also
+        --------
+        from_bytes, simphony.core.serialization.pack_records
+        """
+        return (
+            serialization.pack_id(self.id) +
+            serialization.pack_ids(self.particles) +
+            serialization.pack_items(self.data))
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """Creates a bond from the output of 'to_bytes'."""
+        id, offset = serialization.unpack_id(buffer)
+        particles, offset = serialization.unpack_ids(buffer, offset)
+        items, _ = serialization.unpack_items(buffer, offset)
+        bond = cls(particles, id)
+        bond.data = DataContainer._from_items(items)
+        return bond
+
     def __str__(self):
         total_str = "{0}_{1}".format(self.id, self.particles)
         return total_str
 
 
+instrumentation.instrument(
+    ParticleContainer,
+    ('add_particle', 'add_bond', 'update_particle', 'update_particles',
+     'update_bond', 'get_particle', 'get_bond', 'remove_particle',
+     'remove_bond', 'iter_particles', 'iter_bonds', 'iter_bonds_of_particle',
+     'snapshot', 'reorder'))
+instrumentation.instrument(Particle, ('from_particle',))
+instrumentation.instrument(Bond, ('from_bond',))
+
+
 def main():
     print("""
             Module for Particle classes:
@@ -0,0 +1,233 @@
+"""Neighbour stencils of the lattices and vectorized neighbour gathering.
+
+Classes:
+--------
+Stencil:
+    the offsets (in node index coordinates) of the neighbours of a node,
+    with the lattice Boltzmann weights of the directions.
+
+Routines:
+---------
+get_stencil:
+    return a stencil by name, or the default stencil of a lattice type.
+
+gather_neighbors:
+    return, for each direction of a stencil, the values of a node field
+    at the neighbour of every node (periodic or non-periodic boundaries).
+
+neighbor_ids:
+    return the ids of the neighbours of a single node.
+
+Stencils:
+---------
+D2Q5, D2Q9:
+    'Square' and 'Rectangular' lattices.
+D2Q7:
+    'Hexagonal' lattice. The nodes of the hexagonal lattice are stored on
+    a grid with spacings (h/2, sqrt(3)/2 h), so the six nearest neighbours
+    of (i, j) are (i +- 2, j) and (i +- 1, j +- 1).
+D3Q7, D3Q19, D3Q27:
+    'Cubic' and 'OrthorombicP' lattices.
+
+The first direction of every stencil is the rest direction (0, ..., 0).
+"""
+from itertools import product
+
+import numpy as np
+
+
+class Stencil(object):
+    """
+    The neighbours of a lattice node.
+
+    Attributes:
+    -----------
+    name: string
+    offsets: Q x D int array
+        offsets of the neighbours (in node index coordinates), the first
+        one is the rest direction (0, ..., 0).
+    weights: Q x float array
+        lattice Boltzmann weights of the directions (they sum to 1).
+    opposite: Q x int array
+        index of the opposite direction of each direction.
+    """
+    def __init__(self, name, offsets, weights):
+        self.name = name
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.weights = np.array(weights, dtype=np.float64)
+        index = {tuple(offset): q for q, offset in enumerate(self.offsets)}
+        self.opposite = np.array(
+            [index[tuple(-offset)] for offset in self.offsets],
+            dtype=np.int64)
+
+    @property
+    def dimension(self):
+        return self.offsets.shape[1]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __repr__(self):
+        return '<Stencil {}>'.format(self.name)
+
+
+def _cartesian_stencil(name, dimension, max_norm, weights):
+    # the offsets in {-1, 0, 1}^D with at most 'max_norm' non zero
+    # components, sorted by norm; weights[n] is the weight of norm n
+    offsets = [offset for offset in product((0, -1, 1), repeat=dimension)
+               if sum(abs(x) for x in offset) <= max_norm]
+    offsets.sort(key=lambda offset: sum(abs(x) for x in offset))
+    return Stencil(
+        name, offsets,
+        [weights[sum(abs(x) for x in offset)] for offset in offsets])
+
+
+STENCILS = {
+    'D2Q5': _cartesian_stencil('D2Q5', 2, 1, (1. / 3, 1. / 6)),
+    'D2Q9': _cartesian_stencil('D2Q9', 2, 2, (4. / 9, 1. / 9, 1. / 36)),
+    'D2Q7': Stencil(
+        'D2Q7',
+        [(0, 0), (2, 0), (1, 1), (-1, 1), (-2, 0), (-1, -1), (1, -1)],
+        [1. / 2] + [1. / 12] * 6),
+    'D3Q7': _cartesian_stencil('D3Q7', 3, 1, (1. / 4, 1. / 8)),
+    'D3Q19': _cartesian_stencil(
+        'D3Q19', 3, 2, (1. / 3, 1. / 18, 1. / 36)),
+    'D3Q27': _cartesian_stencil(
+        'D3Q27', 3, 3, (8. / 27, 2. / 27, 1. / 54, 1. / 216)),
+}
+
+# the stencils that fit each lattice type (the first one is the default)
+LATTICE_STENCILS = {
+    'Hexagonal': ('D2Q7',),
+    'Square': ('D2Q9', 'D2Q5'),
+    'Rectangular': ('D2Q9', 'D2Q5'),
+    'Cubic': ('D3Q19', 'D3Q7', 'D3Q27'),
+    'OrthorombicP': ('D3Q19', 'D3Q7', 'D3Q27'),
+}
+
+
+def get_stencil(name=None, lattice_type=None):
+    """Return a stencil.
+
+    Parameters:
+    -----------
+    name: string
+        name of the stencil (e.g. 'D2Q9'), the default stencil of the
+        lattice type if None.
+    lattice_type: string
+        the type of the lattice (e.g. 'Square'), to check that the
+        stencil fits the lattice.
+
+    Returns:
+    -----------
+    A Stencil object.
+
+    Raises:
+    -----------
+    ValueError
+        if the stencil is unknown or does not fit the lattice type.
+    """
+    if lattice_type is not None:
+        if lattice_type not in LATTICE_STENCILS:
+            raise ValueError(
+                'No stencils for lattice type {!r}'.format(lattice_type))
+        names = LATTICE_STENCILS[lattice_type]
+        if name is None:
+            name = names[0]
+        elif name not in names:
+            raise ValueError(
+                'Stencil {!r} does not fit a {} lattice (use one of {})'
+                .format(name, lattice_type, ', '.join(names)))
+    try:
+        return STENCILS[name]
+    except KeyError:
+        raise ValueError('Unknown stencil {!r}'.format(name))
+
+
+def gather_neighbors(field, stencil, periodic=True, fill_value=0):
+    """Gather the values of a node field at the neighbours of every node.
+
+    Parameters:
+    -----------
+    field: array (node array shape + component shape)
+        the values at the nodes; its first D axes are the node index
+        axes of the lattice.
+    stencil: Stencil or string
+    periodic: bool or D x bool
+        periodic boundaries (for all the axes, or for each axis).
+    fill_value: scalar
+        the value of the neighbours outside of a non-periodic lattice.
+
+    Returns:
+    -----------
+    Q x field.shape array, where result[q][x] is the value of the field
+    at the node x + stencil.offsets[q].
+    """
+    if not isinstance(stencil, Stencil):
+        stencil = get_stencil(stencil)
+    field = np.asarray(field)
+    dimension = stencil.dimension
+    if field.ndim < dimension:
+        raise ValueError(
+            'The field should have at least {} axes'.format(dimension))
+    periodic = _per_axis(periodic, dimension)
+
+    result = np.empty((len(stencil),) + field.shape, dtype=field.dtype)
+    for q, offset in enumerate(stencil.offsets):
+        rolled = [axis for axis in xrange(dimension)
+                  if periodic[axis] and offset[axis] != 0]
+        if rolled:
+            # result[x] = field[x + offset]
+            source = np.roll(
+                field, [-offset[axis] for axis in rolled], axis=rolled)
+        else:
+            source = field
+        target = result[q]
+        source_slices, target_slices = [], []
+        for axis in xrange(dimension):
+            shift = offset[axis] if not periodic[axis] else 0
+            n = field.shape[axis]
+            source_slices.append(slice(max(shift, 0), n + min(shift, 0)))
+            target_slices.append(slice(max(-shift, 0), n - max(shift, 0)))
+        if any(
+                offset[axis] != 0 and not periodic[axis]
+                for axis in xrange(dimension)):
+            target[...] = fill_value
+        target[tuple(target_slices)] = source[tuple(source_slices)]
+    return result
+
+
+def neighbor_ids(id, size, stencil, periodic=True):
+    """Return the ids of the neighbours of a node.
+
+    Parameters:
+    -----------
+    id: D x int (node index coordinate)
+    size: D x int
+        number of lattice nodes (in the direction of each axis).
+    stencil: Stencil or string
+    periodic: bool or D x bool
+
+    Returns:
+    -----------
+    A list of (direction index, neighbour id) pairs; the neighbours that
+    are outside of a non-periodic lattice are left out.
+    """
+    if not isinstance(stencil, Stencil):
+        stencil = get_stencil(stencil)
+    size = np.asarray(size, dtype=np.int64)
+    periodic = np.array(_per_axis(periodic, stencil.dimension))
+    neighbors = np.asarray(id, dtype=np.int64) + stencil.offsets
+    wrapped = np.where(periodic, neighbors % size, neighbors)
+    inside = np.all((wrapped >= 0) & (wrapped < size), axis=1)
+    return [(q, tuple(wrapped[q].tolist()))
+            for q in np.nonzero(inside)[0].tolist()]
+
+
+def _per_axis(periodic, dimension):
+    if np.ndim(periodic) == 0:
+        return [bool(periodic)] * dimension
+    if len(periodic) != dimension:
+        raise ValueError(
+            'periodic should have {} values'.format(dimension))
+    return [bool(value) for value in periodic]
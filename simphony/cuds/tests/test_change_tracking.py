@@ -0,0 +1,138 @@
+"""
+    Testing for the change_tracking module and the change tracking
+    of the containers.
+"""
+import unittest
+
+from simphony.cuds.change_tracking import ChangeSet
+from simphony.cuds.mesh import Mesh, Point, Cell
+from simphony.cuds.particles import Particle, Bond, ParticleContainer
+
+
+class ChangeSetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = ChangeSet()
+
+    def assertChanges(self, added=(), updated=(), removed=()):
+        self.assertEqual(self.changes.added, set(added))
+        self.assertEqual(self.changes.updated, set(updated))
+        self.assertEqual(self.changes.removed, set(removed))
+
+    def test_empty(self):
+        self.assertChanges()
+        self.assertEqual(len(self.changes), 0)
+
+    def test_mark(self):
+        self.changes.mark_added(1)
+        self.changes.mark_updated(2)
+        self.changes.mark_removed(3)
+        self.assertChanges(added=[1], updated=[2], removed=[3])
+        self.assertEqual(len(self.changes), 3)
+
+    def test_added_then_updated(self):
+        self.changes.mark_added(1)
+        self.changes.mark_updated(1)
+        self.assertChanges(added=[1])
+
+    def test_added_then_removed(self):
+        self.changes.mark_added(1)
+        self.changes.mark_removed(1)
+        self.assertChanges()
+
+    def test_updated_then_removed(self):
+        self.changes.mark_updated(1)
+        self.changes.mark_removed(1)
+        self.assertChanges(removed=[1])
+
+    def test_removed_then_added(self):
+        self.changes.mark_removed(1)
+        self.changes.mark_added(1)
+        self.assertChanges(updated=[1])
+
+    def test_clear(self):
+        self.changes.mark_added(1)
+        self.changes.mark_updated(2)
+        self.changes.mark_removed(3)
+        self.changes.clear()
+        self.assertChanges()
+
+
+class ParticleContainerChangeTrackingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pc = ParticleContainer()
+        for i in xrange(5):
+            self.pc.add_particle(Particle((i, i, i), id=i))
+        self.pc.add_bond(Bond((0, 1), id=0))
+
+    def test_tracking_is_disabled_by_default(self):
+        self.assertIsNone(self.pc.get_changes('particles'))
+        self.assertIsNone(self.pc.get_changes('bonds'))
+        self.pc.clear_changes()
+
+    def test_track_changes(self):
+        self.pc.track_changes()
+        self.pc.add_particle(Particle((0, 0, 0), id=10))
+        self.pc.update_particle(Particle((1, 1, 1), id=1))
+        self.pc.remove_particle(2)
+        self.pc.add_bond(Bond((3, 4), id=1))
+        self.pc.update_bond(Bond((1, 0), id=0))
+
+        particles = self.pc.get_changes('particles')
+        self.assertEqual(particles.added, {10})
+        self.assertEqual(particles.updated, {1})
+        self.assertEqual(particles.removed, {2})
+        bonds = self.pc.get_changes('bonds')
+        self.assertEqual(bonds.added, {1})
+        self.assertEqual(bonds.updated, {0})
+
+        self.pc.clear_changes()
+        self.assertEqual(len(self.pc.get_changes('particles')), 0)
+        self.assertEqual(len(self.pc.get_changes('bonds')), 0)
+
+    def test_failed_operations_are_not_tracked(self):
+        self.pc.track_changes()
+        with self.assertRaises(Exception):
+            self.pc.add_particle(Particle((0, 0, 0), id=0))
+        with self.assertRaises(KeyError):
+            self.pc.remove_particle(100)
+        self.assertEqual(len(self.pc.get_changes('particles')), 0)
+
+    def test_disable_tracking(self):
+        self.pc.track_changes()
+        self.pc.track_changes(False)
+        self.pc.remove_particle(0)
+        self.assertIsNone(self.pc.get_changes('particles'))
+
+
+class MeshChangeTrackingTestCase(unittest.TestCase):
+
+    def test_track_changes(self):
+        mesh = Mesh()
+        self.assertIsNone(mesh.get_changes('points'))
+        puuids = [mesh.add_point(Point((i, 0, 0))) for i in range(4)]
+
+        mesh.track_changes()
+        new_puuid = mesh.add_point(Point((1, 1, 1)))
+        point = mesh.get_point(puuids[0])
+        point.coordinates = (2, 2, 2)
+        mesh.update_point(point)
+        cuuid = mesh.add_cell(Cell(puuids))
+
+        self.assertEqual(mesh.get_changes('points').added, {new_puuid})
+        self.assertEqual(mesh.get_changes('points').updated, {puuids[0]})
+        self.assertEqual(mesh.get_changes('cells').added, {cuuid})
+        self.assertEqual(len(mesh.get_changes('edges')), 0)
+        self.assertEqual(len(mesh.get_changes('faces')), 0)
+
+        mesh.clear_changes()
+        cell = mesh.get_cell(cuuid)
+        cell.points = puuids[:3]
+        mesh.update_cell(cell)
+        self.assertEqual(len(mesh.get_changes('points')), 0)
+        self.assertEqual(mesh.get_changes('cells').updated, {cuuid})
+
+
+if __name__ == '__main__':
+    unittest.main()
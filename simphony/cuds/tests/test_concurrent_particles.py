@@ -0,0 +1,196 @@
+"""
+    Testing for the concurrent_particles module.
+"""
+import threading
+import unittest
+import uuid
+
+from simphony.cuds.concurrent_particles import ConcurrentParticleContainer
+from simphony.cuds.particles import Particle, Bond
+
+
+class ConcurrentParticleContainerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pc = ConcurrentParticleContainer(number_of_shards=4)
+        self.ids = [
+            self.pc.add_particle(Particle((i, i * 10, i * 100)))
+            for i in xrange(20)]
+
+    def test_invalid_number_of_shards(self):
+        with self.assertRaises(ValueError):
+            ConcurrentParticleContainer(number_of_shards=0)
+
+    def test_add_get_particle(self):
+        particle = Particle((1.0, 2.0, 3.0), id=uuid.UUID(int=42))
+        id = self.pc.add_particle(particle)
+        self.assertEqual(id, uuid.UUID(int=42))
+        self.assertTrue(self.pc.has_particle(id))
+        self.assertEqual(self.pc.get_particle(id).coordinates, (1, 2, 3))
+        with self.assertRaises(Exception):
+            self.pc.add_particle(particle)
+
+    def test_update_remove_particle(self):
+        particle = self.pc.get_particle(self.ids[0])
+        particle.coordinates = (-1, -1, -1)
+        self.pc.update_particle(particle)
+        self.assertEqual(
+            self.pc.get_particle(self.ids[0]).coordinates, (-1, -1, -1))
+
+        self.pc.remove_particle(self.ids[0])
+        self.assertFalse(self.pc.has_particle(self.ids[0]))
+        with self.assertRaises(KeyError):
+            self.pc.get_particle(self.ids[0])
+        with self.assertRaises(KeyError):
+            self.pc.update_particle(particle)
+
+    def test_iter_particles(self):
+        ids = [particle.id for particle in self.pc.iter_particles()]
+        self.assertItemsEqual(ids, self.ids)
+        ids = [particle.id for particle in self.pc.iter_particles(
+            self.ids[::3])]
+        self.assertEqual(ids, self.ids[::3])
+
+    def test_bonds(self):
+        bond_id = self.pc.add_bond(Bond(self.ids[:2]))
+        self.assertTrue(self.pc.has_bond(bond_id))
+        bond = self.pc.get_bond(bond_id)
+        bond.particles = tuple(self.ids[2:5])
+        self.pc.update_bond(bond)
+        self.assertEqual(
+            [b.particles for b in self.pc.iter_bonds()],
+            [tuple(self.ids[2:5])])
+        self.pc.remove_bond(bond_id)
+        self.assertFalse(self.pc.has_bond(bond_id))
+
+    def test_bonds_of_particle(self):
+        bond_ids = [self.pc.add_bond(Bond(self.ids[i:i + 2]))
+                    for i in xrange(3)]
+        self.assertItemsEqual(
+            [bond.id for bond in self.pc.iter_bonds_of_particle(self.ids[1])],
+            bond_ids[:2])
+        self.pc.remove_particle(self.ids[1], remove_bonds=True)
+        self.assertEqual(
+            [bond.id for bond in self.pc.iter_bonds()], bond_ids[2:])
+
+    def test_snapshot(self):
+        snapshot = self.pc.snapshot()
+        self.pc.remove_particle(self.ids[0])
+        self.pc.add_particle(Particle((0.0, 0.0, 0.0)))
+        self.assertItemsEqual(
+            [particle.id for particle in snapshot.iter_particles()], self.ids)
+        with self.assertRaises(TypeError):
+            snapshot.remove_particle(self.ids[1])
+
+    def test_snapshot_shares_shards(self):
+        shards = list(self.pc._particles._shards)
+        snapshot = self.pc.snapshot()
+        particle = self.pc.get_particle(self.ids[0])
+        particle.coordinates = (-1, -1, -1)
+        self.pc.update_particle(particle)
+        for shard, view in zip(shards, snapshot._particles._shards):
+            self.assertIs(view.layers[0], shard)
+        self.assertEqual(
+            snapshot.get_particle(self.ids[0]).coordinates, (0, 0, 0))
+
+        # the layers are merged back once the snapshot is released
+        del snapshot
+        self.pc.update_particle(particle)
+        self.pc.add_particle(Particle((0.0, 0.0, 0.0)))
+        index = hash(self.ids[0]) % len(shards)
+        self.assertIs(self.pc._particles._shards[index], shards[index])
+        self.assertEqual(
+            self.pc.get_particle(self.ids[0]).coordinates, (-1, -1, -1))
+        self.assertEqual(len(self.pc._particles), 21)
+
+    def test_snapshots_while_writing(self):
+        errors = []
+        stop = threading.Event()
+
+        def writer():
+            try:
+                i = 0
+                while not stop.is_set():
+                    id = self.ids[i % len(self.ids)]
+                    self.pc.update_particle(Particle((i, 0, 0), id=id))
+                    self.pc.remove_particle(
+                        self.pc.add_particle(Particle((0, 0, 0))))
+                    i += 1
+            except Exception as exception:  # pragma: no cover
+                errors.append(exception)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in xrange(50):
+                snapshot = self.pc.snapshot()
+                state = {particle.id: particle.coordinates
+                         for particle in snapshot.iter_particles()}
+                # the snapshot does not change while the writer runs
+                self.assertEqual(
+                    {particle.id: particle.coordinates
+                     for particle in snapshot.iter_particles()}, state)
+                self.assertTrue(set(self.ids).issubset(state))
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_reorder(self):
+        self.pc.reorder()
+        self.assertItemsEqual(
+            [(particle.id, particle.coordinates)
+             for particle in self.pc.iter_particles()],
+            [(id, (i, i * 10, i * 100)) for i, id in enumerate(self.ids)])
+        with self.assertRaises(ValueError):
+            self.pc.reorder('peano')
+
+    def test_add_while_iterating(self):
+        iterated = []
+        for particle in self.pc.iter_particles():
+            self.pc.add_particle(Particle((0.0, 0.0, 0.0)))
+            iterated.append(particle.id)
+        self.assertEqual(len(iterated), len(set(iterated)))
+        self.assertTrue(set(self.ids).issubset(iterated))
+
+    def test_concurrent_writers_and_readers(self):
+        errors = []
+        added = []
+
+        def writer(index):
+            try:
+                for i in xrange(200):
+                    id = self.pc.add_particle(Particle((index, i, 0)))
+                    added.append(id)
+                    particle = self.pc.get_particle(id)
+                    particle.coordinates = (index, i, 1)
+                    self.pc.update_particle(particle)
+            except Exception as exception:  # pragma: no cover
+                errors.append(exception)
+
+        def reader():
+            try:
+                for _ in xrange(20):
+                    for particle in self.pc.iter_particles():
+                        pass
+            except Exception as exception:  # pragma: no cover
+                errors.append(exception)
+
+        threads = [threading.Thread(target=writer, args=(i,))
+                   for i in xrange(4)]
+        threads += [threading.Thread(target=reader) for i in xrange(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(added), 800)
+        for id in added:
+            self.assertEqual(self.pc.get_particle(id).coordinates[2], 1)
+        self.assertEqual(
+            len(list(self.pc.iter_particles())), len(self.ids) + 800)
+
+
+if __name__ == '__main__':
+    unittest.main()
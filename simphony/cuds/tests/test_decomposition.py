@@ -0,0 +1,166 @@
+"""
+    Testing module for the lattice domain decomposition.
+"""
+import unittest
+
+import numpy as np
+import numpy.testing as np_test
+
+from simphony.core.cuba import CUBA
+from simphony.cuds.decomposition import (
+    decompose_lattice, map_blocks, LatticeBlock)
+from simphony.cuds.lattice import make_cubic_lattice, make_square_lattice
+from simphony.cuds.stencil import gather_neighbors
+
+
+def laplacian(block, array):
+    # the D3Q7 laplacian of the interior nodes of the block
+    neighbors = gather_neighbors(array, 'D3Q7', periodic=False)
+    return (neighbors[1:].sum(axis=0) - 6 * array)[block.interior]
+
+
+def add_block_number(block, array):
+    array[block.interior] += block.number
+
+
+class DecompositionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.lattice = make_cubic_lattice(
+            'test', 0.5, (6, 7, 8), origin=(1.0, 2.0, 3.0))
+        self.field = np.random.rand(6, 7, 8)
+
+    def test_blocks_cover_lattice(self):
+        decomposition = decompose_lattice(self.lattice, (2, 3, 1), halo=2)
+        self.assertEqual(len(decomposition), 6)
+        covered = np.zeros((6, 7, 8), dtype=int)
+        for block in decomposition:
+            self.assertIsInstance(block, LatticeBlock)
+            covered[block.global_slices] += 1
+            self.assertEqual(
+                block.shape, tuple(n + 4 for n in block.size))
+        np_test.assert_array_equal(covered, 1)
+
+    def test_block_coordinates(self):
+        decomposition = decompose_lattice(self.lattice, (2, 2, 2), halo=1)
+        for block in decomposition:
+            for local in [(0, 0, 0), (1, 2, 3)]:
+                np_test.assert_allclose(
+                    block.get_coordinate(local),
+                    self.lattice.get_coordinate(block.to_global(local)))
+                self.assertEqual(
+                    block.to_local(block.to_global(local)), local)
+
+    def test_block_grid(self):
+        self.assertEqual(decompose_lattice(self.lattice, 1).grid, (1, 1, 1))
+        lattice = make_cubic_lattice('test', 0.1, (8, 8, 8))
+        self.assertEqual(decompose_lattice(lattice, 8).grid, (2, 2, 2))
+        lattice = make_square_lattice('test', 0.1, (100, 4))
+        self.assertEqual(decompose_lattice(lattice, 4).grid, (4, 1))
+
+    def test_invalid_decompositions(self):
+        with self.assertRaises(ValueError):
+            decompose_lattice(self.lattice, (7, 1, 1))
+        with self.assertRaises(ValueError):
+            decompose_lattice(self.lattice, (2, 1))
+        with self.assertRaises(ValueError):
+            decompose_lattice(self.lattice, (3, 1, 1), halo=3)
+        with self.assertRaises(ValueError):
+            decompose_lattice(self.lattice, 1, periodic=(True, False))
+
+    def test_scatter_gather(self):
+        decomposition = decompose_lattice(self.lattice, (2, 3, 2), halo=1)
+        field = decomposition.allocate_field()
+        field.scatter(self.field)
+        np_test.assert_array_equal(field.gather(), self.field)
+        for block in decomposition:
+            np_test.assert_array_equal(
+                field.interior(block.number), self.field[block.global_slices])
+
+    def check_halos(self, periodic, components=()):
+        data = np.random.rand(*((6, 7, 8) + components))
+        decomposition = decompose_lattice(
+            self.lattice, (2, 3, 2), halo=2, periodic=periodic)
+        expected = decomposition.allocate_field(components)
+        expected.scatter(data, fill_value=-1)
+        field = decomposition.allocate_field(components)
+        for block in decomposition:
+            field.interior(block.number)[...] = data[block.global_slices]
+        field.exchange(fill_value=-1)
+        for number in xrange(len(decomposition)):
+            np_test.assert_array_equal(field[number], expected[number])
+        return expected
+
+    def test_exchange_periodic(self):
+        expected = self.check_halos(True)
+        block = expected.decomposition.blocks[0]
+        # the first halo node wraps around to the last lattice node
+        self.assertEqual(expected[0][0, 0, 0], expected.gather()[4, 5, 6])
+        self.assertEqual(block.to_global((0, 0, 0)), (-2, -2, -2))
+
+    def test_exchange_non_periodic(self):
+        expected = self.check_halos(False, components=(3,))
+        np_test.assert_array_equal(expected[0][0], -1)
+
+    def test_exchange_mixed_periodic(self):
+        self.check_halos((True, False, True))
+
+    def test_map_blocks_matches_whole_lattice(self):
+        decomposition = decompose_lattice(self.lattice, (2, 2, 2), halo=1)
+        field = decomposition.allocate_field()
+        field.scatter(self.field)
+        field.exchange()
+        neighbors = gather_neighbors(self.field, 'D3Q7')
+        expected = neighbors[1:].sum(axis=0) - 6 * self.field
+        for workers in (1, 2):
+            field.scatter(self.field)
+            map_blocks(laplacian, field, workers=workers)
+            np_test.assert_allclose(field.gather(), expected)
+
+    def test_map_blocks_in_place(self):
+        decomposition = decompose_lattice(self.lattice, (1, 2, 2), halo=1)
+        field = decomposition.allocate_field(dtype=np.int64)
+        map_blocks(add_block_number, field, workers=2)
+        for block in decomposition:
+            np_test.assert_array_equal(
+                field.gather()[block.global_slices], block.number)
+
+    def test_split_and_assemble(self):
+        for node in self.lattice.iter_nodes():
+            node.data[CUBA.DENSITY] = self.field[node.id]
+            self.lattice.update_node(node)
+        decomposition = decompose_lattice(
+            self.lattice, (2, 1, 2), halo=1, periodic=(True, True, False))
+        lattices = decomposition.split(self.lattice)
+        self.assertEqual(len(lattices), 4)
+        for block, lattice in zip(decomposition, lattices):
+            self.assertEqual(lattice.type, 'Cubic')
+            self.assertEqual(tuple(lattice.size), block.shape)
+            np_test.assert_allclose(
+                lattice.get_coordinate((0, 0, 0)),
+                self.lattice.get_coordinate(block.to_global((0, 0, 0))))
+            for node in lattice.iter_nodes():
+                id = np.array(block.to_global(node.id))
+                if 0 <= id[2] < 8:
+                    id %= (6, 7, 8)
+                    self.assertEqual(
+                        node.data[CUBA.DENSITY], self.field[tuple(id)])
+                else:
+                    self.assertEqual(len(node.data), 0)
+                node.data[CUBA.DENSITY] = -float(block.number)
+                lattice.update_node(node)
+        decomposition.assemble(lattices, self.lattice)
+        for block in decomposition:
+            for id in np.ndindex(*block.size):
+                node = self.lattice.get_node(tuple(block.start + id))
+                self.assertEqual(
+                    node.data[CUBA.DENSITY], -float(block.number))
+
+    def test_split_size_mismatch(self):
+        decomposition = decompose_lattice(self.lattice, 2)
+        with self.assertRaises(ValueError):
+            decomposition.split(make_cubic_lattice('test', 0.5, (6, 7, 9)))
+
+
+if __name__ == '__main__':
+    unittest.main()
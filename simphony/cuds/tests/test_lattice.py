@@ -136,5 +136,15 @@ class LatticeTestCase(unittest.TestCase):
 
         self.assertEqual(check_sum1, 45)
 
+    def test_memory_usage(self):
+        """Memory usage grows with the data of the nodes."""
+        lattice = la.make_square_lattice('Lattice', 0.1, (10, 10))
+        empty = lattice.memory_usage()
+        self.assertGreater(empty, 0)
+        for node in lattice.iter_nodes():
+            node.data[CUBA.DENSITY] = 1.0
+            lattice.update_node(node)
+        self.assertGreater(lattice.memory_usage(), empty + 100 * 8)
+
 if __name__ == '__main__':
     unittest.main()
@@ -11,8 +11,8 @@ from simphony.cuds.mesh import Point
 from simphony.cuds.mesh import Edge
 from simphony.cuds.mesh import Face
 from simphony.cuds.mesh import Cell
-# import simphony.core.data_container as dc
-# from simphony.core.cuba import CUBA
+from simphony.core.cuba import CUBA
+from simphony.core.serialization import pack_records, unpack_records
 
 
 class TestSequenceFunctions(unittest.TestCase):
@@ -680,5 +680,71 @@ class TestSequenceFunctions(unittest.TestCase):
 
         self.assertItemsEqual(cell_upd.points, cell_ret.points)
 
+    def test_point_bytes_round_trip(self):
+        """ Check that a point can be encoded to bytes and back
+
+        """
+
+        point = Point((1.0, 2.0, 3.0), data={CUBA.TEMPERATURE: 300.0})
+        point.uuid = self.mesh.add_point(point)
+
+        result = Point.from_bytes(point.to_bytes())
+
+        self.assertEqual(result.uuid, point.uuid)
+        self.assertEqual(result.coordinates, point.coordinates)
+        self.assertEqual(result.data, point.data)
+
+    def test_elements_bytes_round_trip(self):
+        """ Check that a batch of elements can be encoded to bytes and back
+
+        """
+
+        puuids = [self.mesh.add_point(point) for point in self.points]
+
+        for cls in (Edge, Face, Cell):
+            elements = [
+                cls(puuids[i:i + 3], data={CUBA.LABEL: i}) for i in range(3)]
+            for element in elements:
+                element.uuid = self.mesh._generate_uuid()
+
+            result = unpack_records(pack_records(elements), cls.from_bytes)
+
+            self.assertEqual(len(result), len(elements))
+            for element, element_ret in zip(elements, result):
+                self.assertIsInstance(element_ret, cls)
+                self.assertEqual(element_ret.uuid, element.uuid)
+                self.assertEqual(element_ret.points, element.points)
+                self.assertEqual(element_ret.data, element.data)
+
+    def test_memory_usage(self):
+        """ Check that the memory usage grows with the points and cells
+
+        """
+
+        empty = self.mesh.memory_usage()
+        puuids = [self.mesh.add_point(point) for point in self.points]
+        with_points = self.mesh.memory_usage()
+        self.assertGreater(with_points, empty)
+
+        self.mesh.add_cell(Cell(puuids[:3], data={CUBA.DENSITY: 1.0}))
+        self.assertGreater(self.mesh.memory_usage(), with_points)
+
+    def test_reorder_points(self):
+        """ Check that reordering the points keeps them unchanged
+
+        """
+
+        for point in self.points:
+            point.data[CUBA.TEMPERATURE] = point.coordinates[0]
+        puuids = [self.mesh.add_point(point) for point in self.points]
+        self.mesh.reorder_points('morton')
+        self.mesh.reorder_points()
+        for puuid, point in zip(puuids, self.points):
+            stored = self.mesh.get_point(puuid)
+            self.assertEqual(stored.coordinates, point.coordinates)
+            self.assertEqual(stored.data, point.data)
+        with self.assertRaises(ValueError):
+            self.mesh.reorder_points('peano')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,151 @@
+""" test_mesh_partition module
+
+This module contains the unitary tests for the
+mesh partitioning functionalities
+
+"""
+
+import unittest
+
+from simphony.core.cuba import CUBA
+from simphony.cuds.mesh import Mesh, Point, Edge, Face, Cell
+from simphony.cuds.mesh_partition import partition_mesh
+
+
+def grid_mesh(nx, ny):
+    """ Returns a mesh of nx x ny square cells and the uuids of its points
+
+    """
+
+    mesh = Mesh()
+    points = {}
+    for i in xrange(nx + 1):
+        for j in xrange(ny + 1):
+            points[i, j] = mesh.add_point(Point((float(i), float(j), 0.0)))
+    for i in xrange(nx):
+        for j in xrange(ny):
+            mesh.add_cell(Cell(
+                [points[i, j], points[i + 1, j], points[i + 1, j + 1],
+                 points[i, j + 1]], data={CUBA.LABEL: (i, j)}))
+    return mesh, points
+
+
+class IterOnlyMesh(object):
+    """ A mesh that only provides the iterators of another mesh
+
+    """
+
+    def __init__(self, mesh):
+        self.iter_points = mesh.iter_points
+        self.iter_edges = mesh.iter_edges
+        self.iter_faces = mesh.iter_faces
+        self.iter_cells = mesh.iter_cells
+
+
+class TestMeshPartition(unittest.TestCase):
+
+    def setUp(self):
+        self.mesh, self.points = grid_mesh(8, 6)
+
+    def test_balanced_parts(self):
+        for parts in (1, 2, 3, 4, 5):
+            partition = partition_mesh(self.mesh, parts)
+            sizes = [len(partition.cells(part)) for part in xrange(parts)]
+            self.assertEqual(sum(sizes), 48)
+            self.assertLessEqual(max(sizes) - min(sizes), 1)
+
+    def test_bisection_follows_longest_axis(self):
+        partition = partition_mesh(self.mesh, 2)
+        for cell in self.mesh.iter_cells():
+            i, _ = cell.data[CUBA.LABEL]
+            self.assertEqual(partition.part_of(cell.uuid), int(i >= 4))
+        # the interface is the line x = 4
+        self.assertEqual(
+            set(partition.boundary_points),
+            set(self.points[4, j] for j in xrange(7)))
+        for parts in partition.boundary_points.itervalues():
+            self.assertEqual(parts, (0, 1))
+
+    def test_shared_points(self):
+        partition = partition_mesh(self.mesh, 4)
+        # the interfaces are the lines x = 4 and y = 3
+        interface = set(self.points[4, j] for j in xrange(7)) | set(
+            self.points[i, 3] for i in xrange(9))
+        self.assertEqual(set(partition.boundary_points), interface)
+        self.assertEqual(partition.boundary_points[self.points[4, 3]],
+                         (0, 1, 2, 3))
+        for part in xrange(4):
+            shared = partition.shared_points(part)
+            self.assertEqual(len(shared), 8)
+            self.assertLessEqual(shared, interface)
+
+    def test_extract_parts(self):
+        edge = self.mesh.add_edge(Edge([self.points[0, 0], self.points[1, 0]]))
+        partition = partition_mesh(self.mesh, 4)
+        meshes = partition.meshes(self.mesh)
+        self.assertEqual(len(meshes), 4)
+        cells = set()
+        for part, mesh in enumerate(meshes):
+            part_cells = [cell.uuid for cell in mesh.iter_cells()]
+            self.assertEqual(set(part_cells), set(partition.cells(part)))
+            cells.update(part_cells)
+            points = set(point.uuid for point in mesh.iter_points())
+            self.assertEqual(len(points), 20)
+            self.assertLessEqual(partition.shared_points(part), points)
+            for cell in mesh.iter_cells():
+                self.assertLessEqual(set(cell.points), points)
+                original = self.mesh.get_cell(cell.uuid)
+                self.assertEqual(cell.data, original.data)
+        self.assertEqual(cells, set(c.uuid for c in self.mesh.iter_cells()))
+        edges = [part for part, mesh in enumerate(meshes) if mesh.has_edges()]
+        self.assertEqual(len(edges), 1)
+        self.assertEqual(
+            meshes[edges[0]].get_edge(edge).points,
+            [self.points[0, 0], self.points[1, 0]])
+
+    def test_interface_elements_belong_to_both_parts(self):
+        interface = [self.points[4, j] for j in xrange(3)]
+        face = self.mesh.add_face(Face(interface))
+        partition = partition_mesh(self.mesh, 2)
+        for part in xrange(2):
+            mesh = partition.extract(self.mesh, part)
+            self.assertEqual(mesh.get_face(face).points, interface)
+            self.assertFalse(mesh.has_edges())
+
+    def test_public_iterators_only(self):
+        self.mesh.add_edge(Edge([self.points[0, 0], self.points[1, 0]]))
+        mesh = IterOnlyMesh(self.mesh)
+        partition = partition_mesh(mesh, 3)
+        expected = partition_mesh(self.mesh, 3)
+        for part in xrange(3):
+            self.assertEqual(
+                set(partition.cells(part)), set(expected.cells(part)))
+        self.assertEqual(partition.boundary_points, expected.boundary_points)
+        for part, extracted in enumerate(partition.meshes(mesh)):
+            self.assertEqual(
+                set(cell.uuid for cell in extracted.iter_cells()),
+                set(partition.cells(part)))
+            self.assertEqual(
+                len(list(extracted.iter_edges())), int(part == 0))
+
+    def test_extract_invalid_part(self):
+        partition = partition_mesh(self.mesh, 2)
+        with self.assertRaises(ValueError):
+            partition.extract(self.mesh, 2)
+
+    def test_partition_errors(self):
+        with self.assertRaises(ValueError):
+            partition_mesh(self.mesh, 0)
+        mesh = Mesh()
+        mesh.add_cell(Cell([]))
+        with self.assertRaises(ValueError):
+            partition_mesh(mesh, 2)
+
+    def test_empty_mesh(self):
+        partition = partition_mesh(Mesh(), 3)
+        self.assertEqual(partition.cells(0), [])
+        self.assertEqual(partition.boundary_points, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
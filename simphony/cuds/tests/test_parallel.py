@@ -0,0 +1,131 @@
+"""
+    Testing for the parallel module.
+"""
+import unittest
+
+from simphony.core.cuba import CUBA
+from simphony.cuds.lattice import make_square_lattice
+from simphony.cuds.mesh import Mesh, Point, Cell
+from simphony.cuds.parallel import map_particles, map_cells, map_nodes
+from simphony.cuds.particles import Particle, ParticleContainer
+
+
+def shift_particle(particle):
+    x, y, z = particle.coordinates
+    particle.coordinates = (x + 1.0, y, z)
+    particle.data[CUBA.MASS] = x
+    return particle
+
+
+def label_even_particles(particle):
+    if int(particle.coordinates[0]) % 2 == 0:
+        particle.data[CUBA.LABEL] = 'even'
+        return particle
+
+
+def label_cell(cell):
+    cell.data[CUBA.LABEL] = len(cell.points)
+    return cell
+
+
+class BulkParticleContainer(ParticleContainer):
+    """ Records the size of each bulk update """
+
+    def __init__(self):
+        super(BulkParticleContainer, self).__init__()
+        self.bulk_updates = []
+
+    def update_particles(self, particles):
+        particles = list(particles)
+        self.bulk_updates.append(len(particles))
+        super(BulkParticleContainer, self).update_particles(particles)
+
+
+def node_density(node):
+    node.data[CUBA.DENSITY] = float(sum(node.id))
+    return node
+
+
+class MapParticlesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pc = ParticleContainer()
+        self.ids = [
+            self.pc.add_particle(Particle((float(i), 0.0, 0.0)))
+            for i in xrange(25)]
+
+    def check_shifted(self):
+        for i, id in enumerate(self.ids):
+            particle = self.pc.get_particle(id)
+            self.assertEqual(particle.coordinates, (i + 1.0, 0.0, 0.0))
+            self.assertEqual(particle.data[CUBA.MASS], float(i))
+
+    def test_map_particles_in_process(self):
+        count = map_particles(shift_particle, self.pc, workers=1, chunk=4)
+        self.assertEqual(count, 25)
+        self.check_shifted()
+
+    def test_map_particles_with_pool(self):
+        count = map_particles(shift_particle, self.pc, workers=3, chunk=4)
+        self.assertEqual(count, 25)
+        self.check_shifted()
+
+    def test_map_particles_partial_update(self):
+        count = map_particles(
+            label_even_particles, self.pc, workers=2, chunk=5)
+        self.assertEqual(count, 13)
+        for i, id in enumerate(self.ids):
+            particle = self.pc.get_particle(id)
+            if i % 2 == 0:
+                self.assertEqual(particle.data[CUBA.LABEL], 'even')
+            else:
+                self.assertNotIn(CUBA.LABEL, particle.data)
+
+    def test_map_particles_bulk_update(self):
+        pc = BulkParticleContainer()
+        for i in xrange(25):
+            pc.add_particle(Particle((float(i), 0.0, 0.0)))
+
+        count = map_particles(shift_particle, pc, workers=2, chunk=10)
+
+        self.assertEqual(count, 25)
+        self.assertEqual(pc.bulk_updates, [10, 10, 5])
+
+    def test_map_particles_empty_container(self):
+        count = map_particles(shift_particle, ParticleContainer(), workers=2)
+        self.assertEqual(count, 0)
+
+    def test_map_particles_invalid_chunk(self):
+        with self.assertRaises(ValueError):
+            map_particles(shift_particle, self.pc, chunk=0)
+
+
+class MapCellsTestCase(unittest.TestCase):
+
+    def test_map_cells(self):
+        mesh = Mesh()
+        puuids = [
+            mesh.add_point(Point((float(i), 0.0, 0.0))) for i in range(8)]
+        cuuids = [mesh.add_cell(Cell(puuids[i:i + 4])) for i in range(5)]
+
+        count = map_cells(label_cell, mesh, workers=2, chunk=2)
+
+        self.assertEqual(count, 5)
+        for cuuid in cuuids:
+            self.assertEqual(mesh.get_cell(cuuid).data[CUBA.LABEL], 4)
+
+
+class MapNodesTestCase(unittest.TestCase):
+
+    def test_map_nodes(self):
+        lattice = make_square_lattice('test', 0.1, (4, 5))
+
+        count = map_nodes(node_density, lattice, workers=2, chunk=3)
+
+        self.assertEqual(count, 20)
+        for node in lattice.iter_nodes():
+            self.assertEqual(node.data[CUBA.DENSITY], float(sum(node.id)))
+
+
+if __name__ == '__main__':
+    unittest.main()
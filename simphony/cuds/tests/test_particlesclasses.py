@@ -2,10 +2,13 @@
     Testing for particlesclasses module.
 """
 
+import pickle
 import unittest
 import uuid
 
-from simphony.cuds.particles import Particle, Bond, ParticleContainer
+from simphony.cuds.abstractparticles import ABCParticleContainer
+from simphony.cuds.particles import (
+    Particle, Bond, ParticleContainer, ParticleContainerSnapshot)
 from simphony.core.data_container import DataContainer
 from simphony.core.cuba import CUBA
 
@@ -34,6 +37,18 @@ class ParticleTestCase(unittest.TestCase):
         total_str = str(particle.id) + '_' + str(particle.coordinates)
         self.assertEqual(str(particle), total_str)
 
+    def test_bytes_round_trip(self):
+        data = DataContainer()
+        data[CUBA.RADIUS] = 3.0
+        data[CUBA.VELOCITY] = (0.1, 0.2, 0.3)
+        particle = Particle([20.5, 30.5, 40.5], uuid.uuid4(), data)
+        result = Particle.from_bytes(particle.to_bytes())
+        self.assertIsInstance(result, Particle)
+        self.assertEqual(result.id, particle.id)
+        self.assertEqual(result.coordinates, particle.coordinates)
+        self.assertEqual(result.data, particle.data)
+        self.assertIsInstance(result.data, DataContainer)
+
 
 class BondTestCase(unittest.TestCase):
 
@@ -58,6 +73,17 @@ class BondTestCase(unittest.TestCase):
         total_str = str(bond.id) + '_' + str(tuple(uuids))
         self.assertEqual(str(bond), total_str)
 
+    def test_bytes_round_trip(self):
+        data = DataContainer()
+        data[CUBA.BOND_LABEL] = 'label'
+        uuids = [uuid.UUID(int=i) for i in range(3)]
+        bond = Bond(uuids, uuid.UUID(int=12), data)
+        result = Bond.from_bytes(bond.to_bytes())
+        self.assertIsInstance(result, Bond)
+        self.assertEqual(result.id, bond.id)
+        self.assertEqual(result.particles, bond.particles)
+        self.assertEqual(result.data, bond.data)
+
 
 class ParticleContainerAddParticlesTestCase(unittest.TestCase):
     def setUp(self):
@@ -110,6 +136,18 @@ class ParticleContainerManipulatingParticlesTestCase(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.pc.update_particle(particle)
 
+    def test_update_particles(self):
+        particles = [self.pc.get_particle(particle.id)
+                     for particle in self.p_list[2:5]]
+        for particle in particles:
+            particle.coordinates = (1, 2, 3)
+        self.pc.update_particles(particles)
+        for particle in particles:
+            self.assertEqual(
+                self.pc.get_particle(particle.id).coordinates, (1, 2, 3))
+        with self.assertRaises(KeyError):
+            self.pc.update_particles([Particle()])
+
     def test_remove_particle(self):
         particle = self.p_list[0]
         self.pc.remove_particle(particle.id)
@@ -119,6 +157,32 @@ class ParticleContainerManipulatingParticlesTestCase(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.pc.remove_particle(uuid.UUID(int=23325))
 
+    def test_memory_usage(self):
+        usage = self.pc.memory_usage()
+        particle = self.p_list[0]
+        self.pc.remove_particle(particle.id)
+        self.assertLess(self.pc.memory_usage(), usage)
+        particle.data[CUBA.VELOCITY] = (1.0, 2.0, 3.0)
+        self.pc.add_particle(particle)
+        self.assertGreater(self.pc.memory_usage(), usage)
+
+    def test_reorder(self):
+        particles = dict(self.pc._particles)
+        for method in ('hilbert', 'morton'):
+            self.pc.reorder(method)
+            self.assertItemsEqual(self.pc._particles, particles)
+            for id, particle in particles.iteritems():
+                stored = self.pc._particles[id]
+                self.assertIsNot(stored, particle)
+                self.assertEqual(stored.coordinates, particle.coordinates)
+        with self.assertRaises(ValueError):
+            self.pc.reorder('peano')
+
+    def test_reorder_empty(self):
+        pc = ParticleContainer()
+        pc.reorder()
+        self.assertEqual(list(pc.iter_particles()), [])
+
     def test_iter_particles_when_passing_ids(self):
         particle_ids = [p.id for p in self.p_list[::2]]
         iterated_ids = [
@@ -228,5 +292,266 @@ class ParticleContainerManipulatingBondsTestCase(unittest.TestCase):
         self.assertEqual(last_id, self.b_list[-1].id)
 
 
+class _DelegatingContainer(ABCParticleContainer):
+    """ Container implementing only the abstract methods """
+
+    def __init__(self, container):
+        self._container = container
+
+    def add_particle(self, new_particle):
+        return self._container.add_particle(new_particle)
+
+    def add_bond(self, new_bond):
+        return self._container.add_bond(new_bond)
+
+    def update_particle(self, particle):
+        return self._container.update_particle(particle)
+
+    def update_bond(self, bond):
+        return self._container.update_bond(bond)
+
+    def get_particle(self, particle_id):
+        return self._container.get_particle(particle_id)
+
+    def get_bond(self, bond_id):
+        return self._container.get_bond(bond_id)
+
+    def remove_particle(self, particle_id):
+        return self._container.remove_particle(particle_id)
+
+    def remove_bond(self, bond_id):
+        return self._container.remove_bond(bond_id)
+
+    def iter_particles(self, particle_ids=None):
+        return self._container.iter_particles(particle_ids)
+
+    def iter_bonds(self, bond_ids=None):
+        return self._container.iter_bonds(bond_ids)
+
+    def has_particle(self, id):
+        return self._container.has_particle(id)
+
+    def has_bond(self, id):
+        return self._container.has_bond(id)
+
+
+class ParticleContainerBondsOfParticleTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pc = ParticleContainer()
+        self.particle_ids = [
+            self.pc.add_particle(Particle([i, i*10, i*100]))
+            for i in xrange(5)]
+        ids = self.particle_ids
+        self.bond_ids = [
+            self.pc.add_bond(Bond((ids[0], ids[1]))),
+            self.pc.add_bond(Bond((ids[1], ids[2], ids[1]))),
+            self.pc.add_bond(Bond((ids[3], ids[4])))]
+
+    def bonds_of(self, index, container=None):
+        container = self.pc if container is None else container
+        return set(bond.id for bond in container.iter_bonds_of_particle(
+            self.particle_ids[index]))
+
+    def test_iter_bonds_of_particle(self):
+        self.assertEqual(self.bonds_of(0), {self.bond_ids[0]})
+        self.assertEqual(self.bonds_of(1), set(self.bond_ids[:2]))
+        self.assertEqual(self.bonds_of(4), {self.bond_ids[2]})
+        self.assertEqual(
+            list(self.pc.iter_bonds_of_particle(uuid.UUID(int=20))), [])
+
+    def test_index_follows_updates_and_removals(self):
+        bond = self.pc.get_bond(self.bond_ids[1])
+        bond.particles = (self.particle_ids[2], self.particle_ids[3])
+        self.pc.update_bond(bond)
+        self.assertEqual(self.bonds_of(1), {self.bond_ids[0]})
+        self.assertEqual(self.bonds_of(3), set(self.bond_ids[1:]))
+
+        self.pc.remove_bond(self.bond_ids[2])
+        self.assertEqual(self.bonds_of(3), {self.bond_ids[1]})
+        self.assertEqual(self.bonds_of(4), set())
+
+    def test_remove_particle_with_bonds(self):
+        self.pc.remove_particle(self.particle_ids[1], remove_bonds=True)
+        self.assertEqual(
+            [bond.id for bond in self.pc.iter_bonds()], [self.bond_ids[2]])
+        self.assertEqual(self.bonds_of(0), set())
+
+        self.pc.remove_particle(self.particle_ids[3])
+        self.assertTrue(self.pc.has_bond(self.bond_ids[2]))
+
+    def test_snapshot_index(self):
+        snapshot = self.pc.snapshot()
+        self.pc.remove_bond(self.bond_ids[0])
+        self.assertEqual(self.bonds_of(0), set())
+        self.assertEqual(self.bonds_of(0, snapshot), {self.bond_ids[0]})
+
+    def test_default_of_abstract_container(self):
+        # a container that does not implement iter_bonds_of_particle
+        # can be instantiated, its bonds are scanned
+        container = _DelegatingContainer(self.pc)
+        self.assertEqual(self.bonds_of(1, container), set(self.bond_ids[:2]))
+        self.assertEqual(self.bonds_of(4, container), {self.bond_ids[2]})
+
+
+class ParticleContainerSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pc = ParticleContainer()
+        self.particle_ids = [
+            self.pc.add_particle(Particle([i, i*10, i*100]))
+            for i in xrange(10)]
+        self.bond_ids = [
+            self.pc.add_bond(Bond(self.particle_ids[i:i+2]))
+            for i in xrange(5)]
+
+    def test_snapshot_does_not_copy(self):
+        particles = self.pc._particles
+        snapshot = self.pc.snapshot()
+        self.assertIsInstance(snapshot, ParticleContainerSnapshot)
+        self.assertEqual(snapshot._particles.layers, [particles])
+        self.assertIs(snapshot._particles.layers[0], particles)
+        self.assertIs(
+            snapshot._bonds.layers[0], self.pc._bonds.layers[0])
+
+    def test_reorder_keeps_snapshot(self):
+        snapshot = self.pc.snapshot()
+        particles = snapshot._particles
+        self.pc.reorder()
+        self.assertIs(snapshot._particles, particles)
+        self.assertIsNot(self.pc._particles, particles)
+        self.assertItemsEqual(
+            [p.id for p in self.pc.iter_particles()], self.particle_ids)
+        with self.assertRaises(TypeError):
+            snapshot.reorder()
+
+    def test_snapshot_is_isolated_from_updates(self):
+        snapshot = self.pc.snapshot()
+
+        particle = self.pc.get_particle(self.particle_ids[0])
+        particle.coordinates = (-1, -1, -1)
+        self.pc.update_particle(particle)
+        self.pc.remove_particle(self.particle_ids[1])
+        new_id = self.pc.add_particle(Particle([1, 2, 3]))
+        self.pc.remove_bond(self.bond_ids[0])
+
+        self.assertEqual(
+            snapshot.get_particle(self.particle_ids[0]).coordinates,
+            (0, 0, 0))
+        self.assertTrue(snapshot.has_particle(self.particle_ids[1]))
+        self.assertFalse(snapshot.has_particle(new_id))
+        self.assertTrue(snapshot.has_bond(self.bond_ids[0]))
+        self.assertItemsEqual(
+            [p.id for p in snapshot.iter_particles()], self.particle_ids)
+        self.assertItemsEqual(
+            [b.id for b in snapshot.iter_bonds()], self.bond_ids)
+
+        self.assertEqual(
+            self.pc.get_particle(self.particle_ids[0]).coordinates,
+            (-1, -1, -1))
+        self.assertFalse(self.pc.has_particle(self.particle_ids[1]))
+        self.assertTrue(self.pc.has_particle(new_id))
+        self.assertFalse(self.pc.has_bond(self.bond_ids[0]))
+
+    def test_iterate_snapshot_while_updating(self):
+        snapshot = self.pc.snapshot()
+        for particle in snapshot.iter_particles():
+            self.pc.add_particle(Particle([0, 0, 0]))
+            particle.coordinates = (1, 1, 1)
+            self.pc.update_particle(particle)
+        self.assertEqual(len(snapshot._particles), 10)
+        self.assertEqual(len(self.pc._particles), 20)
+        for id in self.particle_ids:
+            self.assertEqual(self.pc.get_particle(id).coordinates, (1, 1, 1))
+
+    def test_storage_is_not_copied(self):
+        particles = self.pc._particles
+        snapshot = self.pc.snapshot()
+        new_id = self.pc.add_particle(Particle([0, 0, 0]))
+        # the writes go to a new layer on top of the shared one
+        self.assertEqual(len(self.pc._particles.layers), 2)
+        self.assertIs(self.pc._particles.layers[0], particles)
+        self.assertEqual(self.pc._particles.layers[1].keys(), [new_id])
+        self.assertEqual(len(particles), 10)
+        self.assertIs(
+            self.pc._bonds.layers[0], snapshot._bonds.layers[0])
+
+    def test_many_snapshots(self):
+        snapshots = []
+        states = []
+        for step in xrange(50):
+            snapshots.append(self.pc.snapshot())
+            states.append(
+                {p.id: p.coordinates for p in self.pc.iter_particles()})
+            for id in self.particle_ids[step % 3::3]:
+                self.pc.update_particle(Particle([step, 0, 0], id=id))
+            self.particle_ids.append(self.pc.add_particle(Particle()))
+            self.pc.remove_particle(self.particle_ids.pop(0))
+            if step % 7 == 0:
+                # some snapshots are released
+                del snapshots[:len(snapshots) // 2]
+                del states[:len(states) // 2]
+        # the number of layers stays small
+        self.assertLess(len(self.pc._particles.layers), 8)
+        for snapshot, state in zip(snapshots, states):
+            self.assertEqual(
+                {p.id: p.coordinates for p in snapshot.iter_particles()},
+                state)
+            self.assertEqual(len(snapshot._particles), len(state))
+
+    def test_storage_is_not_copied_without_live_snapshots(self):
+        particles = self.pc._particles
+        snapshot = self.pc.snapshot()
+        new_id = self.pc.add_particle(Particle([0, 0, 0]))
+        del snapshot
+        # the layers are merged back into the original dictionary
+        self.pc.remove_particle(self.particle_ids[0])
+        self.assertIs(self.pc._particles, particles)
+        self.assertIn(new_id, particles)
+        self.assertNotIn(self.particle_ids[0], particles)
+
+    def test_snapshot_is_read_only(self):
+        snapshot = self.pc.snapshot()
+        particle = snapshot.get_particle(self.particle_ids[0])
+        bond = snapshot.get_bond(self.bond_ids[0])
+        with self.assertRaises(TypeError):
+            snapshot.add_particle(Particle([0, 0, 0]))
+        with self.assertRaises(TypeError):
+            snapshot.update_particle(particle)
+        with self.assertRaises(TypeError):
+            snapshot.remove_particle(particle.id)
+        with self.assertRaises(TypeError):
+            snapshot.add_bond(Bond(self.particle_ids[:2]))
+        with self.assertRaises(TypeError):
+            snapshot.update_bond(bond)
+        with self.assertRaises(TypeError):
+            snapshot.remove_bond(bond.id)
+        self.assertIs(snapshot.snapshot(), snapshot)
+
+    def test_pickle(self):
+        self.pc.track_changes()
+        snapshot = self.pc.snapshot()
+        self.pc.remove_particle(self.particle_ids[9])
+
+        pc = pickle.loads(pickle.dumps(self.pc, pickle.HIGHEST_PROTOCOL))
+        self.assertItemsEqual(
+            [p.id for p in pc.iter_particles()], self.particle_ids[:9])
+        self.assertItemsEqual(
+            [b.id for b in pc.iter_bonds()], self.bond_ids)
+        self.assertItemsEqual(
+            [b.id for b in pc.iter_bonds_of_particle(self.particle_ids[1])],
+            self.bond_ids[:2])
+        # the tracking is enabled again, without the recorded changes
+        self.assertEqual(len(pc.get_changes('particles').removed), 0)
+        pc.remove_particle(self.particle_ids[0])
+        self.assertEqual(
+            pc.get_changes('particles').removed, set(self.particle_ids[:1]))
+        self.assertTrue(snapshot.has_particle(self.particle_ids[0]))
+
+        snapshot = pickle.loads(pickle.dumps(snapshot))
+        self.assertItemsEqual(
+            [p.id for p in snapshot.iter_particles()], self.particle_ids)
+        with self.assertRaises(TypeError):
+            snapshot.remove_particle(self.particle_ids[0])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,127 @@
+"""
+    Testing module for the lattice neighbour stencils.
+"""
+import unittest
+import numpy as np
+import numpy.testing as np_test
+import simphony.cuds.lattice as la
+from simphony.cuds.stencil import (
+    STENCILS, LATTICE_STENCILS, get_stencil, gather_neighbors, neighbor_ids)
+
+
+class StencilTestCase(unittest.TestCase):
+    """Test case for the stencil definitions."""
+    def test_stencil_sizes(self):
+        for name, stencil in STENCILS.items():
+            dimension, q = int(name[1]), int(name[3:])
+            self.assertEqual(stencil.dimension, dimension)
+            self.assertEqual(len(stencil), q)
+            self.assertEqual(
+                len(set(map(tuple, stencil.offsets))), q)
+
+    def test_stencil_weights_and_symmetry(self):
+        for stencil in STENCILS.values():
+            self.assertAlmostEqual(stencil.weights.sum(), 1.0)
+            np_test.assert_array_equal(stencil.offsets[0], 0)
+            np_test.assert_array_equal(
+                stencil.offsets[stencil.opposite], -stencil.offsets)
+            # isotropy: sum_q w_q c_q = 0
+            np_test.assert_allclose(
+                np.dot(stencil.weights, stencil.offsets), 0, atol=1e-15)
+
+    def test_hexagonal_neighbours_are_nearest(self):
+        lattice = la.make_hexagonal_lattice('Lattice', 0.3, (8, 8))
+        stencil = lattice.get_stencil()
+        self.assertEqual(stencil.name, 'D2Q7')
+        origin = lattice.get_coordinate((4, 4))
+        for offset in stencil.offsets[1:]:
+            coordinate = lattice.get_coordinate(np.add((4, 4), offset))
+            self.assertAlmostEqual(
+                np.linalg.norm(coordinate - origin), 0.3)
+
+    def test_get_stencil(self):
+        self.assertIs(get_stencil('D3Q19'), STENCILS['D3Q19'])
+        for lattice_type, names in LATTICE_STENCILS.items():
+            self.assertEqual(
+                get_stencil(lattice_type=lattice_type).name, names[0])
+        with self.assertRaises(ValueError):
+            get_stencil('D4Q1')
+        with self.assertRaises(ValueError):
+            get_stencil('D2Q9', 'Cubic')
+        with self.assertRaises(ValueError):
+            get_stencil(lattice_type='Triclinic')
+
+
+class GatherNeighborsTestCase(unittest.TestCase):
+    """Test case for gather_neighbors."""
+    def setUp(self):
+        self.field = np.arange(4 * 5 * 3, dtype=float).reshape(4, 5, 3)
+
+    def check_gathered(self, field, stencil, periodic, fill_value=-1):
+        gathered = gather_neighbors(field, stencil, periodic, fill_value)
+        size = field.shape[:stencil.dimension]
+        self.assertEqual(gathered.shape, (len(stencil),) + field.shape)
+        for id in np.ndindex(*size):
+            neighbors = dict(neighbor_ids(id, size, stencil, periodic))
+            for q in range(len(stencil)):
+                if q in neighbors:
+                    expected = field[neighbors[q]]
+                else:
+                    expected = fill_value
+                np_test.assert_array_equal(gathered[q][id], expected)
+
+    def test_gather_periodic_3d(self):
+        for name in ('D3Q7', 'D3Q19', 'D3Q27'):
+            self.check_gathered(self.field, STENCILS[name], True)
+
+    def test_gather_non_periodic_3d(self):
+        self.check_gathered(self.field, STENCILS['D3Q19'], False)
+
+    def test_gather_mixed_periodic(self):
+        self.check_gathered(
+            self.field, STENCILS['D3Q27'], (True, False, True))
+
+    def test_gather_vector_field_2d(self):
+        field = self.field.reshape(4, 5, 3)
+        for name in ('D2Q5', 'D2Q9', 'D2Q7'):
+            for periodic in (True, False):
+                self.check_gathered(field, STENCILS[name], periodic)
+
+    def test_gather_by_name(self):
+        np_test.assert_array_equal(
+            gather_neighbors(self.field, 'D3Q7'),
+            gather_neighbors(self.field, STENCILS['D3Q7']))
+
+    def test_gather_errors(self):
+        with self.assertRaises(ValueError):
+            gather_neighbors(np.zeros(4), 'D2Q9')
+        with self.assertRaises(ValueError):
+            gather_neighbors(self.field, 'D3Q7', periodic=(True, False))
+
+    def test_lattice_gather_neighbors(self):
+        lattice = la.make_square_lattice('Lattice', 0.1, (4, 5))
+        field = np.arange(20.0).reshape(4, 5)
+        gathered = lattice.gather_neighbors(field)
+        self.assertEqual(gathered.shape, (9, 4, 5))
+        # the laplacian of a linear field vanishes inside the lattice
+        stencil = lattice.get_stencil('D2Q5')
+        gathered = lattice.gather_neighbors(field, stencil, periodic=False)
+        laplacian = gathered[1:].sum(axis=0) - 4 * field
+        np_test.assert_allclose(laplacian[1:-1, 1:-1], 0)
+        with self.assertRaises(ValueError):
+            lattice.gather_neighbors(np.zeros((5, 4)))
+        with self.assertRaises(ValueError):
+            lattice.gather_neighbors(field, 'D3Q19')
+
+    def test_lattice_get_neighbor_ids(self):
+        lattice = la.make_cubic_lattice('Lattice', 0.1, (3, 3, 3))
+        self.assertEqual(len(lattice.get_neighbor_ids((0, 0, 0))), 19)
+        neighbors = lattice.get_neighbor_ids(
+            (0, 0, 0), 'D3Q7', periodic=False)
+        self.assertEqual(
+            sorted(id for _, id in neighbors),
+            [(0, 0, 0), (0, 0, 1), (0, 1, 0), (1, 0, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,24 +4,42 @@ This module provides access (read/write) to file which are
 formated in the CUDS-hdf5 file format
 """
 
-import copy
+import os
+import weakref
 
 import tables
 
+from simphony.core import instrumentation
+from simphony.core.lru_cache import LRUCache
 from simphony.io.file_particle_container import FileParticleContainer
+from simphony.io.file_trajectory import FileTrajectory
+
+# maximum number of container handles that are kept open
+MAX_OPEN_CONTAINERS = 128
 
 
 class CudsFile(object):
     """ Access to CUDS-hdf5 formatted files
 
+    The containers of the file are listed from the groups on disk and
+    their handles are only created when a container is used. The most
+    recently used handles are kept in a bounded cache, so a file with
+    thousands of containers does not keep thousands of open nodes. A
+    handle that was evicted from the cache but is still referenced is
+    returned again, so there is never more than one handle for each
+    container.
+
     """
-    def __init__(self, file):
+    def __init__(self, file, max_open_containers=MAX_OPEN_CONTAINERS):
         """
 
         Parameters
         ----------
         file : table.file
-            file to be used
+            file to be used (a file opened in read-only mode gives
+            read-only access to the CUDS file)
+        max_open_containers : int
+            maximum number of container handles kept in the cache
 
         """
 
@@ -29,12 +47,13 @@ class CudsFile(object):
             raise ValueError(
                 "File should be a Pytable file")
 
-        if file.mode is 'r':
-            raise ValueError(
-                "File should not be opened in read-only mode")
-
         self._file = file
-        self._particle_containers = {}
+        # the evicted handles may still be used, their writes are flushed
+        self._particle_containers = LRUCache(
+            max_open_containers, on_evict=lambda name, pc: pc.flush())
+        # all the live handles (cached or not) by name, flushed with the
+        # file and returned again while they are referenced
+        self._handles = weakref.WeakValueDictionary()
 
     def valid(self):
         """Checks if file is valid (i.e. open)
@@ -43,7 +62,8 @@ class CudsFile(object):
         return self._file is not None and self._file.isopen
 
     @classmethod
-    def open(cls, filename, mode="a", title=''):
+    def open(cls, filename, mode="a", title='', driver=None,
+             max_open_containers=MAX_OPEN_CONTAINERS):
         """Returns a SimPhony file and returns an opened CudsFile
 
         Parameters
@@ -58,32 +78,107 @@ class CudsFile(object):
                   with the same name would be deleted).
                 * *'a'*: Append; an existing file is opened for reading and
                   writing, and if the file does not exist it is created.
+                * *'r'*: Read-only; an existing file is opened for
+                  reading, any attempt to change it raises a ValueError.
 
 
         title : str
             Title attribute of root node (only applies to a file which
               is being created
 
+        driver : str, optional
+            The HDF5 driver used to access the file. With 'H5FD_CORE'
+            the whole file is read into memory when it is opened (and
+            written back on close, unless it was opened read-only), so
+            that the following reads do not touch the disk.
+
+        max_open_containers : int
+            maximum number of container handles kept in the cache
+
         """
-        if mode not in ('a', 'w'):
+        if mode not in ('a', 'w', 'r'):
             raise ValueError(
                 "Invalid mode string ''%s''. Only "
-                "'a' and 'w' are acceptable modes " % mode)
+                "'a', 'w' and 'r' are acceptable modes " % mode)
 
-        file = tables.open_file(filename, mode, title=title)
+        if driver is None:
+            file = tables.open_file(filename, mode, title=title)
+        else:
+            file = tables.open_file(
+                filename, mode, title=title, driver=driver)
 
         # create the high-level structure of the cuds file
-        for group in ('particle_container', 'lattice', 'mesh'):
-            if "/" + group not in file:
-                file.create_group('/', group, group)
+        if mode != 'r':
+            for group in ('particle_container', 'lattice', 'mesh'):
+                if "/" + group not in file:
+                    file.create_group('/', group, group)
+
+        return cls(file, max_open_containers)
+
+    @property
+    def read_only(self):
+        """True if the file was opened in read-only mode
+
+        """
+        return self._file.mode == 'r'
+
+    def flush(self):
+        """Writes the buffered changes of the containers to the file
+
+        The write buffers of the particle containers (see
+        FileParticleContainer.batch) are flushed and then the file.
 
-        return cls(file)
+        """
+        for pc in self._handles.values():
+            pc.flush()
+        self._file.flush()
 
     def close(self):
         """Closes a file
 
+        The buffered changes of the containers are written first.
+
+        """
+        if self._file.isopen and not self.read_only:
+            self.flush()
+        self._file.close()
+
+    def repack(self):
+        """Compact the particle containers and rewrite the file.
+
+        HDF5 does not return the space of the removed rows and nodes to
+        the file system. The particle containers are compacted (see
+        FileParticleContainer.compact) and the file is then copied to a
+        new file which replaces it, and reopened in append mode.
+
+        The particle containers and trajectories that were obtained before
+        the repack should no longer be used.
+
+        Raises
+        -------
+        ValueError
+           if the file was opened in read-only mode.
+
         """
+        if self.read_only:
+            raise ValueError("A read-only file can not be repacked")
+
+        self.flush()
+        for group in self._file.iter_nodes('/particle_container', 'Group'):
+            FileParticleContainer(group, self._file).compact()
+
+        filename = self._file.filename
+        driver = self._file.params['DRIVER']
+        temp_filename = filename + '.repack'
+        self._file.copy_file(temp_filename, overwrite=True)
         self._file.close()
+        os.rename(temp_filename, filename)
+        if driver is None:
+            self._file = tables.open_file(filename, 'a')
+        else:
+            self._file = tables.open_file(filename, 'a', driver=driver)
+        self._particle_containers.clear()
+        self._handles.clear()
 
     def add_particle_container(self, name, particle_container=None):
         """Add particle container to the file.
@@ -103,24 +198,83 @@ class CudsFile(object):
             get_particle_container for more information.
 
         """
-        if name in self._file.root.particle_container:
+        if self.read_only:
+            raise ValueError(
+                "A particle container can not be added to a read-only file")
+        if self._has_particle_container(name):
             raise ValueError(
                 'Particle container \'{n}\` already exists'.format(n=name))
 
         group = self._file.create_group('/particle_container/', name)
         pc = FileParticleContainer(group, self._file)
-        self._particle_containers[name] = (pc, group)
+        self._particle_containers[name] = pc
+        self._handles[name] = pc
 
         if particle_container:
-            # copy the contents of the particle container to the file
-            for particle in particle_container.iter_particles():
-                pc.add_particle(particle)
-            for bond in particle_container.iter_bonds():
-                pc.add_bond(bond)
+            # stream the contents of the particle container to the file
+            # (its ids are unique, so they are not checked again)
+            pc._append_particles(particle_container.iter_particles())
+            pc._append_bonds(particle_container.iter_bonds())
 
         self._file.flush()
         return pc
 
+    def sync(self, name, particle_container, reorder=None):
+        """Synchronize a particle container of the file with the given one.
+
+        If the file has no particle container with this name, the
+        particle container is added (see add_particle_container).
+        Otherwise, if the change tracking of the given particle container
+        is enabled (see ParticleContainer.track_changes), only the
+        recorded changes are written: the removed particles and bonds are
+        deleted, the updated ones are modified and the added ones are
+        appended, each operation in bulk. The recorded changes are then
+        cleared, so the next sync only writes the newer changes. Without
+        change tracking, the contents of the particle container in the
+        file are fully replaced.
+
+        With 'reorder', the particles in the file are then sorted along a
+        space-filling curve (see FileParticleContainer.reorder), so each
+        checkpoint keeps the spatially close particles in the same chunks.
+
+        Parameters
+        ----------
+        name : str
+            name of particle container
+        particle_container : ABCParticleContainer
+            particle container to be synchronized with the file. The
+            changes that it recorded should be relative to the state
+            of the particle container in the file.
+        reorder : str, optional
+            the space-filling curve ('hilbert' or 'morton') of the
+            particles in the file, they are not reordered by default.
+
+        Returns
+        ----------
+        FileParticleContainer
+            The particle container in the file.
+
+        """
+        get_changes = getattr(particle_container, 'get_changes', None)
+        tracking = (
+            get_changes is not None and get_changes('particles') is not None)
+        if not self._has_particle_container(name):
+            pc = self.add_particle_container(name, particle_container)
+        else:
+            pc = self.get_particle_container(name)
+            if tracking:
+                pc._apply_changes(particle_container)
+            else:
+                pc._replace_contents(particle_container)
+            self._file.flush()
+        if reorder is not None:
+            pc.reorder(reorder)
+            self._file.flush()
+
+        if tracking:
+            particle_container.clear_changes()
+        return pc
+
     def get_particle_container(self, name):
         """Get particle container from file.
 
@@ -135,15 +289,19 @@ class CudsFile(object):
             name of particle container to return
         """
         if name in self._particle_containers:
-            return self._particle_containers[name][0]
-        elif name in self._file.root.particle_container:
-            group = tables.Group(self._file.root.particle_container, name)
+            return self._particle_containers[name]
+        # a handle that was evicted but is still used is returned again
+        pc = self._handles.get(name)
+        if pc is None:
+            if not self._has_particle_container(name):
+                raise ValueError(
+                    'Particle container \'{n}\` does not exist'.format(
+                        n=name))
+            group = self._file.get_node('/particle_container', name)
             pc = FileParticleContainer(group, self._file)
-            self._particle_containers[name] = pc
-            return pc
-        else:
-            raise ValueError(
-                'Particle container \'{n}\` does not exist'.format(n=name))
+            self._handles[name] = pc
+        self._particle_containers[name] = pc
+        return pc
 
     def delete_particle_container(self, name):
         """Delete particle container from file.
@@ -153,13 +311,73 @@ class CudsFile(object):
         name : str
             name of particle container to delete
         """
-        if name in self._particle_containers:
-            self._particle_containers[name][1]._f_remove(recursive=True)
-            del self._particle_containers[name]
+        if self._has_particle_container(name):
+            self._particle_containers.pop(name, None)
+            # the buffered writes of the deleted container are dropped
+            pc = self._handles.pop(name, None)
+            if pc is None:
+                self._file.remove_node(
+                    '/particle_container', name, recursive=True)
+            else:
+                # the handle that was given out can no longer be used
+                pc._group._f_remove(recursive=True)
         else:
             raise ValueError(
                 'Particle container \'{n}\` does not exist'.format(n=name))
 
+    def add_trajectory(self, name, particle_container, cuba_keys=(),
+                       chunk_frames=None, chunk_particles=None):
+        """Add a trajectory of a particle container to the file.
+
+        The particles and bonds of the particle container are stored
+        once. The frames are then added with FileTrajectory.append_frame.
+
+        Parameters
+        ----------
+        name : str
+            name of the trajectory
+        particle_container : ABCParticleContainer
+            the particles and bonds of the trajectory
+        cuba_keys : sequence of CUBA
+            the particle attributes that are stored in each frame
+        chunk_frames, chunk_particles : int, optional
+            the chunk shape of the frame arrays (see
+            FileTrajectory.create)
+
+        Returns
+        ----------
+        FileTrajectory
+            The trajectory newly added to the file.
+
+        """
+        if '/trajectory' not in self._file:
+            self._file.create_group('/', 'trajectory', 'trajectory')
+        if name in self._file.root.trajectory:
+            raise ValueError(
+                'Trajectory \'{n}\' already exists'.format(n=name))
+
+        group = self._file.create_group('/trajectory/', name)
+        trajectory = FileTrajectory.create(
+            group, self._file, particle_container, cuba_keys,
+            chunk_frames, chunk_particles)
+        self._file.flush()
+        return trajectory
+
+    def get_trajectory(self, name):
+        """Get a trajectory from the file.
+
+        Parameters
+        ----------
+        name : str
+            name of the trajectory to return
+        """
+        if '/trajectory' in self._file and name in self._file.root.trajectory:
+            group = self._file.get_node('/trajectory', name)
+            return FileTrajectory(group, self._file)
+        else:
+            raise ValueError(
+                'Trajectory \'{n}\' does not exist'.format(n=name))
+
     def iter_particle_containers(self, names=None):
         """Returns an iterator over a subset or all
         of the particle containers. The iterator iterator yields
@@ -174,8 +392,32 @@ class CudsFile(object):
             be iterated over.
 
         """
-        names = copy.deepcopy(names)
         if names is None:
-            names = self._particle_containers.keys()
+            names = self._particle_container_names()
         for name in names:
             yield self.get_particle_container(name), name
+
+    def _particle_container_names(self):
+        """ The names of the particle containers in the file
+
+        Only the names of the children of the group are read, the
+        containers are not opened.
+
+        """
+        if '/particle_container' not in self._file:
+            # e.g. a file without containers opened read-only
+            return []
+        return sorted(self._file.root.particle_container._v_children)
+
+    def _has_particle_container(self, name):
+        """ True if the file has a particle container with this name
+
+        """
+        return ('/particle_container' in self._file and
+                name in self._file.root.particle_container)
+
+
+instrumentation.instrument(
+    CudsFile,
+    ('flush', 'repack', 'add_particle_container', 'sync',
+     'get_particle_container', 'delete_particle_container', 'add_trajectory'))
@@ -1,18 +1,41 @@
 """
 This class illustrates use of a particles container class for files
 """
+import contextlib
 import random
+import weakref
+from collections import OrderedDict, namedtuple
+from itertools import islice
 
 import tables
 import numpy
 
+from simphony.core import instrumentation
+from simphony.core.lru_cache import LRUCache
+from simphony.core.memory import deep_getsizeof
+from simphony.core.space_filling import curve_order
 from simphony.cuds.abstractparticles import ABCParticleContainer
 from simphony.cuds.particles import Particle, Bond
 
 
-MAX_NUMBER_PARTICLES_IN_BOND = 20
 MAX_INT = numpy.iinfo(numpy.uint32).max
 
+# number of buffered additions and updates that triggers a flush
+WRITE_BUFFER_SIZE = 10000
+# default number of particles (and of bonds) kept in the read cache
+READ_CACHE_SIZE = 1000
+# number of particles (or bonds) encoded and appended at once when many
+# of them are appended (e.g. when a container is copied into the file)
+APPEND_CHUNK_SIZE = 65536
+# number of rows read at once by the scans of the particles table (e.g.
+# the box queries)
+SCAN_CHUNK_SIZE = 65536
+# number of consecutive rows summarized by each record of the zone maps
+# (the per-zone minimum and maximum of the ids and coordinates)
+ZONE_SIZE = 4096
+
+ReadCacheInfo = namedtuple('ReadCacheInfo', 'hits misses size maxsize')
+
 
 class _ParticleDescription(tables.IsDescription):
     id = tables.UInt32Col(pos=1)
@@ -20,20 +43,365 @@ class _ParticleDescription(tables.IsDescription):
 
 
 class _BondDescription(tables.IsDescription):
+    id = tables.UInt32Col(pos=1)
+    # the particles of the bond are the n_particle_ids items of the
+    # bond_particles array that start at offset
+    offset = tables.Int64Col(pos=2)
+    n_particle_ids = tables.Int64Col(pos=3)
+
+
+# number of particle slots of the bonds of the files written before the
+# bond particles were stored in the bond_particles array
+LEGACY_MAX_NUMBER_PARTICLES_IN_BOND = 20
+
+
+class _LegacyBondDescription(tables.IsDescription):
     id = tables.UInt32Col(pos=1)
     # storing up to fixed number of particles for each bond
     particle_ids = tables.Int64Col(
-        pos=2, shape=(MAX_NUMBER_PARTICLES_IN_BOND,))
+        pos=2, shape=(LEGACY_MAX_NUMBER_PARTICLES_IN_BOND,))
     n_particle_ids = tables.Int64Col(pos=3)
 
 
+class _ParticleBondDescription(tables.IsDescription):
+    # one record for each particle of each bond
+    particle_id = tables.Int64Col(pos=1)
+    bond_id = tables.UInt32Col(pos=2)
+
+
+class _WriteBuffer(object):
+    """ Pending additions and updates of one kind of element
+
+    Attributes
+    ----------
+    added : OrderedDict
+        the new elements by id (in the order of addition)
+    updated : dict
+        the updated elements (that are already in the table) by id
+
+    """
+    def __init__(self):
+        self.added = OrderedDict()
+        self.updated = {}
+
+    def __len__(self):
+        return len(self.added) + len(self.updated)
+
+    def clear(self):
+        self.added.clear()
+        self.updated.clear()
+
+
+class _ZoneMap(object):
+    """ The minimum and maximum of some columns of a table, by zone
+
+    The rows of the table are grouped in zones of 'size' consecutive rows
+    and the '<table>_zones' table, stored next to it, has one record per
+    zone with the '<column>_min' and '<column>_max' values of the zone.
+    A query only reads the zones whose ranges can hold a match. The zones
+    only have to contain the values of their rows: an update widens the
+    range of its zone, the removal of a single row widens the ranges of
+    the following zones (see remove) and the ranges are recomputed when
+    rows are moved or removed in bulk.
+
+    The zones are kept in memory, in a single zone map for all the
+    handles of the table (see open), and written to the zones table by
+    save. The 'nrows' attribute of the zones table is the number of rows
+    of the table that they summarize (-1 while the zones table is out of
+    date) and its 'version' attribute counts the changes of the zones.
+
+    Attributes
+    ----------
+    table : tables.Table
+        the summarized table
+    zones : tables.Table
+        the zones table
+    size : int
+        the number of rows of each zone
+    columns : list of str
+        the summarized columns
+    summary : numpy.ndarray
+        the zone records
+    nrows : int
+        the number of rows of the table that the zones summarize
+    version : int
+        the number of changes of the zones (saved with them)
+
+    """
+    def __init__(self, table, zones):
+        self.table = table
+        self.zones = zones
+        self.size = int(zones.attrs.zone_size)
+        self.columns = [name[:-len('_min')] for name in zones.colnames
+                        if name.endswith('_min')]
+        self.summary = zones.read()
+        self.version = getattr(zones.attrs, 'version', 0)
+        # the number of rows of the table summarized by the zones
+        self.nrows = getattr(zones.attrs, 'nrows', None)
+        # first zone that differs from the zones table (None if none)
+        self._unsaved_from = None
+        # rows removed one by one since the zones were last recomputed
+        self._removed = 0
+        self._removed_from = None
+
+    @classmethod
+    def create(cls, file, table, columns):
+        """ Create the zones of the table (from its current rows)
+
+        The zones have ZONE_SIZE rows.
+
+        """
+        description = numpy.dtype([
+            (column + suffix, table.coldtypes[column])
+            for column in columns for suffix in ('_min', '_max')])
+        zones = file.create_table(
+            table._v_parent, table.name + '_zones', description)
+        zones.attrs.zone_size = ZONE_SIZE
+        zone_map = cls(table, zones)
+        zone_map.rebuild()
+        _ZONE_MAPS[_zone_map_key(table)] = zone_map
+        return zone_map
+
+    @classmethod
+    def open(cls, table, rebuild):
+        """ The zones of the table, or None if it has none
+
+        The zone map of another handle of the table is returned if it
+        is still in use. Zones that were computed for another number of
+        rows (e.g. the table was appended to by a version that did not
+        maintain them, or the file was not flushed) are rebuilt if
+        'rebuild' is True and ignored otherwise.
+
+        """
+        key = _zone_map_key(table)
+        zone_map = _ZONE_MAPS.get(key)
+        if zone_map is not None:
+            return zone_map
+        name = table.name + '_zones'
+        if name not in table._v_parent:
+            return None
+        zone_map = cls(table, table._v_parent._f_get_child(name))
+        if zone_map.nrows != table.nrows:
+            if not rebuild:
+                return None
+            zone_map.rebuild()
+        _ZONE_MAPS[key] = zone_map
+        return zone_map
+
+    def row_ranges(self, bounds):
+        """ The ranges of rows that can hold values inside the bounds
+
+        Parameters
+        ----------
+        bounds : dict
+            column -> (lo, hi), the closed range of the values (for a
+            multidimensional column lo and hi are compared item by item)
+
+        Returns
+        -------
+        list of (start, stop) tuples
+            the sorted ranges of consecutive candidate zones
+
+        """
+        summary = self.summary
+        candidates = numpy.ones(len(summary), dtype=numpy.bool)
+        for column, (lo, hi) in bounds.iteritems():
+            inside = ((summary[column + '_min'] <= hi) &
+                      (summary[column + '_max'] >= lo))
+            if inside.ndim > 1:
+                inside = numpy.all(
+                    inside.reshape(len(summary), -1), axis=1)
+            candidates &= inside
+        zones = numpy.flatnonzero(candidates)
+        if len(zones) == 0:
+            return []
+        breaks = numpy.flatnonzero(numpy.diff(zones) != 1) + 1
+        starts = zones[numpy.concatenate(([0], breaks))] * self.size
+        stops = numpy.minimum(
+            (zones[numpy.concatenate((breaks - 1, [len(zones) - 1]))] + 1) *
+            self.size, self.table.nrows)
+        return zip(starts.tolist(), stops.tolist())
+
+    def extend(self, start, records):
+        """ Add the records appended to the table at row 'start'
+
+        """
+        if len(records) == 0:
+            return
+        head = min(len(records), -start % self.size)
+        if head > 0:
+            # the first records fill the last zone
+            self.widen(numpy.arange(start, start + head), records[:head])
+        new = self._summarize(records[head:])
+        if len(new) > 0:
+            self._changed(len(self.summary))
+            self.summary = numpy.concatenate((self.summary, new))
+        self._set_nrows(start + len(records))
+
+    def widen(self, rows, records):
+        """ Include the values of the updated (or added) rows
+
+        """
+        zones, inverse = numpy.unique(
+            numpy.asarray(rows) // self.size, return_inverse=True)
+        summary = self.summary[zones]
+        for column in self.columns:
+            numpy.minimum.at(summary[column + '_min'], inverse,
+                             records[column])
+            numpy.maximum.at(summary[column + '_max'], inverse,
+                             records[column])
+        if summary.tobytes() == self.summary[zones].tobytes():
+            # the values are inside the ranges of their zones
+            return
+        self._changed(zones[0])
+        self.summary[zones] = summary
+
+    def remove(self, row):
+        """ Account for the removal of the row 'row' of the table
+
+        The following rows move up by one, so each zone from the one of
+        the row gains the first row of the next zone: the range of the
+        zone is widened with it (the rows are read with a single strided
+        read) instead of being recomputed. Since the ranges grow with
+        each removal, the zones are recomputed once 'size' rows have been
+        removed this way.
+
+        """
+        if self._removed_from is None or row < self._removed_from:
+            self._removed_from = row
+        self._removed += 1
+        if self._removed >= self.size:
+            self.rebuild(self._removed_from)
+            return
+        nrows = self.table.nrows
+        first = row // self.size
+        gained = (first + 1) * self.size - 1
+        if gained < nrows:
+            records = self.table.read(gained, nrows, self.size)
+            self.widen(
+                numpy.arange(gained, nrows, self.size)[:len(records)],
+                records)
+        number_of_zones = -(-nrows // self.size)
+        if number_of_zones < len(self.summary):
+            self._changed(number_of_zones)
+            self.summary = self.summary[:number_of_zones]
+        self._set_nrows(nrows)
+
+    def rebuild(self, start=0):
+        """ Recompute the zones from the one of row 'start' to the end
+
+        """
+        first = start // self.size
+        self._changed(first)
+        self.summary = self.summary[:first]
+        step = self.size * max(1, SCAN_CHUNK_SIZE // self.size)
+        for begin in xrange(first * self.size, self.table.nrows, step):
+            self.extend(begin, self.table.read(begin, begin + step))
+        self._set_nrows(self.table.nrows)
+        self._removed = 0
+        self._removed_from = None
+
+    def save(self):
+        """ Write the changed zones (and the attributes) to the zones table
+
+        """
+        first = self._unsaved_from
+        if first is None:
+            return
+        if first < self.zones.nrows:
+            self.zones.remove_rows(first, self.zones.nrows)
+        if first < len(self.summary):
+            self.zones.append(self.summary[first:])
+        self.zones.attrs.nrows = self.nrows
+        self.zones.attrs.version = self.version
+        self._unsaved_from = None
+
+    def _set_nrows(self, nrows):
+        if nrows != self.nrows:
+            # only the attributes of the zones table change
+            self._changed(len(self.summary))
+            self.nrows = nrows
+
+    def _changed(self, zone):
+        # the zones from 'zone' on differ from the zones table
+        if self._unsaved_from is None:
+            # the zones table is out of date until it is saved
+            self.zones.attrs.nrows = -1
+            self._unsaved_from = zone
+        else:
+            self._unsaved_from = min(self._unsaved_from, zone)
+        self.version += 1
+
+    def _summarize(self, records):
+        # one zone record for each 'size' records
+        starts = numpy.arange(0, len(records), self.size)
+        summary = numpy.empty(len(starts), dtype=self.zones.dtype)
+        if len(records) > 0:
+            for column in self.columns:
+                summary[column + '_min'] = numpy.minimum.reduceat(
+                    records[column], starts)
+                summary[column + '_max'] = numpy.maximum.reduceat(
+                    records[column], starts)
+        return summary
+
+
+# the zone maps in use by (file, path of the table), shared by the
+# handles of the table
+_ZONE_MAPS = weakref.WeakValueDictionary()
+
+
+def _zone_map_key(table):
+    return id(table._v_file), table._v_pathname
+
+
 class FileParticleContainer(ABCParticleContainer):
     """
     Responsible class to synchronize operations on particles
+
+    The particles of the bonds are stored one after the other in the
+    'bond_particles' array and each row of the 'bonds' table points to
+    its particles with an offset and a count. The bond tables of the older
+    files, with a fixed number of particle slots in each row, are migrated
+    to this layout when they are opened for writing and read as they are
+    otherwise.
+
+    The bonds of each particle are found with the 'particle_bonds' table of
+    (particle_id, bond_id) records, which has a PyTables index on the
+    particle_id column. The table is only appended to: the records of the
+    removed bonds, and of the particles that left an updated bond, are
+    left in place and skipped when the bonds are read.
+
+    Inside a batch (see the batch method) the added and updated particles
+    and bonds are kept in a write buffer and written in bulk. The particles
+    and bonds that are read by id can be kept in an optional read cache
+    (see the enable_read_cache method).
+
+    The 'particles_zones' and 'bonds_zones' tables hold the minimum and
+    maximum id (and coordinates) of each zone of ZONE_SIZE rows of the
+    particles and bonds tables. The lookups by id and the box queries skip
+    the zones that can not match. They are created when a file without
+    them is opened for writing; the tables of a read-only file without
+    them are scanned entirely.
     """
     def __init__(self, group, file):
         self._file = file
         self._group = group
+        self._buffers = None
+        self._buffer_size = WRITE_BUFFER_SIZE
+        self._batch_depth = 0
+        self._read_caches = None
+        self._zone_maps = {}
+        # (particle_id, bond_id) records not yet in the particle_bonds table
+        self._index_pending = []
+        self._legacy_bonds = (
+            "bonds" in self._group and
+            "particle_ids" in self._group.bonds.colnames)
+        if file.mode == 'r':
+            # the tables of a read-only file can not be created (the
+            # tables without zone maps are scanned entirely)
+            self._open_zone_maps()
+            return
+
         if "particles" not in self._group:
             # create table to hold particles
             self._create_particles_table()
@@ -42,6 +410,23 @@ class FileParticleContainer(ABCParticleContainer):
             # create table to hold bonds
             self._create_bonds_table()
 
+        if "bond_particles" not in self._group:
+            # create array to hold the particles of the bonds
+            self._create_bond_particles_array()
+
+        if "particle_bonds" not in self._group:
+            # create the index of the bonds of each particle (the bonds of
+            # an older file are converted and indexed)
+            self._create_particle_bonds_table()
+            if self._legacy_bonds:
+                self._migrate_legacy_bonds()
+            else:
+                self._append_particle_bonds(
+                    (bond.id, bond.particles) for bond in self.iter_bonds())
+
+        # the zone maps are created (from the existing rows) if needed
+        self._open_zone_maps()
+
     # Particle methods ######################################################
 
     def add_particle(self, particle):
@@ -62,71 +447,192 @@ class FileParticleContainer(ABCParticleContainer):
            if an id is given which already exists.
 
         """
+        if self._buffers is not None:
+            return self._buffered_add('particles', particle)
+
         id = particle.id
         if id is None:
             id = self._generate_unique_id(self._group.particles)
         else:
-            for _ in self._group.particles.where(
-                    'id == value', condvars={'value': id}):
+            for _ in self._where_id(self._group.particles, id):
                 raise ValueError(
                     'Particle (id={id}) already exists'.format(id=id))
 
         # insert a new particle record
-        self._group.particles.append([(id, particle.coordinates)])
+        table = self._group.particles
+        start = table.nrows
+        records = numpy.array(
+            [(id, particle.coordinates)], dtype=table.dtype)
+        table.append(records)
+        self._extend_zones(table, start, records)
+        _count_bytes(table, written=table.rowsize)
         return id
 
     def update_particle(self, particle):
         """Update particle"""
-        for row in self._group.particles.where(
-                'id == value', condvars={'value': particle.id}):
+        if self._buffers is not None:
+            self._buffered_update('particles', particle)
+            return
+
+        self._invalidate('particles', [particle.id])
+        table = self._group.particles
+        for row in self._where_id(table, particle.id):
             row['coordinates'] = list(particle.coordinates)
             row.update()
             # see https://github.com/PyTables/PyTables/issues/11
             row._flush_mod_rows()
+            self._widen_zones(table, [row.nrow], numpy.array(
+                [(particle.id, particle.coordinates)], dtype=table.dtype))
+            _count_bytes(table, written=table.rowsize)
             return
         else:
             raise ValueError(
                 'Particle (id={id}) does not exist'.format(id=particle.id))
 
+    def update_particles(self, particles):
+        """Update several particles
+
+        The rows of the particles are found with a single read of the id
+        column and rewritten with a single call (inside a batch, the
+        particles are buffered as by update_particle).
+
+        Raises
+        -------
+        ValueError
+           if any of the particles does not exist (nothing is updated).
+
+        """
+        if self._buffers is not None:
+            for particle in particles:
+                self._buffered_update('particles', particle)
+            return
+        self._update_particle_rows(particles)
+
     def get_particle(self, id):
         """Get particle"""
-        for row in self._group.particles.where(
-                'id == value', condvars={'value': id}):
-            return Particle(
+        if self._buffers is not None:
+            particle = self._buffered_get('particles', id)
+            if particle is not None:
+                return particle
+
+        particle = self._get_cached('particles', id)
+        if particle is not None:
+            return particle
+
+        for row in self._where_id(self._group.particles, id):
+            particle = Particle(
                 id=id, coordinates=tuple(row['coordinates']))
+            self._cache('particles', particle)
+            _count_bytes(row.table, read=row.table.rowsize)
+            return particle
         else:
             raise ValueError(
                 'Particle (id={id}) does not exist'.format(id=id))
 
-    def remove_particle(self, id):
-        """Remove particle"""
-        for row in self._group.particles.where(
-                'id == value', condvars={'value': id}):
-            if self._group.particles.nrows == 1:
-                # pytables due to hdf5 limitations does
-                # not support removing the last row of table
-                # so we delete the table and
-                # create new empty table in this situation
-                self._group.particles.remove()
-                self._create_particles_table()
-            else:
-                self._group.particles.remove_row(row.nrow)
-            return
+    def remove_particle(self, id, remove_bonds=False):
+        """Remove particle
+
+        If remove_bonds is True, the bonds of the particle are
+        removed too.
+
+        """
+        self._write_buffers()
+        self._invalidate('particles', [id])
+        table = self._group.particles
+        for row in self._where_id(table, id):
+            row_number = row.nrow
+            table.remove_row(row_number)
+            self._remove_zone_row(table, row_number)
+            break
         else:
             raise ValueError(
                 'Particle (id={id}) does not exist'.format(id=id))
 
+        if remove_bonds:
+            self._remove_bonds_of_particles([id])
+
+    def remove_particles(self, ids, remove_bonds=False):
+        """Remove several particles
+
+        The rows of the particles are found with a single read of the id
+        column and are removed one range of consecutive rows at a time,
+        so removing many particles does not shift the rest of the table
+        once for each particle.
+
+        Parameters
+        ----------
+        ids : iterable
+            the ids of the particles to remove
+        remove_bonds : bool
+            if True, the bonds of the particles are removed too
+
+        Raises
+        -------
+        ValueError
+           if any of the particles does not exist (nothing is removed).
+
+        """
+        self._write_buffers()
+        ids = list(ids)
+        table = self._group.particles
+        self._remove_rows(table, self._find_rows(table, ids))
+        self._invalidate('particles', ids)
+        if remove_bonds:
+            self._remove_bonds_of_particles(ids)
+
     def iter_particles(self, ids=None):
         """Get iterator over particles"""
+        self._write_buffers()
         if ids is None:
-            for row in self._group.particles:
+            table = self._group.particles
+            for row in table:
                 yield Particle(
                     id=row['id'], coordinates=tuple(row['coordinates']))
+            _count_bytes(table, read=table.nrows * table.rowsize)
         else:
             # FIXME: we might want to use an indexed query for these cases.
             for particle_id in ids:
                 yield self.get_particle(particle_id)
 
+    def iter_particles_in_box(self, lo, hi):
+        """Get iterator over the particles inside a box
+
+        Only the zones of the particles table whose bounding boxes
+        intersect the box are read (all of them when the table has no
+        zone map). They are read in chunks of SCAN_CHUNK_SIZE rows, each
+        chunk being tested at once with numpy, so only the particles
+        inside the box are created. (The coordinates are a
+        multidimensional column, which PyTables can neither use in
+        in-kernel conditions nor index.) The particles that are close
+        in space are in few zones after reorder.
+
+        Parameters
+        ----------
+        lo, hi : sequence of 3 floats
+            the lower and upper corners of the box (a particle is inside
+            if lo <= coordinates <= hi along each axis)
+
+        Raises
+        -------
+        ValueError
+           if the corners are not 3D points.
+
+        """
+        lo, hi = _box(lo, hi)
+        self._write_buffers()
+        table = self._group.particles
+        for start, stop in self._zone_rows(table, {'coordinates': (lo, hi)}):
+            for begin in xrange(start, stop, SCAN_CHUNK_SIZE):
+                records = table.read(
+                    begin, min(begin + SCAN_CHUNK_SIZE, stop))
+                _count_bytes(table, read=records.nbytes)
+                coordinates = records['coordinates']
+                inside = numpy.all(
+                    (coordinates >= lo) & (coordinates <= hi), axis=1)
+                for id, xyz in zip(records['id'][inside].tolist(),
+                                   coordinates[inside].tolist()):
+                    yield Particle(id=id, coordinates=tuple(xyz))
+
     # Bond methods #######################################################
 
     def add_bond(self, bond):
@@ -147,28 +653,39 @@ class FileParticleContainer(ABCParticleContainer):
            if an id is given which already exists.
 
         """
+        if self._buffers is not None:
+            return self._buffered_add('bonds', bond)
+
         id = bond.id
         if id is None:
             id = self._generate_unique_id(self._group.bonds)
         else:
-            for r in self._group.bonds.where(
-                    'id == value', condvars={'value': id}):
+            for _ in self._where_id(self._group.bonds, id):
                 raise ValueError(
                     'Bond (id={id}) already exists'.format(id=id))
 
         # insert a new bond record
-        self._group.bonds.append([self._bond_to_row(bond, id)])
+        self._append_bond_rows([(id, bond.particles)])
         return id
 
     def update_bond(self, bond):
         """Update particle"""
-        for row in self._group.bonds.where(
-                'id == value', condvars={'value': bond.id}):
-            _, row['particle_ids'], row['n_particle_ids'] = \
-                self._bond_to_row(bond, bond.id)
+        if self._buffers is not None:
+            self._buffered_update('bonds', bond)
+            return
+
+        self._invalidate('bonds', [bond.id])
+        for row in self._where_id(self._group.bonds, bond.id):
+            old_particles = self._read_bond_particles(row)
+            row['offset'], row['n_particle_ids'] = \
+                self._store_bond_particles(
+                    bond.particles, row['offset'], row['n_particle_ids'])
+            self._append_particle_bonds(
+                [(bond.id, set(bond.particles).difference(old_particles))])
             row.update()
             # see https://github.com/PyTables/PyTables/issues/11
             row._flush_mod_rows()
+            _count_bytes(row.table, written=row.table.rowsize)
             return
         else:
             raise ValueError(
@@ -176,59 +693,740 @@ class FileParticleContainer(ABCParticleContainer):
 
     def get_bond(self, id):
         """Get bond"""
-        for row in self._group.bonds.where(
-                'id == value', condvars={'value': id}):
-            particles = row['particle_ids'][:row['n_particle_ids']]
+        if self._buffers is not None:
+            bond = self._buffered_get('bonds', id)
+            if bond is not None:
+                return bond
+
+        bond = self._get_cached('bonds', id)
+        if bond is not None:
+            return bond
+
+        for row in self._where_id(self._group.bonds, id):
             # FIXME: do we have to convert to a tuple, why not a list?
-            return Bond(id=row['id'], particles=tuple(particles))
+            bond = Bond(
+                id=row['id'], particles=self._read_bond_particles(row))
+            self._cache('bonds', bond)
+            _count_bytes(row.table, read=row.table.rowsize)
+            return bond
         else:
             raise ValueError('Bond (id={id}) does not exist'.format(id=id))
 
     def remove_bond(self, id):
         """Remove bond"""
-        for row in self._group.bonds.where(
-                'id == value', condvars={'value': id}):
-            if self._group.bonds.nrows == 1:
-                # pytables due to hdf5 limitations does
-                # not support removing the last row of table
-                # so we delete the table and
-                # create new empty table in this situation
-                self._group.bonds.remove()
-                self._create_bonds_table()
-            else:
-                self._group.bonds.remove_row(row.nrow)
+        self._write_buffers()
+        self._invalidate('bonds', [id])
+        table = self._group.bonds
+        for row in self._where_id(table, id):
+            row_number = row.nrow
+            table.remove_row(row_number)
+            self._remove_zone_row(table, row_number)
             return
         else:
             raise ValueError(
                 'Bond (id={id}) does not exist'.format(id=id))
 
+    def remove_bonds(self, ids):
+        """Remove several bonds
+
+        The rows of the bonds are removed in the same way as in
+        remove_particles. The space of their particles in the
+        bond_particles array is reclaimed by compact.
+
+        Raises
+        -------
+        ValueError
+           if any of the bonds does not exist (nothing is removed).
+
+        """
+        self._write_buffers()
+        ids = list(ids)
+        table = self._group.bonds
+        self._remove_rows(table, self._find_rows(table, ids))
+        self._invalidate('bonds', ids)
+
     def iter_bonds(self, ids=None):
         """Get iterator over bonds"""
+        self._write_buffers()
         if ids is None:
-            for row in self._group.bonds:
-                n = row['n_particle_ids']
-                particles = row['particle_ids'][:n]
-                yield Bond(id=row['id'], particles=tuple(particles))
+            table = self._group.bonds
+            # read the table and the bond particles block by block
+            for start in xrange(0, table.nrows, table.nrowsinbuf):
+                records = table.read(start, start + table.nrowsinbuf)
+                _count_bytes(table, read=records.nbytes)
+                ids = records['id'].tolist()
+                counts = records['n_particle_ids'].tolist()
+                if self._legacy_bonds:
+                    particles = records['particle_ids'].tolist()
+                    for id, bond_particles, n in zip(ids, particles, counts):
+                        yield Bond(id=id, particles=tuple(bond_particles[:n]))
+                else:
+                    offsets = records['offset']
+                    low = offsets.min()
+                    high = (offsets + records['n_particle_ids']).max()
+                    array = self._group.bond_particles
+                    particles = array[low:high].tolist()
+                    _count_bytes(array, read=(high - low) * array.atom.size)
+                    for id, offset, n in zip(
+                            ids, (offsets - low).tolist(), counts):
+                        yield Bond(
+                            id=id, particles=tuple(
+                                particles[offset:offset + n]))
         else:
             for id in ids:
                 yield self.get_bond(id)
 
+    def iter_bonds_of_particle(self, particle_id):
+        """Get iterator over the bonds of a particle
+
+        The bonds are found with an indexed query of the particle_bonds
+        table and their rows with the zone maps of the bonds table (the
+        bonds of an older file opened read-only, which has no such table,
+        are scanned instead).
+
+        """
+        self._write_buffers()
+        if "particle_bonds" not in self._group:
+            for bond in self.iter_bonds():
+                if particle_id in bond.particles:
+                    yield bond
+            return
+
+        for _, bond in self._iter_bonds_of_particles([particle_id]):
+            yield bond
+
     def has_particle(self, id):
         """Checks if a particle with id "id" exists in the container."""
-        for row in self._group.particles.where(
-                'id == value', condvars={'value': id}):
+        if self._buffers is not None and id in self._buffers[
+                'particles'].added:
             return True
-        return False
+        return self._in_table(self._group.particles, id)
 
     def has_bond(self, id):
         """Checks if a bond with id "id" exists in the container."""
-        for row in self._group.bonds.where(
-                'id == value', condvars={'value': id}):
+        if self._buffers is not None and id in self._buffers['bonds'].added:
+            return True
+        return self._in_table(self._group.bonds, id)
+
+    def compact(self):
+        """Reclaim the space left by the removed and updated bonds
+
+        The bond_particles array is rewritten once, without the particles
+        of the removed bonds and the old particles of the updated bonds,
+        and the particle_bonds index table is rebuilt without the records
+        that no longer match a bond. The space is reused by the later
+        additions; CudsFile.repack returns it to the file system.
+
+        """
+        self._write_buffers()
+        self._flush_index()
+        table = self._group.bonds
+        records = table.read()
+        counts = records['n_particle_ids']
+        offsets = numpy.zeros(len(records), dtype=numpy.int64)
+        offsets[1:] = numpy.cumsum(counts)[:-1]
+
+        # position in the old array of each item of the new array
+        positions = numpy.arange(counts.sum()) + numpy.repeat(
+            records['offset'] - offsets, counts)
+        new_particles = self._group.bond_particles[:][positions]
+        array = self._group.bond_particles
+        array.truncate(0)
+        array.append(new_particles)
+        if len(records) > 0:
+            table.modify_column(column=offsets, colname='offset')
+
+        index = self._group.particle_bonds
+        if index.nrows > 0:
+            index.remove_rows(0, index.nrows)
+        self._append_particle_bonds(
+            (id, new_particles[offset:offset + n]) for id, offset, n in
+            zip(records['id'], offsets, counts))
+
+    def reorder(self, method='hilbert'):
+        """Sort the particle records along a space-filling curve
+
+        The records of the particles table are rewritten in place in the
+        order of the curve (see simphony.core.space_filling), so the
+        particles that are close in space are stored in the same chunks
+        of the file: the reads of a region of space (and iter_particles
+        followed by a neighbour search) touch fewer chunks. The ids and
+        the bonds do not change.
+
+        Parameters
+        ----------
+        method : str
+            'hilbert' (the default) or 'morton'
+
+        Raises
+        ------
+        ValueError
+            if the method is unknown
+
+        """
+        self._write_buffers()
+        table = self._group.particles
+        records = table.read()
+        order = curve_order(records['coordinates'].reshape(-1, 3), method)
+        if len(records) > 0:
+            table.modify_rows(0, len(records), rows=records[order])
+            table.flush()
+            self._rebuild_zones(table, 0)
+            _count_bytes(table, read=records.nbytes, written=records.nbytes)
+
+    # Buffering methods #####################################################
+
+    @contextlib.contextmanager
+    def batch(self, size=WRITE_BUFFER_SIZE):
+        """Buffer the additions and updates of a block of code
+
+        Inside the with block the added and updated particles and bonds
+        are kept in memory (the last update of an id wins) and written in
+        bulk when the buffer holds 'size' elements, when flush (or
+        CudsFile.flush and CudsFile.close) is called and at the end of
+        the block. The queries see the buffered writes. Batches can be
+        nested, the buffer is flushed at the end of the outermost one.
+
+        Examples
+        --------
+        >>> with pc.batch():
+                for particle in particles:
+                    pc.update_particle(particle)
+
+        """
+        if self._batch_depth == 0:
+            self._buffers = {'particles': _WriteBuffer(),
+                             'bonds': _WriteBuffer()}
+            self._buffer_size = size
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+                self._buffers = None
+
+    def flush(self):
+        """Write the buffered additions and updates to the file
+
+        The new records of the particle_bonds table are flushed too,
+        which updates its index, and the changed zone maps are saved.
+
+        """
+        self._write_buffers()
+        self._flush_index()
+        for zone_map in self._zone_maps.itervalues():
+            zone_map.save()
+
+    # Read cache methods ####################################################
+
+    def enable_read_cache(self, size=READ_CACHE_SIZE):
+        """Keep the most recently read particles and bonds in memory
+
+        get_particle and get_bond (and iter_particles and iter_bonds when
+        they are given ids) first look for the element in a least recently
+        used cache of 'size' particles and 'size' bonds. The cached
+        elements are discarded when they are updated or removed.
+
+        """
+        self._read_caches = {
+            'particles': LRUCache(size), 'bonds': LRUCache(size)}
+
+    def disable_read_cache(self):
+        """Discard the read cache and stop caching
+
+        """
+        self._read_caches = None
+
+    def read_cache_info(self):
+        """The statistics of the read cache
+
+        Returns
+        -------
+        dict
+            'particles' and 'bonds' -> ReadCacheInfo(hits, misses, size,
+            maxsize), or None if the read cache is disabled
+
+        """
+        if self._read_caches is None:
+            return None
+        return {
+            kind: ReadCacheInfo(
+                cache.hits, cache.misses, len(cache), cache.maxsize)
+            for kind, cache in self._read_caches.iteritems()}
+
+    def memory_usage(self):
+        """The approximate number of bytes used in memory by the container
+
+        Only the write buffer and the read cache are counted, the
+        particles and bonds in the file are not.
+
+        """
+        return deep_getsizeof(self._buffers, self._read_caches)
+
+    # Array methods #########################################################
+
+    def read_ids(self):
+        """Read the ids of all the particles in a single call
+
+        Returns
+        -------
+        numpy.ndarray
+            the ids, in the storage order of the particles
+
+        """
+        self._write_buffers()
+        ids = self._group.particles.col('id')
+        _count_bytes(self._group.particles, read=ids.nbytes)
+        return ids
+
+    def read_coordinates(self):
+        """Read the coordinates of all the particles in a single call
+
+        The coordinates are read straight into an array, without
+        creating a Particle for each record.
+
+        Returns
+        -------
+        numpy.ndarray
+            the coordinates, of shape (N, 3), in the same order as the
+            ids returned by read_ids
+
+        """
+        self._write_buffers()
+        coordinates = self._group.particles.col('coordinates')
+        _count_bytes(self._group.particles, read=coordinates.nbytes)
+        return coordinates
+
+    # Bulk methods (used to synchronize with other containers) #############
+
+    def _apply_changes(self, container):
+        """Write the changes recorded by 'container' into the file.
+
+        Parameters
+        ----------
+        container : ABCParticleContainer
+            a particle container with change tracking enabled, whose
+            recorded changes are relative to the contents of this container.
+
+        """
+        self._write_buffers()
+        particles = container.get_changes('particles')
+        bonds = container.get_changes('bonds')
+        particles_table = self._group.particles
+        bonds_table = self._group.bonds
+        self._remove_rows(
+            particles_table,
+            self._find_rows(particles_table, particles.removed))
+        self._remove_rows(
+            bonds_table, self._find_rows(bonds_table, bonds.removed))
+        self._invalidate('particles', particles.removed)
+        self._invalidate('bonds', bonds.removed)
+        self._update_particle_rows(container.iter_particles(particles.updated))
+        self._update_bond_rows(container.iter_bonds(bonds.updated))
+        self._append_particles(container.iter_particles(particles.added))
+        self._append_bonds(container.iter_bonds(bonds.added))
+
+    def _replace_contents(self, container):
+        """Replace all the particles and bonds with the ones of 'container'.
+
+        """
+        self._write_buffers()
+        self._flush_index()
+        if self._read_caches is not None:
+            for cache in self._read_caches.itervalues():
+                cache.clear()
+        for table in (self._group.particles, self._group.bonds,
+                      self._group.particle_bonds):
+            if table.nrows > 0:
+                table.remove_rows(0, table.nrows)
+            self._rebuild_zones(table, 0)
+        self._group.bond_particles.truncate(0)
+        self._append_particles(container.iter_particles())
+        self._append_bonds(container.iter_bonds())
+
+    def _find_rows(self, table, ids):
+        """Returns the row numbers of the records with the given ids.
+
+        The ids are found as described in _lookup_rows.
+
+        Raises
+        -------
+        ValueError
+           if any of the ids does not exist.
+
+        """
+        ids = numpy.fromiter(ids, dtype=numpy.int64)
+        rows, found = self._lookup_rows(table, ids)
+        if not numpy.all(found):
+            raise ValueError(
+                'Items (ids={ids}) do not exist'.format(
+                    ids=list(ids[~found])))
+        return rows
+
+    def _lookup_rows(self, table, ids):
+        """Returns the row numbers of the records with the given ids
+        and a mask of the ids that were found (the row numbers of the
+        ids that were not found are meaningless).
+
+        Each id is searched in the zones that can hold it (see _where_id)
+        unless that reads more rows than the id column, which is then
+        read once (see _scan_rows).
+
+        """
+        ids = numpy.asarray(ids, dtype=numpy.int64)
+        zone_map = self._zone_maps.get(table.name)
+        if zone_map is None or len(ids) * zone_map.size >= table.nrows:
+            return self._scan_rows(table, ids)
+        rows = numpy.zeros(len(ids), dtype=numpy.int64)
+        found = numpy.zeros(len(ids), dtype=numpy.bool)
+        for index, id in enumerate(ids.tolist()):
+            for row in self._where_id(table, id):
+                rows[index] = row.nrow
+                found[index] = True
+                break
+        return rows, found
+
+    def _scan_rows(self, table, ids):
+        """Returns the row numbers of the records with the given ids
+        and a mask of the ids that were found, reading the id column
+        once instead of scanning the table once for each id.
+
+        """
+        table_ids = table.col('id')
+        _count_bytes(table, read=table_ids.nbytes)
+        if len(ids) == 0 or len(table_ids) == 0:
+            return (numpy.zeros(len(ids), dtype=numpy.int64),
+                    numpy.zeros(len(ids), dtype=numpy.bool))
+        order = numpy.argsort(table_ids, kind='mergesort')
+        positions = numpy.searchsorted(table_ids, ids, sorter=order)
+        rows = order[numpy.minimum(positions, len(order) - 1)]
+        return rows, table_ids[rows] == ids
+
+    def _id_rows(self, table, ids):
+        """Returns the sorted row numbers of the records with the given
+        ids (the ids that do not exist are skipped).
+
+        """
+        ids = numpy.unique(numpy.asarray(ids, dtype=numpy.int64))
+        rows, found = self._lookup_rows(table, ids)
+        return numpy.unique(rows[found])
+
+    def _iter_bonds_of_particles(self, particle_ids):
+        """Iterate over the (row number, bond) pairs of the bonds of any
+        of the given particles, in the order of the rows.
+
+        """
+        particle_ids = set(particle_ids)
+        self._flush_index()
+        index = self._group.particle_bonds
+        bond_ids = set()
+        for particle_id in particle_ids:
+            bond_ids.update(index.read_where(
+                'particle_id == value', condvars={'value': particle_id},
+                field='bond_id').tolist())
+        table = self._group.bonds
+        rows = self._id_rows(table, list(bond_ids))
+        if len(rows) == 0:
+            return
+        records = table.read_coordinates(rows)
+        _count_bytes(table, read=records.nbytes)
+        for row, record in zip(rows.tolist(), records):
+            particles = self._read_bond_particles(record)
+            # skip the records of the removed bonds and of the
+            # particles that are no longer part of the bond
+            if not particle_ids.isdisjoint(particles):
+                yield row, Bond(id=record['id'], particles=particles)
+
+    def _remove_bonds_of_particles(self, particle_ids):
+        """Remove the bonds of the given particles (found all at once).
+
+        """
+        rows = []
+        bond_ids = []
+        for row, bond in self._iter_bonds_of_particles(particle_ids):
+            rows.append(row)
+            bond_ids.append(bond.id)
+        self._invalidate('bonds', bond_ids)
+        self._remove_rows(self._group.bonds, rows)
+
+    def _remove_rows(self, table, rows):
+        """Remove the given rows, one call for each range of consecutive rows.
+
+        """
+        rows = numpy.unique(rows)
+        if len(rows) == 0:
+            return
+        # split the sorted rows in ranges of consecutive rows
+        breaks = numpy.nonzero(numpy.diff(rows) != 1)[0] + 1
+        starts = rows[numpy.concatenate(([0], breaks))]
+        stops = rows[numpy.concatenate((breaks - 1, [len(rows) - 1]))] + 1
+        # remove from the end so that the row numbers stay valid
+        for start, stop in reversed(zip(starts, stops)):
+            table.remove_rows(start, stop)
+        self._rebuild_zones(table, rows[0])
+
+    def _where_id(self, table, id):
+        """Iterate over the rows of the table with the given id.
+
+        Only the zones whose range of ids holds the id are searched.
+
+        """
+        for start, stop in self._zone_rows(table, {'id': (id, id)}):
+            for row in table.where('id == value', condvars={'value': id},
+                                   start=start, stop=stop):
+                yield row
+
+    def _in_table(self, table, id):
+        """Checks if the table has a record with the given id (only the
+        zones that can hold the id are searched).
+
+        """
+        for row in self._where_id(table, id):
             return True
         return False
 
+    def _zone_rows(self, table, bounds):
+        """Returns the ranges of rows that can hold values inside the
+        bounds (see _ZoneMap.row_ranges), all the rows if the table has
+        no zone map.
+
+        """
+        zone_map = self._zone_maps.get(table.name)
+        if zone_map is None:
+            return [(0, table.nrows)] if table.nrows > 0 else []
+        return zone_map.row_ranges(bounds)
+
+    def _extend_zones(self, table, start, records):
+        zone_map = self._zone_maps.get(table.name)
+        if zone_map is not None:
+            zone_map.extend(start, records)
+
+    def _widen_zones(self, table, rows, records):
+        zone_map = self._zone_maps.get(table.name)
+        if zone_map is not None:
+            zone_map.widen(rows, records)
+
+    def _remove_zone_row(self, table, row):
+        zone_map = self._zone_maps.get(table.name)
+        if zone_map is not None:
+            zone_map.remove(row)
+
+    def _rebuild_zones(self, table, start):
+        zone_map = self._zone_maps.get(table.name)
+        if zone_map is not None:
+            zone_map.rebuild(start)
+
+    def _update_particle_rows(self, particles):
+        particles = list(particles)
+        if len(particles) == 0:
+            return
+        table = self._group.particles
+        rows = self._find_rows(table, (particle.id for particle in particles))
+        self._invalidate('particles', (particle.id for particle in particles))
+        records = table.read_coordinates(rows)
+        records['coordinates'] = [
+            particle.coordinates for particle in particles]
+        table.modify_coordinates(rows, records)
+        self._widen_zones(table, rows, records)
+        _count_bytes(table, read=records.nbytes, written=records.nbytes)
+
+    def _update_bond_rows(self, bonds):
+        bonds = list(bonds)
+        if len(bonds) == 0:
+            return
+        table = self._group.bonds
+        rows = self._find_rows(table, (bond.id for bond in bonds))
+        self._invalidate('bonds', (bond.id for bond in bonds))
+        records = table.read_coordinates(rows)
+        new_particles = []
+        for record, bond in zip(records, bonds):
+            old_particles = self._read_bond_particles(record)
+            record['offset'], record['n_particle_ids'] = \
+                self._store_bond_particles(
+                    bond.particles, record['offset'],
+                    record['n_particle_ids'])
+            new_particles.append(
+                (bond.id, set(bond.particles).difference(old_particles)))
+        table.modify_coordinates(rows, records)
+        _count_bytes(table, read=records.nbytes, written=records.nbytes)
+        self._append_particle_bonds(new_particles)
+
+    def _append_particles(self, particles):
+        """Append the particles without checking their ids.
+
+        The particles are pulled from the iterable, encoded into a
+        structured array and appended in chunks of APPEND_CHUNK_SIZE, so
+        that only one chunk is kept in memory.
+
+        """
+        particles = iter(particles)
+        while True:
+            chunk = list(islice(particles, APPEND_CHUNK_SIZE))
+            if len(chunk) == 0:
+                break
+            table = self._group.particles
+            records = numpy.empty(len(chunk), dtype=table.dtype)
+            records['id'] = [particle.id for particle in chunk]
+            records['coordinates'] = [
+                particle.coordinates for particle in chunk]
+            start = table.nrows
+            table.append(records)
+            self._extend_zones(table, start, records)
+            _count_bytes(table, written=records.nbytes)
+
+    def _append_bonds(self, bonds):
+        """Append the bonds without checking their ids.
+
+        The bonds are appended in chunks of APPEND_CHUNK_SIZE.
+
+        """
+        bonds = iter(bonds)
+        while True:
+            chunk = [(bond.id, bond.particles)
+                     for bond in islice(bonds, APPEND_CHUNK_SIZE)]
+            if len(chunk) == 0:
+                break
+            self._append_bond_rows(chunk)
+
+    def _append_bond_rows(self, items):
+        """Append the bonds given as (id, particles) pairs.
+
+        The particles of all the bonds are appended to the bond_particles
+        array in a single call.
+
+        """
+        items = list(items)
+        ids = []
+        counts = []
+        particles = []
+        for id, bond_particles in items:
+            ids.append(id)
+            counts.append(len(bond_particles))
+            particles.extend(bond_particles)
+        if len(ids) == 0:
+            return
+        array = self._group.bond_particles
+        table = self._group.bonds
+        records = numpy.empty(len(ids), dtype=table.dtype)
+        records['id'] = ids
+        records['n_particle_ids'] = counts
+        records['offset'] = numpy.cumsum([array.nrows] + counts[:-1])
+        particles = numpy.array(particles, dtype=numpy.int64)
+        array.append(particles)
+        start = table.nrows
+        table.append(records)
+        self._extend_zones(table, start, records)
+        _count_bytes(array, written=particles.nbytes)
+        _count_bytes(table, written=records.nbytes)
+        self._append_particle_bonds(items)
+
+    def _append_particle_bonds(self, items):
+        """Index the particles of the bonds given as (id, particles) pairs.
+
+        """
+        # appending to the table updates its index, so the records are
+        # only appended before the next query (see _flush_index)
+        self._index_pending.extend(
+            (particle_id, id) for id, bond_particles in items
+            for particle_id in set(bond_particles))
+
+    def _write_buffers(self):
+        """Write the additions and updates buffered by a batch.
+
+        """
+        if self._buffers is None:
+            return
+        particles = self._buffers['particles']
+        bonds = self._buffers['bonds']
+        self._update_particle_rows(particles.updated.itervalues())
+        self._append_particles(particles.added.itervalues())
+        self._update_bond_rows(bonds.updated.itervalues())
+        self._append_bonds(bonds.added.itervalues())
+        particles.clear()
+        bonds.clear()
+
+    def _flush_index(self):
+        """Append the pending records to the particle_bonds table.
+
+        The records are appended at once and the table is flushed, since
+        the indexed queries only see the records once the table is
+        flushed (which updates the index).
+
+        """
+        pairs = self._index_pending
+        if len(pairs) == 0:
+            return
+        table = self._group.particle_bonds
+        records = numpy.empty(len(pairs), dtype=table.dtype)
+        records['particle_id'], records['bond_id'] = zip(*pairs)
+        table.append(records)
+        table.flush()
+        _count_bytes(table, written=records.nbytes)
+        self._index_pending = []
+
     # Private methods #######################################################
 
+    def _buffered_add(self, kind, element):
+        buffer = self._buffers[kind]
+        table = self._group._f_get_child(kind)
+        id = element.id
+        if id is None:
+            id = self._generate_unique_id(table, exclude=buffer.added)
+        elif id in buffer.added or self._in_table(table, id):
+            raise ValueError('{kind} (id={id}) already exists'.format(
+                kind=_ELEMENT_NAMES[kind], id=id))
+        buffer.added[id] = _copy_element(kind, element, id)
+        self._flush_if_full()
+        return id
+
+    def _buffered_update(self, kind, element):
+        buffer = self._buffers[kind]
+        table = self._group._f_get_child(kind)
+        id = element.id
+        if id in buffer.added:
+            buffer.added[id] = _copy_element(kind, element, id)
+        elif id in buffer.updated or self._in_table(table, id):
+            buffer.updated[id] = _copy_element(kind, element, id)
+        else:
+            raise ValueError('{kind} (id={id}) does not exist'.format(
+                kind=_ELEMENT_NAMES[kind], id=id))
+        self._flush_if_full()
+
+    def _buffered_get(self, kind, id):
+        buffer = self._buffers[kind]
+        element = buffer.added.get(id)
+        if element is None:
+            element = buffer.updated.get(id)
+        if element is None:
+            return None
+        return _copy_element(kind, element, id)
+
+    def _get_cached(self, kind, id):
+        if self._read_caches is None:
+            return None
+        element = self._read_caches[kind].get(id)
+        if element is None:
+            return None
+        return _copy_element(kind, element, id)
+
+    def _cache(self, kind, element):
+        if self._read_caches is not None:
+            self._read_caches[kind][element.id] = _copy_element(
+                kind, element, element.id)
+
+    def _invalidate(self, kind, ids):
+        if self._read_caches is not None:
+            cache = self._read_caches[kind]
+            for id in ids:
+                cache.pop(id, None)
+
+    def _flush_if_full(self):
+        if sum(len(buffer) for buffer in self._buffers.itervalues()) >= \
+                self._buffer_size:
+            self._write_buffers()
+
     def _create_particles_table(self):
             self._file.create_table(
                 self._group, "particles", _ParticleDescription)
@@ -237,22 +1435,114 @@ class FileParticleContainer(ABCParticleContainer):
             self._file.create_table(
                 self._group, "bonds", _BondDescription)
 
-    def _bond_to_row(self, bond, id):
-        n = len(bond.particles)
-        if n > MAX_NUMBER_PARTICLES_IN_BOND:
-            raise Exception(
-                'Bond has too many particles ({n} > {maxn})'.format(
-                    n=n, maxn=MAX_NUMBER_PARTICLES_IN_BOND))
-        particle_ids = [0] * MAX_NUMBER_PARTICLES_IN_BOND
-        particle_ids[:n] = bond.particles
-        return id, particle_ids, n
-
-    def _generate_unique_id(self, table, number_tries=1000):
+    def _create_bond_particles_array(self):
+        self._file.create_earray(
+            self._group, "bond_particles", tables.Int64Atom(), shape=(0,))
+
+    def _create_particle_bonds_table(self):
+        table = self._file.create_table(
+            self._group, "particle_bonds", _ParticleBondDescription)
+        table.cols.particle_id.create_index()
+
+    def _open_zone_maps(self):
+        writable = self._file.mode != 'r'
+        for kind, columns in _ZONE_COLUMNS.iteritems():
+            if kind not in self._group:
+                continue
+            table = self._group._f_get_child(kind)
+            zone_map = _ZoneMap.open(table, rebuild=writable)
+            if zone_map is None and writable:
+                zone_map = _ZoneMap.create(self._file, table, columns)
+            if zone_map is not None:
+                self._zone_maps[kind] = zone_map
+
+    def _migrate_legacy_bonds(self):
+        """Convert the bond table with fixed particle slots of an older file.
+
+        """
+        legacy_records = self._group.bonds.read()
+        self._group.bonds.remove()
+        self._create_bonds_table()
+        self._legacy_bonds = False
+        self._append_bond_rows(
+            (record['id'], record['particle_ids'][:record['n_particle_ids']])
+            for record in legacy_records)
+
+    def _read_bond_particles(self, row):
+        n = row['n_particle_ids']
+        if self._legacy_bonds:
+            return tuple(row['particle_ids'][:n].tolist())
+        offset = row['offset']
+        return tuple(self._group.bond_particles[offset:offset + n].tolist())
+
+    def _store_bond_particles(self, particles, offset, n):
+        """Store the particles of an updated bond.
+
+        The particles overwrite the old ones if they fit in their place
+        and are appended to the bond_particles array otherwise (the space
+        of the old ones is not reused).
+
+        Returns
+        -------
+        tuple
+            the new (offset, number of particles) of the bond
+
+        """
+        array = self._group.bond_particles
+        if len(particles) > n:
+            offset = array.nrows
+            array.append(numpy.array(particles, dtype=numpy.int64))
+        elif len(particles) > 0:
+            array[offset:offset + len(particles)] = particles
+        return offset, len(particles)
+
+    def _generate_unique_id(self, table, number_tries=1000, exclude=()):
         for n in xrange(number_tries):
             id = random.randint(0, MAX_INT)
-            for _ in table.where('id == value', condvars={'value': id}):
+            if id in exclude:
+                continue
+            for _ in self._where_id(table, id):
                 break
             else:
                 return id
         else:
             raise Exception('Id could not be generated')
+
+
+_ELEMENT_NAMES = {'particles': 'Particle', 'bonds': 'Bond'}
+
+# the columns summarized by the zone maps of the tables
+_ZONE_COLUMNS = {'particles': ('id', 'coordinates'), 'bonds': ('id',)}
+
+
+def _count_bytes(node, read=0, written=0):
+    # the bytes are counted by dataset ('io.particles', 'io.bonds', ...)
+    if instrumentation.is_enabled():
+        instrumentation.add_bytes('io.' + node.name, read, written)
+
+
+def _box(lo, hi):
+    # the corners of a box query as arrays
+    lo = numpy.asarray(lo, dtype=numpy.float64)
+    hi = numpy.asarray(hi, dtype=numpy.float64)
+    if lo.shape != (3,) or hi.shape != (3,):
+        raise ValueError('The corners of the box should be 3D points')
+    return lo, hi
+
+
+def _copy_element(kind, element, id):
+    # only the attributes that are stored in the file are kept
+    if kind == 'particles':
+        return Particle(id=id, coordinates=tuple(element.coordinates))
+    else:
+        return Bond(id=id, particles=tuple(element.particles))
+
+
+instrumentation.instrument(
+    FileParticleContainer,
+    ('add_particle', 'add_bond', 'update_particle', 'update_particles',
+     'update_bond', 'get_particle', 'get_bond', 'remove_particle',
+     'remove_particles', 'remove_bond', 'remove_bonds', 'iter_particles',
+     'iter_particles_in_box', 'iter_bonds', 'iter_bonds_of_particle',
+     'has_particle', 'has_bond', 'flush', 'compact', 'reorder', 'read_ids',
+     'read_coordinates'))
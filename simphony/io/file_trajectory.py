@@ -0,0 +1,319 @@
+"""
+Time-series (trajectory) storage of a particle container in CUDS files
+
+The particle ids and the bonds are stored once, while the coordinates and
+the selected CUBA attributes of each frame are stored in extendable
+(frames, N, ...) chunked arrays.
+"""
+import numpy
+import tables
+
+from simphony.core import instrumentation
+from simphony.core.cuba import CUBA
+from simphony.core.data_container import DataContainer
+from simphony.cuds.particles import Particle, ParticleContainer
+from simphony.io.file_particle_container import FileParticleContainer
+
+# target size in bytes of the chunks of the frame arrays
+CHUNK_BYTES = 128 * 1024
+# maximum number of particles in a chunk of the frame arrays
+CHUNK_PARTICLES = 64
+# maximum size in bytes of the coordinates of the frames of a chunk (the
+# blocks of frames read by iter_frames)
+BLOCK_BYTES = 64 * 1024 * 1024
+
+
+class FileTrajectory(object):
+    """ Trajectory of a particle container stored in a CUDS file
+
+    The particles (with their initial coordinates) and the bonds are
+    stored once in a 'topology' particle container. The frame arrays are
+    chunked along both the frame and the particle axis.
+
+    The default chunks target the time-series of single particles
+    (particle_time_series) and the sequential reading of the frames
+    (iter_frames, which reads the frames of a chunk at once): a chunk
+    holds CHUNK_PARTICLES particles over as many frames as fit in
+    CHUNK_BYTES (85 frames of 64 particles), as long as these frames of all the
+    particles fit in BLOCK_BYTES. Reading a single frame at random
+    (read_frame) reads all the frames of its chunks, so for that access
+    pattern a small 'chunk_frames' should be given to create.
+
+    """
+    def __init__(self, group, file):
+        self._file = file
+        self._group = group
+        self._topology = FileParticleContainer(group.topology, file)
+        self._index = None
+
+    @classmethod
+    def create(cls, group, file, particle_container, cuba_keys=(),
+               chunk_frames=None, chunk_particles=None):
+        """ Create the trajectory datasets in the (empty) group
+
+        Parameters
+        ----------
+        group : tables.Group
+            group where the trajectory is stored
+        file : tables.File
+            the file
+        particle_container : ABCParticleContainer
+            the particles (ids) and bonds of the trajectory
+        cuba_keys : sequence of CUBA
+            the particle attributes stored in each frame (the first
+            frame decides their shape and type)
+        chunk_frames : int, optional
+            the number of frames of the chunks of the frame arrays (see
+            the class docstring for the default)
+        chunk_particles : int, optional
+            the number of particles of the chunks of the frame arrays
+            (CHUNK_PARTICLES by default)
+
+        """
+        ids = sorted(particle.id for particle in
+                     particle_container.iter_particles())
+        if len(ids) == 0:
+            raise ValueError('A trajectory needs at least one particle')
+
+        file.create_array(group, 'ids', numpy.array(ids, dtype=numpy.uint32))
+        topology = FileParticleContainer(
+            file.create_group(group, 'topology'), file)
+        topology._append_particles(particle_container.iter_particles())
+        topology._append_bonds(particle_container.iter_bonds())
+
+        n = len(ids)
+        if chunk_particles is None:
+            chunk_particles = CHUNK_PARTICLES
+        particles_per_chunk = min(n, chunk_particles)
+        if chunk_frames is None:
+            chunk_frames = min(CHUNK_BYTES // (particles_per_chunk * 24),
+                               BLOCK_BYTES // (n * 24))
+        frames_per_chunk = max(1, chunk_frames)
+        group._v_attrs.chunk_frames = frames_per_chunk
+        group._v_attrs.chunk_particles = particles_per_chunk
+        group._v_attrs.cuba_keys = [key.name for key in cuba_keys]
+        file.create_earray(
+            group, 'coordinates', tables.Float64Atom(), shape=(0, n, 3),
+            chunkshape=(frames_per_chunk, particles_per_chunk, 3))
+        file.create_group(group, 'data')
+        return cls(group, file)
+
+    @property
+    def particle_ids(self):
+        """ The (sorted) ids of the particles of the trajectory
+
+        """
+        return self._group.ids.read()
+
+    @property
+    def cuba_keys(self):
+        """ The CUBA keys of the particle attributes stored in each frame
+
+        """
+        return [CUBA[name] for name in self._group._v_attrs.cuba_keys]
+
+    def __len__(self):
+        """ The number of frames
+
+        """
+        return self._group.coordinates.nrows
+
+    def append_frame(self, particle_container):
+        """ Append the state of the particle container as a new frame
+
+        The particle container should hold the same particles as the
+        trajectory (their order does not matter).
+
+        Raises
+        -------
+        ValueError
+           if a particle of the trajectory is missing or unknown.
+
+        """
+        index = self._get_index()
+        n = len(index)
+        coordinates = numpy.empty((n, 3), dtype=numpy.float64)
+        found = numpy.zeros(n, dtype=numpy.bool)
+        data = {key: [None] * n for key in self.cuba_keys}
+        for particle in particle_container.iter_particles():
+            try:
+                i = index[particle.id]
+            except KeyError:
+                raise ValueError(
+                    'Particle (id={id}) is not part of the trajectory'.format(
+                        id=particle.id))
+            found[i] = True
+            coordinates[i] = particle.coordinates
+            for key, values in data.iteritems():
+                values[i] = particle.data[key]
+        if not numpy.all(found):
+            raise ValueError(
+                'Particles (ids={ids}) are missing from the frame'.format(
+                    ids=list(self.particle_ids[~found])))
+        self.append_arrays(coordinates, data)
+
+    def append_arrays(self, coordinates, data=None):
+        """ Append a new frame given as arrays
+
+        Parameters
+        ----------
+        coordinates : array_like, (N, 3)
+            coordinates of the particles in the order of particle_ids
+        data : dict
+            CUBA key -> array_like (N, ...) of the particle attributes
+            (all the keys of cuba_keys should be given)
+
+        """
+        coordinates = numpy.asarray(coordinates, dtype=numpy.float64)
+        n = len(self._group.ids)
+        if coordinates.shape != (n, 3):
+            raise ValueError(
+                'Coordinates should have shape {}'.format((n, 3)))
+        data = {} if data is None else data
+        arrays = self._group.data
+        for key in self.cuba_keys:
+            values = numpy.asarray(data[key])
+            if len(values) != n:
+                raise ValueError(
+                    'Data of {} should have {} values'.format(key, n))
+            if key.name not in arrays:
+                particles_per_chunk = self._group._v_attrs.chunk_particles
+                frames_per_chunk = self._group._v_attrs.chunk_frames
+                self._file.create_earray(
+                    arrays, key.name, tables.Atom.from_dtype(values.dtype),
+                    shape=(0,) + values.shape,
+                    chunkshape=(frames_per_chunk, particles_per_chunk) +
+                    values.shape[1:])
+            arrays._f_get_child(key.name).append(values[numpy.newaxis])
+        self._group.coordinates.append(coordinates[numpy.newaxis])
+
+    def read_coordinates(self, frames=None):
+        """ Read the coordinates of one or more frames
+
+        Parameters
+        ----------
+        frames : int or slice
+            the frame (array of shape (N, 3) is returned) or frames
+            (array of shape (F, N, 3) is returned); all frames by default
+
+        """
+        if frames is None:
+            frames = slice(None)
+        return self._group.coordinates[frames]
+
+    def read_data(self, key, frames=None):
+        """ Read the values of a CUBA attribute for one or more frames
+
+        """
+        if frames is None:
+            frames = slice(None)
+        return self._group.data._f_get_child(CUBA(key).name)[frames]
+
+    def read_frame(self, frame):
+        """ Read a frame
+
+        Returns
+        -------
+        ParticleContainer
+            The particles (with the stored attributes) and the bonds.
+
+        """
+        n = len(self)
+        if frame < 0:
+            frame += n
+        if not 0 <= frame < n:
+            raise IndexError('Frame {} does not exist'.format(frame))
+        return next(self._iter_block(frame, frame + 1))
+
+    def iter_frames(self, frames=None):
+        """ Iterate over a range of frames
+
+        Parameters
+        ----------
+        frames : slice
+            the frames to iterate over (all frames by default)
+
+        Yields
+        -------
+        ParticleContainer
+            one particle container for each frame
+
+        """
+        if frames is None:
+            frames = slice(None)
+        start, stop, step = frames.indices(len(self))
+        if step != 1:
+            for frame in xrange(start, stop, step):
+                yield self.read_frame(frame)
+            return
+        # read the frames in blocks that are aligned to the chunks
+        block = self._group._v_attrs.chunk_frames
+        for block_start in xrange(start, stop, block):
+            block_stop = min(block_start + block, stop)
+            for container in self._iter_block(block_start, block_stop):
+                yield container
+
+    def particle_time_series(self, particle_id, frames=None):
+        """ Read the coordinates of a particle over a range of frames
+
+        Returns
+        -------
+        array
+            the coordinates, of shape (F, 3)
+
+        """
+        index = self._get_index()
+        try:
+            i = index[particle_id]
+        except KeyError:
+            raise ValueError(
+                'Particle (id={id}) is not part of the trajectory'.format(
+                    id=particle_id))
+        if frames is None:
+            frames = slice(None)
+        start, stop, step = frames.indices(len(self))
+        return self._group.coordinates[start:stop:step, i, :]
+
+    def iter_bonds(self):
+        """ Iterate over the bonds of the trajectory
+
+        """
+        return self._topology.iter_bonds()
+
+    def _iter_block(self, start, stop):
+        ids = self.particle_ids.tolist()
+        coordinates = self._group.coordinates[start:stop]
+        data = {key: self.read_data(key, slice(start, stop))
+                for key in self.cuba_keys}
+        bonds = list(self._topology.iter_bonds())
+        for frame in xrange(stop - start):
+            container = ParticleContainer()
+            frame_coordinates = coordinates[frame].tolist()
+            for i, id in enumerate(ids):
+                particle = Particle(coordinates=frame_coordinates[i], id=id)
+                particle.data = DataContainer(
+                    {key: _to_python(values[frame, i])
+                     for key, values in data.iteritems()})
+                container.add_particle(particle)
+            for bond in bonds:
+                container.add_bond(bond)
+            yield container
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = {
+                id: i for i, id in enumerate(self.particle_ids.tolist())}
+        return self._index
+
+
+def _to_python(value):
+    if numpy.ndim(value) == 0:
+        return value.item()
+    else:
+        return tuple(value.tolist())
+
+
+instrumentation.instrument(
+    FileTrajectory,
+    ('append_arrays', 'read_coordinates', 'read_data', 'read_frame',
+     'iter_frames', 'particle_time_series'))
@@ -0,0 +1,132 @@
+"""Process-pool parallel reading of the particle containers of a CUDS file.
+
+PyTables (and HDF5) is not thread-safe, so the containers are read by a
+pool of worker processes, each of them opening the file read-only. The
+parent allocates shared memory arrays for the particles of all the
+requested containers and the workers read the columns of the particle
+tables straight into them, so that the results are not pickled or copied
+on their way back to the parent.
+
+Routines:
+---------
+read_particle_arrays:
+    read the particle ids and coordinates of many particle containers.
+
+.. note::
+
+    The file should be flushed (or closed) before it is read, since the
+    workers only see what has been written to disk.
+
+"""
+import ctypes
+import multiprocessing
+from collections import OrderedDict, namedtuple
+from multiprocessing.sharedctypes import RawArray
+
+import numpy
+import tables
+
+ParticleArrays = namedtuple('ParticleArrays', 'ids coordinates')
+
+# state of a worker process (see _init_worker)
+_worker = {}
+
+
+def read_particle_arrays(filename, names=None, workers=None):
+    """Read the particles of many particle containers in parallel.
+
+    Parameters
+    ----------
+    filename : str
+        name of the CUDS file.
+    names : list of str
+        names of the particle containers to read (all the particle
+        containers of the file by default).
+    workers : int
+        number of worker processes (default is the number of cpus).
+
+    Returns
+    -------
+    OrderedDict
+        name -> ParticleArrays(ids, coordinates) for each container, where
+        the ids (N,) and coordinates (N, 3) are in the storage order of
+        the particles. The arrays of all the containers are views of the
+        same shared memory buffers.
+
+    Raises
+    ------
+    ValueError
+        if a particle container does not exist.
+
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    with tables.open_file(filename, mode='r') as handle:
+        group = handle.root.particle_container
+        if names is None:
+            names = sorted(group._v_children)
+        sizes = []
+        for name in names:
+            if name not in group:
+                raise ValueError(
+                    'Particle container \'{n}\' does not exist'.format(
+                        n=name))
+            sizes.append(group._f_get_child(name).particles.nrows)
+
+    offsets = numpy.concatenate(([0], numpy.cumsum(sizes, dtype=int)))
+    total = max(int(offsets[-1]), 1)
+    shared_ids = RawArray(ctypes.c_uint32, total)
+    shared_coordinates = RawArray(ctypes.c_double, 3 * total)
+    tasks = [(name, int(offsets[i]), int(offsets[i + 1]))
+             for i, name in enumerate(names) if sizes[i] > 0]
+    initargs = (filename, shared_ids, shared_coordinates)
+
+    if workers == 1 or len(tasks) < 2:
+        _init_worker(*initargs)
+        try:
+            for task in tasks:
+                _read_particles(task)
+        finally:
+            _close_worker()
+    else:
+        pool = multiprocessing.Pool(
+            min(workers, len(tasks)), _init_worker, initargs)
+        try:
+            pool.map(_read_particles, tasks, chunksize=1)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    ids, coordinates = _as_arrays(shared_ids, shared_coordinates)
+    return OrderedDict(
+        (name, ParticleArrays(
+            ids[offsets[i]:offsets[i + 1]],
+            coordinates[offsets[i]:offsets[i + 1]]))
+        for i, name in enumerate(names))
+
+
+def _as_arrays(shared_ids, shared_coordinates):
+    ids = numpy.frombuffer(shared_ids, dtype=numpy.uint32)
+    coordinates = numpy.frombuffer(
+        shared_coordinates, dtype=numpy.float64).reshape(-1, 3)
+    return ids, coordinates
+
+
+def _init_worker(filename, shared_ids, shared_coordinates):
+    _worker['file'] = tables.open_file(filename, mode='r')
+    _worker['ids'], _worker['coordinates'] = _as_arrays(
+        shared_ids, shared_coordinates)
+
+
+def _close_worker():
+    _worker.pop('file').close()
+    _worker.clear()
+
+
+def _read_particles(task):
+    name, start, stop = task
+    group = _worker['file'].root.particle_container._f_get_child(name)
+    table = group.particles
+    table.read(field='id', out=_worker['ids'][start:stop])
+    table.read(field='coordinates', out=_worker['coordinates'][start:stop])
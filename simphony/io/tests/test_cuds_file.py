@@ -3,7 +3,7 @@ import os
 
 import tables
 
-from simphony.cuds.particles import Particle
+from simphony.cuds.particles import Particle, Bond, ParticleContainer
 from simphony.io.cuds_file import CudsFile
 from simphony.io.file_particle_container import FileParticleContainer
 
@@ -25,6 +25,12 @@ class TestCudsFile(unittest.TestCase):
         os.remove('test_A.cuds')
         os.remove('test_B.cuds')
 
+    def _container(self):
+        container = ParticleContainer()
+        for particle in self.particles:
+            container.add_particle(particle)
+        return container
+
     def test_init_with_append_mode(self):
         file = CudsFile.open('test.cuds', mode='a')
         self.assertTrue(file.valid())
@@ -44,10 +50,36 @@ class TestCudsFile(unittest.TestCase):
 
     def test_init_with_read_only_mode(self):
         file = CudsFile.open('test.cuds', mode='w')
+        file.add_particle_container('test', self._container())
         file.close()
 
-        with self.assertRaises(Exception):
-            file = CudsFile.open('test.cuds', mode='r')
+        file = CudsFile.open('test.cuds', mode='r')
+        self.assertTrue(file.valid())
+        self.assertTrue(file.read_only)
+        pc = file.get_particle_container('test')
+        self.assertEqual(
+            [p.id for p in pc.iter_particles()], range(10))
+        self.assertEqual(pc.read_ids().tolist(), range(10))
+        self.assertEqual(
+            pc.read_coordinates().tolist(),
+            [list(p.coordinates) for p in self.particles])
+        with self.assertRaises(ValueError):
+            pc.add_particle(Particle((0.0, 0.0, 0.0), id=100))
+        with self.assertRaises(ValueError):
+            file.add_particle_container('foo')
+        file.close()
+        os.remove('test.cuds')
+
+    def test_init_with_core_driver(self):
+        file = CudsFile.open('test.cuds', mode='w', driver='H5FD_CORE')
+        self.assertFalse(file.read_only)
+        file.add_particle_container('test', self._container())
+        file.close()
+
+        file = CudsFile.open('test.cuds', mode='r', driver='H5FD_CORE')
+        pc = file.get_particle_container('test')
+        self.assertEqual(pc.read_ids().tolist(), range(10))
+        file.close()
         os.remove('test.cuds')
 
     def test_init_with_read_only_file(self):
@@ -55,8 +87,21 @@ class TestCudsFile(unittest.TestCase):
             pass
 
         with tables.open_file('test.cuds', mode="r") as pfile:
-            with self.assertRaises(Exception):
-                CudsFile(pfile)
+            file = CudsFile(pfile)
+            self.assertTrue(file.read_only)
+        os.remove('test.cuds')
+
+    def test_read_only_file_without_containers(self):
+        with tables.open_file('test.cuds', mode="w"):
+            pass
+
+        file = CudsFile.open('test.cuds', mode='r')
+        self.assertEqual(list(file.iter_particle_containers()), [])
+        with self.assertRaises(ValueError):
+            file.get_particle_container('test')
+        with self.assertRaises(ValueError):
+            file.add_particle_container('test')
+        file.close()
         os.remove('test.cuds')
 
     def test_init_with_non_file(self):
@@ -145,6 +190,65 @@ class TestCudsFile(unittest.TestCase):
         for pc, name in self.file_a.iter_particle_containers(pc_names):
             self.assertTrue(isinstance(pc, FileParticleContainer))
 
+    def test_iter_particle_containers_on_disk(self):
+        for i in xrange(5):
+            self.file_a.add_particle_container("test_" + str(i))
+        self.file_a.close()
+
+        self.file_a = CudsFile.open('test_A.cuds', max_open_containers=2)
+        self.assertEqual(len(self.file_a._particle_containers), 0)
+        names = [name for pc, name in self.file_a.iter_particle_containers()]
+        self.assertEqual(names, ["test_" + str(i) for i in xrange(5)])
+        self.assertEqual(len(self.file_a._particle_containers), 2)
+
+    def test_container_handles_are_cached(self):
+        self.file_a.close()
+        self.file_a = CudsFile.open('test_A.cuds', max_open_containers=2)
+        for i in xrange(3):
+            self.file_a.add_particle_container("test_" + str(i))
+        pc = self.file_a.get_particle_container("test_2")
+        self.assertIs(self.file_a.get_particle_container("test_2"), pc)
+
+        # the handles of the evicted containers are opened again
+        pc = self.file_a.get_particle_container("test_0")
+        pc.add_particle(self.particles[0])
+        self.assertNotIn("test_1", self.file_a._particle_containers)
+        self.assertEqual(
+            [p.id for p in self.file_a.get_particle_container(
+                "test_0").iter_particles()], [0])
+
+    def test_evicted_handles_in_use_are_returned(self):
+        self.file_a.close()
+        self.file_a = CudsFile.open('test_A.cuds', max_open_containers=1)
+        pc_a = self.file_a.add_particle_container("a")
+        self.file_a.add_particle_container("b")
+        self.assertNotIn("a", self.file_a._particle_containers)
+
+        # the handle that is still used is returned, not a second one
+        # with its own view of the table
+        pc_a2 = self.file_a.get_particle_container("a")
+        self.assertIs(pc_a2, pc_a)
+        pc_a2.add_particle(Particle(id=5))
+        pc_a.add_particle(Particle(id=7))
+        with self.assertRaises(ValueError):
+            pc_a.add_particle(Particle(id=5))
+        self.assertEqual(
+            sorted(p.id for p in pc_a.iter_particles()), [5, 7])
+        self.file_a.close()
+
+        self.file_a = CudsFile.open('test_A.cuds')
+        self.assertEqual(
+            sorted(p.id for p in self.file_a.get_particle_container(
+                "a").iter_particles()), [5, 7])
+
+    def test_delete_particle_container_on_disk(self):
+        self.file_a.add_particle_container("test")
+        self.file_a.close()
+        self.file_a = CudsFile.open('test_A.cuds')
+        self.file_a.delete_particle_container("test")
+        with self.assertRaises(ValueError):
+            self.file_a.get_particle_container("test")
+
     def test_delete_particle_container(self):
         pc_names = []
 
@@ -166,6 +270,135 @@ class TestCudsFile(unittest.TestCase):
             with self.assertRaises(Exception):
                 pc.add_particle(self.particles[0])
 
+    def test_sync_new_particle_container(self):
+        pc = ParticleContainer()
+        for p in self.particles:
+            pc.add_particle(p)
+        pc.track_changes()
+        pc.remove_particle(0)
+
+        file_pc = self.file_a.sync('test', pc)
+
+        self.assertEqual(len(pc.get_changes('particles')), 0)
+        self.assertItemsEqual(
+            [p.id for p in file_pc.iter_particles()], range(1, 10))
+
+    def test_sync_changes(self):
+        pc = ParticleContainer()
+        for p in self.particles:
+            pc.add_particle(p)
+        pc.add_bond(Bond((0, 1), id=0))
+        pc.add_bond(Bond((1, 2), id=1))
+        pc.track_changes()
+        self.file_a.sync('test', pc)
+
+        # remove a range of particles and a single one
+        for id in (2, 3, 4, 8):
+            pc.remove_particle(id)
+        pc.update_particle(Particle((-1.0, -1.0, -1.0), id=1))
+        pc.update_particle(Particle((-9.0, -9.0, -9.0), id=9))
+        pc.add_particle(Particle((5.0, 5.0, 5.0), id=42))
+        pc.remove_bond(0)
+        pc.update_bond(Bond((1, 42, 9), id=1))
+        pc.add_bond(Bond((9, 42), id=5))
+        file_pc = self.file_a.sync('test', pc)
+
+        expected = {p.id: p.coordinates for p in pc.iter_particles()}
+        result = {p.id: p.coordinates for p in file_pc.iter_particles()}
+        self.assertEqual(result, expected)
+        expected = {b.id: b.particles for b in pc.iter_bonds()}
+        result = {b.id: b.particles for b in file_pc.iter_bonds()}
+        self.assertEqual(result, expected)
+        self.assertEqual(len(pc.get_changes('particles')), 0)
+        self.assertEqual(len(pc.get_changes('bonds')), 0)
+
+        # remove all the particles
+        for p in list(pc.iter_particles()):
+            pc.remove_particle(p.id)
+        file_pc = self.file_a.sync('test', pc)
+        self.assertEqual(list(file_pc.iter_particles()), [])
+
+    def test_sync_without_change_tracking(self):
+        pc = ParticleContainer()
+        for p in self.particles:
+            pc.add_particle(p)
+        self.file_a.sync('test', pc)
+        pc.remove_particle(0)
+        pc.add_bond(Bond((1, 2), id=3))
+
+        file_pc = self.file_a.sync('test', pc)
+
+        self.assertItemsEqual(
+            [p.id for p in file_pc.iter_particles()], range(1, 10))
+        self.assertEqual([b.id for b in file_pc.iter_bonds()], [3])
+
+    def test_sync_with_reorder(self):
+        pc = ParticleContainer()
+        for p in reversed(self.particles):
+            pc.add_particle(p)
+        file_pc = self.file_a.sync('test', pc, reorder='hilbert')
+        self.assertItemsEqual(
+            [p.id for p in file_pc.iter_particles()], range(10))
+        # on a diagonal, the Morton order is the order along the diagonal
+        file_pc = self.file_a.sync('test', pc, reorder='morton')
+        self.assertEqual(
+            [p.id for p in file_pc.iter_particles()], range(10))
+        pc.track_changes()
+        pc.remove_particle(0)
+        pc.add_particle(Particle((0.0, 0.0, 0.0), id=10))
+        file_pc = self.file_a.sync('test', pc, reorder='morton')
+        self.assertEqual(
+            [p.id for p in file_pc.iter_particles()], [10] + range(1, 10))
+
+    def test_sync_from_file_particle_container(self):
+        pc_a = self.file_a.add_particle_container('test')
+        for p in self.particles:
+            pc_a.add_particle(p)
+
+        pc_b = self.file_b.sync('other_test', pc_a)
+        pc_a.remove_particle(0)
+        pc_b = self.file_b.sync('other_test', pc_a)
+
+        self.assertItemsEqual(
+            [p.id for p in pc_b.iter_particles()], range(1, 10))
+
+    def test_sync_with_missing_particle(self):
+        pc = ParticleContainer()
+        pc.add_particle(self.particles[0])
+        pc.track_changes()
+        self.file_a.sync('test', ParticleContainer())
+        pc.update_particle(self.particles[0])
+        with self.assertRaises(ValueError):
+            self.file_a.sync('test', pc)
+
+    def test_repack(self):
+        pc = self._container()
+        for i in xrange(1000):
+            pc.add_bond(Bond((i % 10, (i + 1) % 10), id=i))
+        self.file_a.add_particle_container('test', pc)
+        self.file_a.close()
+        size = os.path.getsize('test_A.cuds')
+
+        self.file_a = CudsFile.open('test_A.cuds')
+        file_pc = self.file_a.get_particle_container('test')
+        file_pc.remove_bonds(range(990))
+        self.file_a.repack()
+        self.assertTrue(self.file_a.valid())
+        file_pc = self.file_a.get_particle_container('test')
+        self.assertEqual(
+            [bond.id for bond in file_pc.iter_bonds()], range(990, 1000))
+        self.assertEqual(
+            [p.id for p in file_pc.iter_particles()], range(10))
+        self.file_a.close()
+        self.assertLess(os.path.getsize('test_A.cuds'), size)
+        self.file_a = CudsFile.open('test_A.cuds')
+
+    def test_repack_read_only(self):
+        self.file_a.close()
+        self.file_a = CudsFile.open('test_A.cuds', mode='r')
+        with self.assertRaises(ValueError):
+            self.file_a.repack()
+
     def test_delete_non_existing_particle_container(self):
             with self.assertRaises(ValueError):
                 self.file_a.delete_particle_container("foo")
@@ -4,8 +4,14 @@ import tempfile
 import shutil
 import unittest
 
+import numpy
+
 from simphony.cuds.particles import Particle, Bond
+from simphony.io import file_particle_container
 from simphony.io.cuds_file import CudsFile
+from simphony.io.file_particle_container import (
+    LEGACY_MAX_NUMBER_PARTICLES_IN_BOND, FileParticleContainer,
+    _LegacyBondDescription, _ParticleDescription)
 
 
 def _convert_to_tuple_list(particle_or_bond_list):
@@ -104,6 +110,24 @@ class TestFileParticleContainer(unittest.TestCase):
         self.assertEqual(p, updated_p)
         self.assertNotEqual(p, self.particle_1)
 
+    def test_update_particles(self):
+        self.pc.add_particle(self.particle_1)
+        self.pc.add_particle(self.particle_2)
+        particles = [copy.deepcopy(self.particle_1),
+                     copy.deepcopy(self.particle_2)]
+        for particle in particles:
+            particle.coordinates = (42, 42, 42)
+        self.pc.update_particles(particles)
+        for particle in particles:
+            self.assertEqual(self.pc.get_particle(particle.id), particle)
+
+        # nothing is updated if one of the particles does not exist
+        particles[0].coordinates = (1, 1, 1)
+        with self.assertRaises(ValueError):
+            self.pc.update_particles([particles[0], Particle(id=1000)])
+        self.assertEqual(
+            self.pc.get_particle(particles[0].id).coordinates, (42, 42, 42))
+
     def test_remove_particle(self):
         with self.assertRaises(ValueError):
             self.pc.remove_particle(0)
@@ -224,6 +248,575 @@ class TestFileParticleContainer(unittest.TestCase):
         bondsB = list(p for p in self.pc.iter_bonds(ids1))
         self.compare_list(bondsA, bondsB)
 
+    def test_bond_with_many_particles(self):
+        bond = Bond(tuple(range(50)), id=5)
+        self.pc.add_bond(bond)
+        self.assertEqual(self.pc.get_bond(5), bond)
+
+    def test_update_bond_number_of_particles(self):
+        self.pc.add_bond(Bond((0, 1, 2), id=0))
+        self.pc.add_bond(Bond((3, 4), id=1))
+
+        # the particles of a bond can grow and shrink
+        self.pc.update_bond(Bond(tuple(range(30)), id=0))
+        self.pc.update_bond(Bond((5,), id=1))
+        self.assertEqual(self.pc.get_bond(0), Bond(tuple(range(30)), id=0))
+        self.assertEqual(self.pc.get_bond(1), Bond((5,), id=1))
+        self.compare_list(
+            list(self.pc.iter_bonds()),
+            [Bond(tuple(range(30)), id=0), Bond((5,), id=1)])
+
+    def test_remove_particles(self):
+        for i in xrange(10):
+            self.pc.add_particle(Particle((i, i, i), id=i))
+        self.pc.add_bond(Bond((2, 3), id=0))
+        self.pc.add_bond(Bond((5, 6), id=1))
+        self.pc.add_bond(Bond((8, 9), id=2))
+
+        with self.assertRaises(ValueError):
+            self.pc.remove_particles([0, 100])
+        self.assertTrue(self.pc.has_particle(0))
+
+        self.pc.remove_particles([0, 2, 3, 4, 9], remove_bonds=True)
+        self.assertEqual(
+            [particle.id for particle in self.pc.iter_particles()],
+            [1, 5, 6, 7, 8])
+        self.assertEqual([bond.id for bond in self.pc.iter_bonds()], [1])
+
+        self.pc.remove_particles([1, 5, 6, 7, 8])
+        self.assertEqual(list(self.pc.iter_particles()), [])
+
+    def test_remove_bonds(self):
+        for i in xrange(10):
+            self.pc.add_bond(Bond((i, i + 1), id=i))
+        with self.assertRaises(ValueError):
+            self.pc.remove_bonds([1, 100])
+        self.pc.remove_bonds([1, 2, 3, 7])
+        self.assertEqual(
+            [bond.id for bond in self.pc.iter_bonds()], [0, 4, 5, 6, 8, 9])
+        self.pc.remove_bonds([0, 4, 5, 6, 8, 9])
+        self.assertEqual(list(self.pc.iter_bonds()), [])
+
+    def test_compact(self):
+        bonds = [Bond((i, i + 1, i + 2), id=i) for i in xrange(10)]
+        for bond in bonds:
+            self.pc.add_bond(bond)
+        self.pc.remove_bonds([0, 5])
+        bonds[3] = Bond(tuple(range(3, 30)), id=3)
+        self.pc.update_bond(bonds[3])
+        bonds[4] = Bond((1,), id=4)
+        self.pc.update_bond(bonds[4])
+        del bonds[5]
+        del bonds[0]
+
+        self.pc.compact()
+        self.assertEqual(
+            len(self.pc._group.bond_particles),
+            sum(len(bond.particles) for bond in bonds))
+        self.compare_list(list(self.pc.iter_bonds()), bonds)
+        self.assertEqual(
+            sorted(bond.id for bond in self.pc.iter_bonds_of_particle(7)),
+            [3, 6, 7])
+        self.assertEqual(len(self.pc._group.particle_bonds), 46)
+
+        self.pc.add_bond(Bond((0, 5), id=0))
+        self.assertEqual(
+            sorted(bond.id for bond in self.pc.iter_bonds_of_particle(5)),
+            [0, 3])
+
+    def test_batch_buffers_writes(self):
+        self.pc.add_particle(self.particle_1)
+        with self.pc.batch():
+            self.pc.add_particle(self.particle_2)
+            particle = Particle((9.0, 9.0, 9.0), id=self.particle_1.id)
+            self.pc.update_particle(particle)
+            self.pc.add_bond(self.bond_1)
+            self.assertEqual(self.pc._group.particles.nrows, 1)
+            self.assertEqual(self.pc._group.bonds.nrows, 0)
+
+            # the queries see the buffered writes
+            self.assertEqual(self.pc.get_particle(self.particle_1.id),
+                             particle)
+            self.assertEqual(self.pc.get_particle(self.particle_2.id),
+                             self.particle_2)
+            self.assertTrue(self.pc.has_particle(self.particle_2.id))
+            self.assertEqual(self.pc.get_bond(self.bond_1.id), self.bond_1)
+            with self.assertRaises(ValueError):
+                self.pc.add_particle(self.particle_1)
+            with self.assertRaises(ValueError):
+                self.pc.add_particle(self.particle_2)
+            with self.assertRaises(ValueError):
+                self.pc.update_particle(Particle(id=100))
+
+        self.assertEqual(self.pc._group.particles.nrows, 2)
+        self.assertEqual(self.pc.get_particle(self.particle_1.id), particle)
+        self.assertEqual(self.pc.get_bond(self.bond_1.id), self.bond_1)
+
+    def test_batch_last_update_wins(self):
+        with self.pc.batch():
+            self.pc.add_particle(self.particle_1)
+            for i in xrange(5):
+                self.pc.update_particle(
+                    Particle((i, i, i), id=self.particle_1.id))
+            self.pc.add_bond(self.bond_1)
+            self.pc.update_bond(Bond((5, 6, 7), id=self.bond_1.id))
+        self.compare_list(
+            list(self.pc.iter_particles()),
+            [Particle((4, 4, 4), id=self.particle_1.id)])
+        self.compare_list(
+            list(self.pc.iter_bonds()), [Bond((5, 6, 7), id=self.bond_1.id)])
+
+    def test_batch_flushes_when_full(self):
+        with self.pc.batch(size=10):
+            for i in xrange(25):
+                self.pc.add_particle(Particle((i, i, i), id=i))
+            self.assertEqual(self.pc._group.particles.nrows, 20)
+            # a generated id does not collide with a buffered one
+            id = self.pc.add_particle(Particle())
+            self.assertNotIn(id, range(25))
+        self.assertEqual(self.pc._group.particles.nrows, 26)
+
+    def test_batch_flush_and_removal(self):
+        with self.pc.batch():
+            with self.pc.batch():
+                self.pc.add_particle(self.particle_1)
+            self.assertEqual(self.pc._group.particles.nrows, 0)
+            self.pc.flush()
+            self.assertEqual(self.pc._group.particles.nrows, 1)
+            self.pc.add_particle(self.particle_2)
+            self.pc.remove_particle(self.particle_1.id)
+            self.compare_list(
+                list(self.pc.iter_particles()), [self.particle_2])
+            self.pc.add_particle(self.particle_1)
+        self.assertEqual(self.pc._group.particles.nrows, 2)
+
+    def test_batch_is_flushed_on_close(self):
+        with self.pc.batch():
+            self.pc.add_particle(self.particle_1)
+            self.file.close()
+        self.file = CudsFile.open(self.filename)
+        pc = self.file.get_particle_container("test")
+        self.compare_list(list(pc.iter_particles()), [self.particle_1])
+
+    def test_read_cache(self):
+        self.assertIsNone(self.pc.read_cache_info())
+        self.pc.enable_read_cache(size=10)
+        self.pc.add_particle(self.particle_1)
+        self.pc.add_bond(self.bond_1)
+        for _ in xrange(3):
+            particle = self.pc.get_particle(self.particle_1.id)
+            self.assertEqual(particle, self.particle_1)
+            bond = self.pc.get_bond(self.bond_1.id)
+            self.assertEqual(bond, self.bond_1)
+        info = self.pc.read_cache_info()
+        self.assertEqual(info['particles'].hits, 2)
+        self.assertEqual(info['particles'].misses, 1)
+        self.assertEqual(info['particles'].size, 1)
+        self.assertEqual(info['particles'].maxsize, 10)
+        self.assertEqual(info['bonds'].hits, 2)
+
+        # changing a returned element does not change the cached one
+        particle.coordinates = (9.0, 9.0, 9.0)
+        self.assertEqual(
+            self.pc.get_particle(self.particle_1.id), self.particle_1)
+
+        self.pc.disable_read_cache()
+        self.assertIsNone(self.pc.read_cache_info())
+
+    def test_memory_usage(self):
+        empty = self.pc.memory_usage()
+        with self.pc.batch():
+            self.pc.add_particle(self.particle_1)
+            self.assertGreater(self.pc.memory_usage(), empty)
+        self.assertEqual(self.pc.memory_usage(), empty)
+
+    def test_reorder(self):
+        # particles on a line, added in a shuffled order
+        positions = [7, 2, 9, 0, 5, 3, 8, 1, 6, 4]
+        particles = [Particle((float(x), 0.0, 0.0), id=x) for x in positions]
+        self.pc.enable_read_cache()
+        with self.pc.batch():
+            for particle in particles:
+                self.pc.add_particle(particle)
+            self.pc.add_bond(self.bond_1)
+        self.pc.get_particle(7)
+
+        self.pc.reorder()
+        self.assertItemsEqual(self.pc.read_ids().tolist(), range(10))
+        # on a line, the Morton order is the order along the line
+        self.pc.reorder('morton')
+
+        self.assertEqual(self.pc.read_ids().tolist(), range(10))
+        self.assertEqual(
+            self.pc.read_coordinates()[:, 0].tolist(), range(10))
+        for particle in particles:
+            self.assertEqual(self.pc.get_particle(particle.id), particle)
+        self.assertEqual(
+            _convert_to_tuple_list(self.pc.iter_bonds()),
+            _convert_to_tuple_list([self.bond_1]))
+        self.assertEqual(
+            _convert_to_tuple_list(self.pc.iter_bonds_of_particle(0)),
+            _convert_to_tuple_list([self.bond_1]))
+        with self.assertRaises(ValueError):
+            self.pc.reorder('peano')
+
+    def test_iter_particles_in_box(self):
+        particles = [
+            Particle((float(x), float(y), 0.5), id=10 * x + y)
+            for x in xrange(10) for y in xrange(10)]
+        self.pc._append_particles(particles[:50])
+        default_size = file_particle_container.SCAN_CHUNK_SIZE
+        file_particle_container.SCAN_CHUNK_SIZE = 7
+        try:
+            with self.pc.batch():
+                for particle in particles[50:]:
+                    self.pc.add_particle(particle)
+                # the buffered particles are found too
+                found = list(self.pc.iter_particles_in_box(
+                    (2.0, 3.0, 0.0), (4.0, 8.5, 1.0)))
+        finally:
+            file_particle_container.SCAN_CHUNK_SIZE = default_size
+        self.assertItemsEqual(
+            _convert_to_tuple_list(found),
+            _convert_to_tuple_list(
+                [p for p in particles
+                 if 2 <= p.coordinates[0] <= 4 and
+                 3 <= p.coordinates[1] <= 8.5]))
+        self.assertEqual(
+            list(self.pc.iter_particles_in_box(
+                (2.0, 3.0, 0.6), (4.0, 8.5, 1.0))), [])
+
+    def test_iter_particles_in_box_with_invalid_box(self):
+        with self.assertRaises(ValueError):
+            list(self.pc.iter_particles_in_box((0.0, 0.0), (1.0, 1.0)))
+
+    def test_reorder_empty(self):
+        self.pc.reorder()
+        self.assertEqual(list(self.pc.iter_particles()), [])
+
+    def test_zone_maps(self):
+        default_size = file_particle_container.ZONE_SIZE
+        file_particle_container.ZONE_SIZE = 5
+        try:
+            pc = self.file.add_particle_container('zones')
+        finally:
+            file_particle_container.ZONE_SIZE = default_size
+        particles = [Particle((float(x), 0.0, 0.0), id=x) for x in xrange(23)]
+        pc._append_particles(particles[:12])
+        for particle in particles[12:]:
+            pc.add_particle(particle)
+        with pc.batch():
+            for id in xrange(5):
+                pc.add_bond(Bond((id, id + 1), id=id))
+        table = pc._group.particles
+        self.assertZonesCoverRows(pc)
+        # the ids and the coordinates are sorted, so a lookup or a box
+        # only reads the rows of one zone
+        self.assertEqual(pc._zone_rows(table, {'id': (12, 12)}), [(10, 15)])
+        self.assertEqual(
+            pc._zone_rows(table, {'coordinates': (
+                (16.0, -1.0, -1.0), (18.0, 1.0, 1.0))}), [(15, 20)])
+        self.assertEqual(pc._zone_rows(table, {'id': (30, 30)}), [])
+
+        particles[12] = Particle((100.0, 0.0, 0.0), id=12)
+        pc.update_particle(particles[12])
+        with pc.batch():
+            particles[20] = Particle((-5.0, 0.0, 0.0), id=20)
+            pc.update_particle(particles[20])
+        pc.remove_particle(3)
+        pc.remove_particles([0, 1, 7])
+        pc.remove_bond(2)
+        self.assertZonesCoverRows(pc)
+        remaining = [p for p in particles if p.id not in (0, 1, 3, 7)]
+        for particle in remaining:
+            self.assertEqual(pc.get_particle(particle.id), particle)
+        self.assertFalse(pc.has_particle(7))
+        self.assertEqual(pc.get_bond(4), Bond((4, 5), id=4))
+        self.assertEqual(
+            [p.id for p in pc.iter_particles_in_box(
+                (90.0, -1.0, -1.0), (110.0, 1.0, 1.0))], [12])
+
+        pc.reorder('morton')
+        self.assertZonesCoverRows(pc)
+        self.assertEqual(
+            [p.id for p in pc.iter_particles_in_box(
+                (-10.0, -1.0, -1.0), (2.0, 1.0, 1.0))], [20, 2])
+        self.assertEqual(
+            pc._zone_rows(table, {'coordinates': (
+                (90.0, -1.0, -1.0), (110.0, 1.0, 1.0))}), [(15, 19)])
+
+        # the zones are read from the file
+        self.file.close()
+        self.file = CudsFile.open(self.filename, mode='r')
+        pc = self.file.get_particle_container('zones')
+        self.assertZonesCoverRows(pc)
+        for particle in remaining:
+            self.assertEqual(pc.get_particle(particle.id), particle)
+
+    def test_zone_maps_of_two_handles(self):
+        default_size = file_particle_container.ZONE_SIZE
+        file_particle_container.ZONE_SIZE = 5
+        try:
+            pc = self.file.add_particle_container('zones')
+        finally:
+            file_particle_container.ZONE_SIZE = default_size
+        other = FileParticleContainer(pc._group, self.file._file)
+        self.assertIs(other._zone_maps['particles'],
+                      pc._zone_maps['particles'])
+        pc._append_particles(
+            Particle((float(x), 0.0, 0.0), id=x) for x in xrange(12))
+        other.get_particle(3)
+
+        # the rows written with one handle are seen by the other one
+        pc.add_particle(Particle((12.0, 0.0, 0.0), id=12))
+        self.assertTrue(other.has_particle(12))
+        with self.assertRaises(ValueError):
+            other.add_particle(Particle(id=12))
+        # the rows are rewritten without changing the number of rows
+        particle = Particle((100.0, 0.0, 0.0), id=4)
+        other.update_particle(particle)
+        self.assertEqual(
+            [p.id for p in pc.iter_particles_in_box(
+                (90.0, -1.0, -1.0), (110.0, 1.0, 1.0))], [4])
+        pc.reorder('morton')
+        self.assertEqual(other.get_particle(4), particle)
+        self.assertZonesCoverRows(pc)
+        self.assertZonesCoverRows(other)
+
+    def test_zone_maps_are_saved_by_flush(self):
+        self.pc.add_particle(self.particle_1)
+        zones = self.pc._group.particles_zones
+        # the zones table is out of date until the flush
+        self.assertEqual(zones.attrs.nrows, -1)
+        self.assertEqual(zones.nrows, 0)
+        self.pc.flush()
+        self.assertEqual(zones.attrs.nrows, 1)
+        self.assertEqual(zones.nrows, 1)
+        version = zones.attrs.version
+        self.pc.add_particle(self.particle_2)
+        self.pc.remove_particle(self.particle_1.id)
+        self.file.flush()
+        self.assertEqual(zones.attrs.nrows, 1)
+        self.assertGreater(zones.attrs.version, version)
+
+        # the zones that were not saved are not used
+        self.pc.update_particle(Particle((7.0, 7.0, 7.0), id=1))
+        self.file._file.close()
+        self.file = CudsFile.open(self.filename, mode='r')
+        pc = self.file.get_particle_container('test')
+        self.assertNotIn('particles', pc._zone_maps)
+        self.assertEqual(
+            [p.id for p in pc.iter_particles_in_box(
+                (6.0, 6.0, 6.0), (8.0, 8.0, 8.0))], [1])
+
+    def test_zone_maps_after_removals(self):
+        default_size = file_particle_container.ZONE_SIZE
+        file_particle_container.ZONE_SIZE = 5
+        try:
+            pc = self.file.add_particle_container('zones')
+        finally:
+            file_particle_container.ZONE_SIZE = default_size
+        pc._append_particles(
+            Particle((float(x), 0.0, 0.0), id=x) for x in xrange(23))
+        zone_map = pc._zone_maps['particles']
+        remaining = range(23)
+        for id in (2, 9, 0, 21, 15, 4, 22):
+            pc.remove_particle(id)
+            remaining.remove(id)
+            self.assertZonesCoverRows(pc)
+            for other_id in remaining:
+                self.assertTrue(pc.has_particle(other_id))
+        # the ranges were recomputed after 5 removals
+        self.assertEqual(zone_map._removed, 2)
+        self.assertEqual(len(zone_map.summary), 4)
+
+    def test_zone_maps_of_older_files(self):
+        self.pc._append_particles([self.particle_1, self.particle_2])
+        self.pc.add_bond(self.bond_1)
+        # the zones are missing (an older file) or do not cover the rows
+        # (appended to by an older version)
+        self.file.flush()
+        self.pc._zone_maps.clear()
+        self.pc._group.particles_zones.remove()
+        self.pc._group.bonds.append([(5, 0, 0)])
+        self.file.close()
+
+        self.file = CudsFile.open(self.filename, mode='r')
+        pc = self.file.get_particle_container('test')
+        self.assertEqual(pc._zone_maps, {})
+        self.assertEqual(pc.get_particle(1), self.particle_2)
+        self.assertTrue(pc.has_bond(5))
+        self.file.close()
+
+        self.file = CudsFile.open(self.filename, mode='a')
+        pc = self.file.get_particle_container('test')
+        self.assertItemsEqual(pc._zone_maps, ['particles', 'bonds'])
+        self.assertZonesCoverRows(pc)
+        self.assertEqual(pc.get_particle(1), self.particle_2)
+        self.assertTrue(pc.has_bond(5))
+
+    def test_read_cache_invalidation(self):
+        self.pc.enable_read_cache()
+        self.pc.add_particle(self.particle_1)
+        self.pc.add_particle(self.particle_2)
+        self.pc.add_bond(self.bond_1)
+        self.pc.get_particle(self.particle_1.id)
+        self.pc.get_bond(self.bond_1.id)
+
+        particle = Particle((7.0, 7.0, 7.0), id=self.particle_1.id)
+        self.pc.update_particle(particle)
+        self.assertEqual(self.pc.get_particle(self.particle_1.id), particle)
+        bond = Bond((1, 0, 1), id=self.bond_1.id)
+        self.pc.update_bond(bond)
+        self.assertEqual(self.pc.get_bond(self.bond_1.id), bond)
+
+        # buffered updates are seen before and after the flush
+        particle = Particle((8.0, 8.0, 8.0), id=self.particle_1.id)
+        with self.pc.batch():
+            self.pc.update_particle(particle)
+            self.assertEqual(
+                self.pc.get_particle(self.particle_1.id), particle)
+        self.assertEqual(self.pc.get_particle(self.particle_1.id), particle)
+
+        self.pc.remove_particle(self.particle_1.id, remove_bonds=True)
+        with self.assertRaises(ValueError):
+            self.pc.get_particle(self.particle_1.id)
+        with self.assertRaises(ValueError):
+            self.pc.get_bond(self.bond_1.id)
+
+        self.pc.get_particle(self.particle_2.id)
+        self.pc.remove_particles([self.particle_2.id])
+        with self.assertRaises(ValueError):
+            self.pc.get_particle(self.particle_2.id)
+
+    def test_iter_bonds_of_particle(self):
+        self.pc.add_bond(Bond((0, 1), id=0))
+        self.pc.add_bond(Bond((1, 2, 1), id=1))
+        self.pc.add_bond(Bond((3, 4), id=2))
+        # the index table is flushed before a query, not by each addition
+        self.assertTrue(self.pc._index_pending)
+
+        def bonds_of(particle_id):
+            return sorted(
+                bond.id for bond in self.pc.iter_bonds_of_particle(
+                    particle_id))
+
+        self.assertEqual(bonds_of(1), [0, 1])
+        self.assertFalse(self.pc._index_pending)
+        self.assertEqual(bonds_of(4), [2])
+        self.assertEqual(bonds_of(10), [])
+
+        self.pc.update_bond(Bond((2, 3), id=1))
+        self.assertEqual(bonds_of(1), [0])
+        self.assertEqual(bonds_of(3), [1, 2])
+        self.pc.remove_bond(2)
+        self.assertEqual(bonds_of(3), [1])
+        self.pc.add_bond(Bond((3, 1), id=2))
+        self.assertEqual(bonds_of(1), [0, 2])
+        self.assertEqual(self.pc.get_bond(2), Bond((3, 1), id=2))
+
+    def test_remove_particle_with_bonds(self):
+        for particle in (Particle(id=i) for i in xrange(3)):
+            self.pc.add_particle(particle)
+        self.pc.add_bond(Bond((0, 1), id=0))
+        self.pc.add_bond(Bond((1, 2), id=1))
+        self.pc.add_bond(Bond((0, 2), id=2))
+
+        self.pc.remove_particle(1, remove_bonds=True)
+        self.assertFalse(self.pc.has_particle(1))
+        self.assertEqual([bond.id for bond in self.pc.iter_bonds()], [2])
+        self.pc.remove_particle(2)
+        self.assertTrue(self.pc.has_bond(2))
+
+    def test_bonds_of_particle_are_found_by_zone(self):
+        default_size = file_particle_container.ZONE_SIZE
+        file_particle_container.ZONE_SIZE = 5
+        try:
+            pc = self.file.add_particle_container('zones')
+        finally:
+            file_particle_container.ZONE_SIZE = default_size
+        pc._append_bonds(Bond((id, id + 1), id=id) for id in xrange(30))
+        # the id columns are not read
+        lookups = []
+        original_scan_rows = pc._scan_rows
+
+        def scan_rows(table, ids):
+            lookups.append(table.name)
+            return original_scan_rows(table, ids)
+        pc._scan_rows = scan_rows
+
+        self.compare_list(
+            list(pc.iter_bonds_of_particle(12)),
+            [Bond((11, 12), id=11), Bond((12, 13), id=12)])
+        self.assertEqual(lookups, [])
+
+        # the bonds of all the particles are removed at once
+        pc._append_particles(Particle(id=id) for id in xrange(31))
+        pc.remove_particles([3, 4, 20], remove_bonds=True)
+        self.assertEqual(lookups, [])
+        self.assertEqual(
+            [bond.id for bond in pc.iter_bonds()],
+            [id for id in xrange(30) if id not in (2, 3, 4, 19, 20)])
+        self.assertZonesCoverRows(pc)
+
+    def test_read_legacy_bonds(self):
+        legacy_bonds = [Bond((1, 0), id=0), Bond((2, 3, 4), id=1)]
+        self._write_legacy_bonds('legacy', legacy_bonds)
+        self.file.close()
+
+        self.file = CudsFile.open(self.filename, mode='r')
+        pc = self.file.get_particle_container('legacy')
+        self.compare_list(list(pc.iter_bonds()), legacy_bonds)
+        self.assertEqual(pc.get_bond(1), legacy_bonds[1])
+        self.compare_list(list(pc.iter_bonds_of_particle(0)), legacy_bonds[:1])
+
+    def test_migrate_legacy_bonds(self):
+        legacy_bonds = [Bond((1, 0), id=0), Bond((2, 3, 4), id=1)]
+        self._write_legacy_bonds('legacy', legacy_bonds)
+
+        pc = self.file.get_particle_container('legacy')
+        self.compare_list(list(pc.iter_bonds()), legacy_bonds)
+        pc.update_bond(Bond(tuple(range(25)), id=0))
+        self.assertEqual(pc.get_bond(0), Bond(tuple(range(25)), id=0))
+        self.assertEqual(pc.get_bond(1), legacy_bonds[1])
+        self.assertEqual(
+            [bond.id for bond in pc.iter_bonds_of_particle(24)], [0])
+        self.assertEqual(
+            sorted(bond.id for bond in pc.iter_bonds_of_particle(4)), [0, 1])
+
+    def _write_legacy_bonds(self, name, bonds):
+        group = self.file._file.create_group('/particle_container/', name)
+        table = self.file._file.create_table(
+            group, 'bonds', _LegacyBondDescription)
+        for bond in bonds:
+            particle_ids = [0] * LEGACY_MAX_NUMBER_PARTICLES_IN_BOND
+            particle_ids[:len(bond.particles)] = bond.particles
+            table.append([(bond.id, particle_ids, len(bond.particles))])
+        self.file._file.create_table(
+            group, 'particles', _ParticleDescription)
+
+    def assertZonesCoverRows(self, pc):
+        # each zone has the minimum and maximum of its rows (or a wider
+        # range after updates), they are saved by flush
+        pc.flush()
+        for kind, zone_map in pc._zone_maps.iteritems():
+            table = pc._group._f_get_child(kind)
+            self.assertEqual(
+                len(zone_map.summary), -(-table.nrows // zone_map.size))
+            self.assertEqual(zone_map.zones.attrs.nrows, table.nrows)
+            self.assertEqual(
+                zone_map.summary.tobytes(), zone_map.zones.read().tobytes())
+            for zone, start in enumerate(
+                    xrange(0, table.nrows, zone_map.size)):
+                records = table.read(start, start + zone_map.size)
+                for column in zone_map.columns:
+                    self.assertTrue(numpy.all(
+                        zone_map.summary[zone][column + '_min'] <=
+                        records[column].min(axis=0)))
+                    self.assertTrue(numpy.all(
+                        zone_map.summary[zone][column + '_max'] >=
+                        records[column].max(axis=0)))
+
     def assertParticleEqual(self, a, b, msg=None):
         self.assertEqual(a.id, b.id)
         self.assertEqual(a.coordinates, b.coordinates)
@@ -0,0 +1,149 @@
+import unittest
+import os
+
+import numpy
+
+from simphony.core.cuba import CUBA
+from simphony.cuds.particles import Particle, Bond, ParticleContainer
+from simphony.io.cuds_file import CudsFile
+
+
+def make_frame(step, ids=range(10)):
+    container = ParticleContainer()
+    for i in ids:
+        particle = Particle((step + i, 2.0 * i, 3.0 * step), id=i)
+        particle.data[CUBA.VELOCITY] = (step, i, 0.0)
+        particle.data[CUBA.MATERIAL_ID] = i * step
+        container.add_particle(particle)
+    return container
+
+
+class TestFileTrajectory(unittest.TestCase):
+
+    def setUp(self):
+        self.file = CudsFile.open('test_trajectory.cuds')
+        topology = make_frame(0)
+        topology.add_bond(Bond((0, 1), id=0))
+        topology.add_bond(Bond((2, 3, 4), id=1))
+        self.trajectory = self.file.add_trajectory(
+            'test', topology, cuba_keys=[CUBA.VELOCITY, CUBA.MATERIAL_ID])
+
+    def tearDown(self):
+        self.file.close()
+        os.remove('test_trajectory.cuds')
+
+    def test_add_trajectory(self):
+        self.assertEqual(len(self.trajectory), 0)
+        self.assertEqual(self.trajectory.particle_ids.tolist(), range(10))
+        self.assertEqual(
+            self.trajectory.cuba_keys, [CUBA.VELOCITY, CUBA.MATERIAL_ID])
+        self.assertEqual(
+            sorted(bond.particles for bond in self.trajectory.iter_bonds()),
+            [(0, 1), (2, 3, 4)])
+
+    def test_add_existing_trajectory(self):
+        with self.assertRaises(ValueError):
+            self.file.add_trajectory('test', make_frame(0))
+
+    def test_add_empty_trajectory(self):
+        with self.assertRaises(ValueError):
+            self.file.add_trajectory('empty', ParticleContainer())
+
+    def test_get_trajectory(self):
+        self.trajectory.append_frame(make_frame(1))
+        trajectory = self.file.get_trajectory('test')
+        self.assertEqual(len(trajectory), 1)
+        with self.assertRaises(ValueError):
+            self.file.get_trajectory('foo')
+
+    def test_append_and_read_frame(self):
+        for step in xrange(5):
+            self.trajectory.append_frame(make_frame(step))
+        self.assertEqual(len(self.trajectory), 5)
+
+        frame = self.trajectory.read_frame(3)
+        expected = make_frame(3)
+        for particle in expected.iter_particles():
+            read = frame.get_particle(particle.id)
+            self.assertEqual(read.coordinates, particle.coordinates)
+            self.assertEqual(read.data, particle.data)
+        self.assertEqual(len(list(frame.iter_bonds())), 2)
+
+        last = self.trajectory.read_frame(-1)
+        self.assertEqual(last.get_particle(0).coordinates, (4, 0, 12))
+        with self.assertRaises(IndexError):
+            self.trajectory.read_frame(5)
+
+    def test_read_arrays(self):
+        for step in xrange(4):
+            self.trajectory.append_frame(make_frame(step))
+        coordinates = self.trajectory.read_coordinates()
+        self.assertEqual(coordinates.shape, (4, 10, 3))
+        numpy.testing.assert_array_equal(
+            coordinates[2, 5], (7.0, 10.0, 6.0))
+        velocities = self.trajectory.read_data(CUBA.VELOCITY, slice(1, 3))
+        self.assertEqual(velocities.shape, (2, 10, 3))
+        numpy.testing.assert_array_equal(velocities[1, 4], (2.0, 4.0, 0.0))
+
+    def test_iter_frames(self):
+        for step in xrange(6):
+            self.trajectory.append_frame(make_frame(step))
+        steps = [frame.get_particle(0).coordinates[0]
+                 for frame in self.trajectory.iter_frames()]
+        self.assertEqual(steps, range(6))
+        steps = [frame.get_particle(0).coordinates[0]
+                 for frame in self.trajectory.iter_frames(slice(1, 6, 2))]
+        self.assertEqual(steps, [1, 3, 5])
+
+    def test_chunk_shape(self):
+        # the chunks cover many frames of few particles
+        coordinates = self.trajectory._group.coordinates
+        self.assertEqual(coordinates.chunkshape, (546, 10, 3))
+        trajectory = self.file.add_trajectory(
+            'large', make_frame(0, ids=range(1000)))
+        self.assertEqual(
+            trajectory._group.coordinates.chunkshape, (85, 64, 3))
+
+        trajectory = self.file.add_trajectory(
+            'configured', make_frame(0), cuba_keys=[CUBA.VELOCITY],
+            chunk_frames=4, chunk_particles=5)
+        self.assertEqual(
+            trajectory._group.coordinates.chunkshape, (4, 5, 3))
+        for step in xrange(6):
+            trajectory.append_frame(make_frame(step))
+        self.assertEqual(
+            trajectory._group.data.VELOCITY.chunkshape, (4, 5, 3))
+        steps = [frame.get_particle(9).coordinates[0]
+                 for frame in trajectory.iter_frames(slice(1, None))]
+        self.assertEqual(steps, range(10, 15))
+        numpy.testing.assert_array_equal(
+            trajectory.particle_time_series(9)[:, 0], range(9, 15))
+
+    def test_particle_time_series(self):
+        for step in xrange(6):
+            self.trajectory.append_frame(make_frame(step))
+        series = self.trajectory.particle_time_series(7)
+        numpy.testing.assert_array_equal(
+            series, [(step + 7, 14.0, 3.0 * step) for step in xrange(6)])
+        series = self.trajectory.particle_time_series(7, slice(4, None))
+        self.assertEqual(series.shape, (2, 3))
+        with self.assertRaises(ValueError):
+            self.trajectory.particle_time_series(100)
+
+    def test_append_frame_with_missing_particle(self):
+        with self.assertRaises(ValueError):
+            self.trajectory.append_frame(make_frame(1, ids=range(9)))
+        self.assertEqual(len(self.trajectory), 0)
+
+    def test_append_frame_with_unknown_particle(self):
+        with self.assertRaises(ValueError):
+            self.trajectory.append_frame(make_frame(1, ids=range(11)))
+        self.assertEqual(len(self.trajectory), 0)
+
+    def test_append_arrays_with_wrong_shape(self):
+        with self.assertRaises(ValueError):
+            self.trajectory.append_arrays(numpy.zeros((9, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+    Testing for the parallel reading of CUDS files.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from simphony.cuds.particles import Particle
+from simphony.io.cuds_file import CudsFile
+from simphony.io.parallel import read_particle_arrays
+
+
+class ReadParticleArraysTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'test.cuds')
+        cuds_file = CudsFile.open(self.filename)
+        for n in xrange(5):
+            pc = cuds_file.add_particle_container('pc{}'.format(n))
+            pc._append_particles(
+                Particle((float(i), float(n), 0.0), id=i)
+                for i in xrange(10 * n))
+        cuds_file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def check_arrays(self, arrays, names):
+        self.assertEqual(list(arrays), names)
+        for name in names:
+            n = int(name[2:])
+            ids, coordinates = arrays[name]
+            self.assertEqual(ids.tolist(), range(10 * n))
+            self.assertEqual(coordinates.shape, (10 * n, 3))
+            numpy.testing.assert_array_equal(coordinates[:, 0], ids)
+            numpy.testing.assert_array_equal(coordinates[:, 1], n)
+
+    def test_read_in_process(self):
+        arrays = read_particle_arrays(self.filename, workers=1)
+        self.check_arrays(arrays, ['pc{}'.format(n) for n in xrange(5)])
+
+    def test_read_in_worker_processes(self):
+        arrays = read_particle_arrays(self.filename, workers=2)
+        self.check_arrays(arrays, ['pc{}'.format(n) for n in xrange(5)])
+
+    def test_read_some_containers(self):
+        arrays = read_particle_arrays(
+            self.filename, names=['pc3', 'pc0', 'pc1'], workers=2)
+        self.check_arrays(arrays, ['pc3', 'pc0', 'pc1'])
+
+    def test_read_missing_container(self):
+        with self.assertRaises(ValueError):
+            read_particle_arrays(self.filename, names=['foo'])
+
+
+if __name__ == '__main__':
+    unittest.main()